@@ -0,0 +1,859 @@
+# Import built-in modules
+import re
+from collections import deque
+from contextlib import contextmanager
+
+# Logger
+import logging
+
+from dw_kong_render_setup import tracing
+
+logger = logging.getLogger('Kong Render Setup')
+
+# plugs of a shading engine that lead into the shading network
+# everything else on a sg (dagSetMembers, groupNodes, ...) leads into geometry history and is never walked
+SHADING_ENGINE_PLUGS = ["surfaceShader", "volumeShader", "displacementShader", "aiSurfaceShader", "aiVolumeShader"]
+
+# backend used by functions when none is passed explicitly
+_current_backend = None
+
+
+def get_backend():
+    """
+    returns the current scene backend, a MayaBackend unless set otherwise
+    :return: SceneBackend
+    """
+    global _current_backend
+    if _current_backend is None:
+        _current_backend = MayaBackend()
+    return _current_backend
+
+
+def set_backend(backend):
+    """
+    sets the scene backend used by functions, None resets to the MayaBackend
+    :param backend: SceneBackend or None
+    :return:
+    """
+    global _current_backend
+    _current_backend = backend
+
+
+class SceneBackend(object):
+    """
+    scene operations used by load_selected_shader and build_render_setup
+    render setup objects returned by render_setup() follow the maya render setup model api
+    """
+
+    # selector filter type for custom node types
+    filter_custom = None
+    # override type id of material overrides
+    material_override = None
+    # decode behavior merging decoded layers into the existing render setup
+    decode_merge = None
+
+    def warning(self, message):
+        raise NotImplementedError
+
+    def exists(self, node):
+        raise NotImplementedError
+
+    def node_type(self, node):
+        raise NotImplementedError
+
+    def create_node(self, node_type, name=None):
+        raise NotImplementedError
+
+    def get_parent(self, node):
+        raise NotImplementedError
+
+    def delete(self, nodes):
+        raise NotImplementedError
+
+    def create_shader(self, shader_type):
+        raise NotImplementedError
+
+    def scan_shading_network(self, shading_engine):
+        """
+        :return: dict with switch name and dict of input index and tuple of source node and texture path
+        """
+        raise NotImplementedError
+
+    def find_switch_drivers(self, switches, driver_type="floatConstant", index_attr="index"):
+        """
+        :return: sorted list of the nodes of driver_type upstream of the index input of the switches
+        """
+        raise NotImplementedError
+
+    def list_node_names(self):
+        """
+        :return: list of all dag node names the collection patterns get evaluated against
+        """
+        raise NotImplementedError
+
+    def list_nodes(self, node_type):
+        """
+        :return: list of all node names of a type
+        """
+        raise NotImplementedError
+
+    def list_descendant_shapes(self, roots):
+        """
+        resolves the shapes below dag nodes in a single dag query
+        :param roots: list of dag node names
+        :return: dict with every existing root and the list of shape paths below it, or of itself if it's a shape
+        """
+        raise NotImplementedError
+
+    def get_assigned_geometry(self, shading_engine):
+        """
+        :return: list of transform names of the shapes a shading engine is assigned to
+        """
+        raise NotImplementedError
+
+    def undo_chunk(self, name):
+        """
+        :return: context manager grouping all scene changes inside into a single undo step
+        """
+        raise NotImplementedError
+
+    def bulk_edit(self, name):
+        """
+        context manager for many scene edits in a row, groups them into a single undo step and suspends
+        the viewport refresh and window repaints after every single edit, render setup observers are still notified
+        :param name: name of the undo step
+        :return: context manager
+        """
+        return self.undo_chunk(name)
+
+    def get_keys(self, node, attr):
+        """
+        :return: dict with frame and value of every key of an attribute
+        """
+        raise NotImplementedError
+
+    def set_keys(self, node, attr, keys):
+        """
+        replaces the animation of an attribute with stepped keys
+        :param keys: dict with frame and value
+        """
+        raise NotImplementedError
+
+    def render_setup(self):
+        raise NotImplementedError
+
+    def delete_render_layers(self, rs, layers):
+        """
+        deletes render layers with all their collections and overrides
+        :param rs: render setup instance
+        :param layers: list of render layers
+        :return:
+        """
+        raise NotImplementedError
+
+    def prefs_dir(self):
+        """
+        :return: str user prefs dir or None if nothing should be persisted
+        """
+        raise NotImplementedError
+
+
+class MayaBackend(SceneBackend):
+    """
+    backend running against the current maya session
+    """
+
+    def __init__(self):
+        import maya.cmds as cmds
+        import maya.app.renderSetup.model.selector as selector
+        import maya.app.renderSetup.model.renderSetup as renderSetup
+        from maya.app.renderSetup.model.connectionOverride import MaterialOverride
+
+        self._cmds = cmds
+        self._renderSetup = renderSetup
+
+        self.filter_custom = selector.Filters.kCustom
+        self.material_override = MaterialOverride.kTypeId
+        self.decode_merge = renderSetup.DECODE_AND_MERGE
+
+    def warning(self, message):
+        self._cmds.warning(message)
+
+    def exists(self, node):
+        return self._cmds.objExists(str(node))
+
+    def node_type(self, node):
+        return self._cmds.nodeType(str(node))
+
+    def create_node(self, node_type, name=None):
+        tracing.count("nodes_created")
+        if name:
+            return self._cmds.createNode(node_type, name=name, skipSelect=True)
+        return self._cmds.createNode(node_type, skipSelect=True)
+
+    def get_parent(self, node):
+        parents = self._cmds.listRelatives(str(node), parent=True)
+        return parents[0] if parents else None
+
+    def delete(self, nodes):
+        self._cmds.delete([str(x) for x in nodes])
+
+    def create_shader(self, shader_type):
+        cmds = self._cmds
+        shaderName = cmds.shadingNode(shader_type, asShader=True)
+        sgName = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name=(shaderName + "SG"))
+        cmds.connectAttr(shaderName + ".outColor", sgName + ".surfaceShader")
+        return (shaderName, sgName)
+
+    def scan_shading_network(self, shading_engine):
+        from dw_kong_render_setup import shader_graph
+
+        return shader_graph.scan_shading_network(shading_engine)
+
+    def find_switch_drivers(self, switches, driver_type="floatConstant", index_attr="index"):
+        from dw_kong_render_setup import shader_graph
+
+        return shader_graph.find_switch_drivers(switches, driver_type, index_attr)
+
+    def list_node_names(self):
+        return self._cmds.ls(dag=True, long=True) or []
+
+    def list_nodes(self, node_type):
+        return self._cmds.ls(type=node_type) or []
+
+    def list_descendant_shapes(self, roots):
+        cmds = self._cmds
+        roots = [str(x) for x in roots]
+        paths = cmds.ls(roots, long=True) or []
+        shapes = cmds.ls(paths, dag=True, shapes=True, noIntermediate=True, long=True) or []
+
+        # the given names are unique partial paths, every suffix of a long path points back to it
+        by_suffix = {}
+        for path in paths:
+            parts = path.lstrip("|").split("|")
+            for x in range(len(parts)):
+                by_suffix.setdefault("|".join(parts[x:]), path)
+
+        below = dict((x, []) for x in paths)
+        for shape in shapes:
+            path = shape
+            while path:
+                if path in below:
+                    below[path].append(shape)
+                path = path.rpartition("|")[0]
+
+        result = {}
+        for root in roots:
+            path = by_suffix.get(root.lstrip("|"))
+            if path:
+                result[root] = below[path]
+        return result
+
+    def get_assigned_geometry(self, shading_engine):
+        # face assignments are members too, objectsOnly reduces them to their shapes
+        members = self._cmds.sets(str(shading_engine), q=True) or []
+        shapes = self._cmds.ls(members, objectsOnly=True, long=True) or []
+        transforms = []
+        for transform in self._cmds.listRelatives(shapes, parent=True) or []:
+            if transform not in transforms:
+                transforms.append(transform)
+        return transforms
+
+    @contextmanager
+    def undo_chunk(self, name):
+        self._cmds.undoInfo(openChunk=True, chunkName=name)
+        try:
+            yield
+        finally:
+            self._cmds.undoInfo(closeChunk=True)
+
+    @contextmanager
+    def bulk_edit(self, name):
+        cmds = self._cmds
+        # repaints of the outliner, render setup window and every other panel, none in batch
+        window = self._main_window()
+
+        cmds.undoInfo(openChunk=True, chunkName=name)
+        try:
+            cmds.refresh(suspend=True)
+            try:
+                if window:
+                    window.setUpdatesEnabled(False)
+                try:
+                    yield
+                finally:
+                    if window:
+                        window.setUpdatesEnabled(True)
+            finally:
+                cmds.refresh(suspend=False)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    def _main_window(self):
+        """
+        :return: maya main window as QWidget or None without ui
+        """
+        try:
+            from maya import OpenMayaUI
+            from shiboken2 import wrapInstance
+            from PySide2 import QtWidgets
+        except ImportError:
+            return None
+
+        pointer = OpenMayaUI.MQtUtil.mainWindow()
+        if not pointer:
+            return None
+        return wrapInstance(int(pointer), QtWidgets.QWidget)
+
+    def get_keys(self, node, attr):
+        frames = self._cmds.keyframe(str(node), attribute=attr, q=True, timeChange=True) or []
+        values = self._cmds.keyframe(str(node), attribute=attr, q=True, valueChange=True) or []
+        return dict(zip(frames, values))
+
+    def set_keys(self, node, attr, keys):
+        cmds = self._cmds
+        cmds.cutKey(str(node), attribute=attr, clear=True)
+        for frame in sorted(keys):
+            cmds.setKeyframe(str(node), attribute=attr, time=frame, value=keys[frame],
+                             inTangentType="linear", outTangentType="step")
+
+    def render_setup(self):
+        return self._renderSetup.instance()
+
+    def delete_render_layers(self, rs, layers):
+        import maya.app.renderSetup.model.renderLayer as renderLayer
+
+        if not layers:
+            return
+
+        # every layer switch re-applies all overrides, leave a visible layer once instead of per deleted layer
+        if rs.getVisibleRenderLayer() in layers:
+            rs.switchToLayer(rs.getDefaultRenderLayer())
+
+        for layer in layers:
+            renderLayer.delete(layer)
+        tracing.count("layers_deleted", len(layers))
+
+    def prefs_dir(self):
+        return self._cmds.internalVar(userPrefDir=True)
+
+
+class MemoryNode(object):
+    """
+    node of the in memory scene
+    """
+
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.attrs = {}
+        # destination attr name and source plug tuple (node name, attr name)
+        self.inputs = {}
+
+
+class MemoryBackend(SceneBackend):
+    """
+    pure python scene with nodes, attributes, connections and a render setup model
+    runs the build logic without maya, for profiling and testing at synthetic scales
+    """
+
+    filter_custom = "custom"
+    material_override = "materialOverride"
+    decode_merge = "merge"
+
+    # node types created with a parent transform, like maya does
+    SHAPE_TYPES = ["mesh", "nurbsCurve", "nurbsSurface"]
+
+    def __init__(self, prefs_dir=None):
+        self.nodes = {}
+        self.warnings = []
+        # node and attr tuple and dict of frame and value
+        self.keys = {}
+        # last number suffix handed out per base name, keeps unique_name from rescanning
+        self._name_counters = {}
+        self._prefs_dir = prefs_dir
+        self._render_setup = MemoryRenderSetup(self)
+
+        # default nodes every maya scene has
+        self.create_node("renderGlobals", "defaultRenderGlobals")
+
+    def unique_name(self, name):
+        """
+        returns name, or name with the lowest free number suffix if taken
+        :param name: requested name
+        :return: str unique name
+        """
+        if name not in self.nodes:
+            return name
+        base = name.rstrip("0123456789")
+        index = self._name_counters.get(base, 0) + 1
+        while "{}{}".format(base, index) in self.nodes:
+            index += 1
+        self._name_counters[base] = index
+        return "{}{}".format(base, index)
+
+    def warning(self, message):
+        self.warnings.append(message)
+        logger.warning(message)
+
+    def exists(self, node):
+        return str(node) in self.nodes
+
+    def node_type(self, node):
+        return self.nodes[str(node)].type
+
+    def create_node(self, node_type, name=None, parent=None):
+        if node_type in self.SHAPE_TYPES and parent is None:
+            parent = self.create_node("transform")
+        tracing.count("nodes_created")
+        name = self.unique_name(name or node_type + "1")
+        self.nodes[name] = MemoryNode(name, node_type, parent)
+        return name
+
+    def get_parent(self, node):
+        return self.nodes[str(node)].parent
+
+    def delete(self, nodes):
+        # children index built once, bulk deletes stay linear in the scene size
+        children = {}
+        for node in self.nodes.values():
+            if node.parent:
+                children.setdefault(node.parent, []).append(node.name)
+
+        deleted = set()
+        queue = deque(str(x) for x in nodes)
+        while queue:
+            name = queue.popleft()
+            if name in deleted or name not in self.nodes:
+                continue
+            deleted.add(name)
+            queue.extend(children.get(name, []))
+
+        for name in deleted:
+            del self.nodes[name]
+        for node in self.nodes.values():
+            for attr in [x for x in node.inputs if node.inputs[x][0] in deleted]:
+                del node.inputs[attr]
+
+    def set_attr(self, node, attr, value):
+        self.nodes[str(node)].attrs[attr] = value
+
+    def get_attr(self, node, attr):
+        return self.nodes[str(node)].attrs.get(attr)
+
+    def connect(self, source, destination):
+        """
+        connects two plugs given as node.attr
+        :param source: source plug
+        :param destination: destination plug
+        :return:
+        """
+        source_node, source_attr = source.split(".", 1)
+        destination_node, destination_attr = destination.split(".", 1)
+        self.nodes[destination_node].inputs[destination_attr] = (source_node, source_attr)
+
+    def create_shader(self, shader_type):
+        shader = self.create_node(shader_type)
+        sg = self.create_node("shadingEngine", shader + "SG")
+        self.connect(shader + ".outColor", sg + ".surfaceShader")
+        return (shader, sg)
+
+    def scan_shading_network(self, shading_engine, switch_type="aiSwitch", input_name="input", path_attr="fileTextureName"):
+        root = self.nodes[str(shading_engine)]
+        numbered_input = re.compile(r"^{0}(\d+)$|^{0}\[(\d+)\]".format(re.escape(input_name)))
+
+        visited = set([root.name])
+        queue = deque(root.inputs[x][0] for x in SHADING_ENGINE_PLUGS if x in root.inputs)
+        switches = {}
+
+        while queue:
+            name = queue.popleft()
+            if name in visited:
+                continue
+            visited.add(name)
+            node = self.nodes[name]
+
+            if node.type != switch_type:
+                queue.extend(x[0] for x in node.inputs.values())
+                continue
+
+            # stop at the switch and snapshot its inputs
+            inputs = {}
+            for attr in node.inputs:
+                match = numbered_input.match(attr)
+                if not match:
+                    continue
+                source = self.nodes[node.inputs[attr][0]]
+                inputs[int(match.group(1) or match.group(2))] = (source.name, source.attrs.get(path_attr))
+            switches[name] = inputs
+
+        tracing.count("graph_nodes_walked", len(visited))
+
+        return switches
+
+    def find_switch_drivers(self, switches, driver_type="floatConstant", index_attr="index"):
+        visited = set()
+        queue = deque(self.nodes[str(x)].inputs[index_attr][0] for x in switches
+                      if index_attr in self.nodes[str(x)].inputs)
+        drivers = set()
+
+        while queue:
+            name = queue.popleft()
+            if name in visited:
+                continue
+            visited.add(name)
+            node = self.nodes[name]
+
+            if node.type == driver_type:
+                drivers.add(name)
+                continue
+            queue.extend(x[0] for x in node.inputs.values())
+
+        tracing.count("graph_nodes_walked", len(visited))
+
+        return sorted(drivers)
+
+    def list_node_names(self):
+        # dag nodes only, like ls -dag, nodes created by a build don't change the selectors compiled against it
+        return [x.name for x in self.nodes.values() if x.type == "transform" or x.type in self.SHAPE_TYPES]
+
+    def list_nodes(self, node_type):
+        return [x.name for x in self.nodes.values() if x.type == node_type]
+
+    def list_descendant_shapes(self, roots):
+        children = {}
+        for node in self.nodes.values():
+            if node.parent:
+                children.setdefault(node.parent, []).append(node.name)
+
+        result = {}
+        for root in roots:
+            root = str(root)
+            if root not in self.nodes:
+                continue
+            shapes = []
+            queue = deque([root])
+            while queue:
+                name = queue.popleft()
+                if self.nodes[name].type in self.SHAPE_TYPES:
+                    shapes.append(name)
+                queue.extend(children.get(name, []))
+            result[root] = shapes
+        return result
+
+    def get_assigned_geometry(self, shading_engine):
+        node = self.nodes[str(shading_engine)]
+        transforms = []
+        for attr in sorted(node.inputs):
+            if not attr.startswith("dagSetMembers"):
+                continue
+            shape = node.inputs[attr][0]
+            transform = self.nodes[shape].parent or shape
+            if transform not in transforms:
+                transforms.append(transform)
+        return transforms
+
+    @contextmanager
+    def undo_chunk(self, name):
+        # no undo queue in memory
+        yield
+
+    def get_keys(self, node, attr):
+        return dict(self.keys.get((str(node), attr), {}))
+
+    def set_keys(self, node, attr, keys):
+        self.keys[(str(node), attr)] = dict(keys)
+
+    def render_setup(self):
+        return self._render_setup
+
+    def delete_render_layers(self, rs, layers):
+        names = []
+        for layer in layers:
+            rs.detachRenderLayer(layer)
+            names.append(layer.name())
+            queue = deque(layer.getCollections())
+            while queue:
+                coll = queue.popleft()
+                names.append(coll.name())
+                for child in coll.getChildren():
+                    if isinstance(child, MemoryCollection):
+                        queue.append(child)
+                    else:
+                        names.append(child.name())
+        self.delete(names)
+        tracing.count("layers_deleted", len(layers))
+
+    def prefs_dir(self):
+        return self._prefs_dir
+
+
+class MemoryRenderSetupNode(object):
+    """
+    base of the in memory render setup model, every object is a node of the backend scene
+    """
+
+    type_name = None
+
+    def __init__(self, backend, name):
+        self._backend = backend
+        self._name = backend.create_node(self.type_name, name)
+
+    def name(self):
+        return self._name
+
+    def setName(self, name):
+        node = self._backend.nodes.pop(self._name)
+        node.name = self._backend.unique_name(name)
+        self._backend.nodes[node.name] = node
+        self._name = node.name
+
+    def typeName(self):
+        return self.type_name
+
+    def encode(self, notes=None):
+        return {self.type_name: self._encode_properties()}
+
+    def _encode_properties(self):
+        return {"name": self._name}
+
+
+class MemoryRenderSetup(MemoryRenderSetupNode):
+
+    type_name = "renderSetup"
+
+    def __init__(self, backend):
+        super(MemoryRenderSetup, self).__init__(backend, "renderSetup")
+        self._layers = []
+
+    def createRenderLayer(self, name):
+        layer = MemoryRenderLayer(self._backend, name)
+        self._layers.append(layer)
+        return layer
+
+    def getRenderLayers(self):
+        return list(self._layers)
+
+    def getRenderLayer(self, name):
+        for layer in self._layers:
+            if layer.name() == name:
+                return layer
+        return None
+
+    def detachRenderLayer(self, layer):
+        self._layers.remove(layer)
+
+    def _encode_properties(self):
+        return {"renderLayers": [x.encode() for x in self._layers]}
+
+    def decode(self, data, behavior, prepend_to_name):
+        for encoded_layer in data[self.type_name].get("renderLayers", []):
+            properties = encoded_layer[MemoryRenderLayer.type_name]
+            layer = self.getRenderLayer(properties["name"]) or self.createRenderLayer(properties["name"])
+            layer.decode_properties(properties)
+
+
+class MemoryStaticSelection(object):
+
+    def __init__(self):
+        self._members = []
+
+    def add(self, names):
+        self._members.extend(x for x in names if x not in self._members)
+
+    def set(self, names):
+        self._members = list(names)
+
+    def asList(self):
+        return list(self._members)
+
+
+class MemorySelector(object):
+
+    def __init__(self):
+        self._pattern = ""
+        self._filter_type = None
+        self._custom_filter = ""
+        self.staticSelection = MemoryStaticSelection()
+
+    def setPattern(self, pattern):
+        self._pattern = pattern
+
+    def getPattern(self):
+        return self._pattern
+
+    def setFilterType(self, filter_type):
+        self._filter_type = filter_type
+
+    def getFilterType(self):
+        return self._filter_type
+
+    def setCustomFilterValue(self, value):
+        self._custom_filter = value
+
+    def getCustomFilterValue(self):
+        return self._custom_filter
+
+    def encode(self):
+        return {"simpleSelector": {"pattern": self._pattern, "typeFilter": self._filter_type,
+                                   "customFilterValue": self._custom_filter,
+                                   "staticSelection": "\n".join(self.staticSelection.asList())}}
+
+    def decode(self, data):
+        properties = data["simpleSelector"]
+        self._pattern = properties["pattern"]
+        self._filter_type = properties["typeFilter"]
+        self._custom_filter = properties["customFilterValue"]
+        self.staticSelection.set([x for x in properties.get("staticSelection", "").split("\n") if x])
+
+
+class MemoryOverride(MemoryRenderSetupNode):
+
+    type_name = "absOverride"
+
+    def __init__(self, backend, name, attr_name=None):
+        super(MemoryOverride, self).__init__(backend, name)
+        self._attr_name = attr_name
+        self._value = None
+
+    def attributeName(self):
+        return self._attr_name
+
+    def setAttrValue(self, value):
+        self._value = value
+
+    def getAttrValue(self):
+        return self._value
+
+    def _encode_properties(self):
+        # same keys as the maya override encoding
+        return {"name": self._name, "attribute": self._attr_name, "attrValue": self._value}
+
+    def decode_properties(self, properties):
+        self._attr_name = properties["attribute"]
+        self._value = properties["attrValue"]
+
+
+class MemoryMaterialOverride(MemoryRenderSetupNode):
+
+    type_name = "materialOverride"
+
+    def __init__(self, backend, name):
+        super(MemoryMaterialOverride, self).__init__(backend, name)
+        self._source = None
+
+    def setSource(self, source):
+        self._source = source
+
+    def getSource(self):
+        return self._source
+
+    def _encode_properties(self):
+        return {"name": self._name, "connectionStr": self._source}
+
+    def decode_properties(self, properties):
+        self._source = properties["connectionStr"]
+
+
+class MemoryCollection(MemoryRenderSetupNode):
+
+    type_name = "collection"
+
+    def __init__(self, backend, name):
+        super(MemoryCollection, self).__init__(backend, name)
+        self._selector = MemorySelector()
+        self._children = []
+
+    def getSelector(self):
+        return self._selector
+
+    def getChildren(self):
+        return list(self._children)
+
+    def getCollections(self):
+        return [x for x in self._children if isinstance(x, MemoryCollection)]
+
+    def getOverrides(self):
+        return [x for x in self._children if not isinstance(x, MemoryCollection)]
+
+    def createCollection(self, name):
+        child = MemoryCollection(self._backend, name)
+        self._children.append(child)
+        return child
+
+    def createOverride(self, name, type_id):
+        if type_id == self._backend.material_override:
+            child = MemoryMaterialOverride(self._backend, name)
+        else:
+            child = MemoryOverride(self._backend, name)
+        self._children.append(child)
+        return child
+
+    def createAbsoluteOverride(self, node_name, attr_name):
+        if not self._backend.exists(node_name):
+            raise RuntimeError("Node {} doesn't exist".format(node_name))
+        child = MemoryOverride(self._backend, attr_name, attr_name)
+        child.setAttrValue(self._backend.get_attr(node_name, attr_name))
+        self._children.append(child)
+        return child
+
+    def _encode_properties(self):
+        return {"name": self._name, "selector": self._selector.encode(),
+                "children": [x.encode() for x in self._children]}
+
+    def decode_properties(self, properties):
+        self._selector.decode(properties["selector"])
+        for encoded_child in properties.get("children", []):
+            type_name = list(encoded_child)[0]
+            child_properties = encoded_child[type_name]
+            child = MEMORY_TYPES[type_name](self._backend, child_properties["name"])
+            child.decode_properties(child_properties)
+            self._children.append(child)
+
+
+class MemoryRenderSettingsCollection(MemoryCollection):
+
+    type_name = "renderSettingsCollection"
+
+
+class MemoryRenderLayer(MemoryRenderSetupNode):
+
+    type_name = "renderSetupLayer"
+
+    def __init__(self, backend, name):
+        super(MemoryRenderLayer, self).__init__(backend, name)
+        self._collections = []
+        self._settings = None
+
+    def createCollection(self, name):
+        child = MemoryCollection(self._backend, name)
+        self._collections.append(child)
+        return child
+
+    def getCollections(self):
+        return list(self._collections)
+
+    def renderSettingsCollectionInstance(self):
+        if self._settings is None:
+            self._settings = MemoryRenderSettingsCollection(self._backend, self._name + "_renderSettings")
+            self._collections.insert(0, self._settings)
+        return self._settings
+
+    def _encode_properties(self):
+        return {"name": self._name, "collections": [x.encode() for x in self._collections]}
+
+    def decode_properties(self, properties):
+        for encoded_collection in properties.get("collections", []):
+            type_name = list(encoded_collection)[0]
+            collection_properties = encoded_collection[type_name]
+            if type_name == MemoryRenderSettingsCollection.type_name:
+                child = self.renderSettingsCollectionInstance()
+            else:
+                child = self.createCollection(collection_properties["name"])
+            child.decode_properties(collection_properties)
+
+
+# encoded type name and class, used to decode children
+MEMORY_TYPES = dict((x.type_name, x) for x in [MemoryCollection, MemoryRenderSettingsCollection, MemoryOverride,
+                                                MemoryMaterialOverride])
@@ -0,0 +1,307 @@
+"""
+Headless batch build of render setups across scenes.
+
+Runs under mayapy, every scene is built in its own worker process:
+
+    mayapy batch.py jobs.json --workers 4 --timeout 900 --summary summary.json
+
+jobs.json holds a list of jobs:
+
+    [
+        {
+            "scene": "/path/to/scene.ma",
+            "shader": "elements_asset_sg",
+            "geo": ["asset_grp"],
+            "shadow_geo": ["ground_geo"],
+            "background": "background_grp",
+            "asset_name": "asset",
+            "category": "asset",
+            "mode": "layers",
+            "preflight": "skip",
+            "tx": "convert",
+            "output": "/path/to/scene_shuffle.ma",
+            "manifest": "/path/to/scene_shuffle_manifest.json"
+        }
+    ]
+
+Only scene, shader and geo are required, jobs missing one of them or with an unknown mode, preflight or tx
+value fail without starting a worker. Without output the scene is saved in place.
+preflight checks all textures before the build : "report" only reports broken variations,
+"skip" doesn't build them, "fail" fails the job and "off" disables the check.
+tx checks every texture for an up to date .tx file next to it : "report" only lists missing and stale ones,
+"convert" generates them with the converter set in KONG_RENDER_SETUP_TX_CONVERTER, maketx by default,
+"off" disables the check, which is the default.
+manifest is an optional json or csv file every built layer gets listed in, see manifest.py.
+The frames mode writes the frame to variation mapping to frame_mapping, by default next to the saved scene as
+<scene>_<asset_name>_frames.json.
+"""
+
+# Import built-in modules
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Logger
+import logging
+
+logging.basicConfig()
+logger = logging.getLogger('Kong Render Setup')
+logger.setLevel(logging.INFO)
+
+DEFAULT_BACKGROUND = "background_grp"
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 1800
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+
+PREFLIGHT_OFF = "off"
+PREFLIGHT_REPORT = "report"
+PREFLIGHT_SKIP = "skip"
+PREFLIGHT_FAIL = "fail"
+PREFLIGHT_MODES = [PREFLIGHT_OFF, PREFLIGHT_REPORT, PREFLIGHT_SKIP, PREFLIGHT_FAIL]
+DEFAULT_PREFLIGHT = PREFLIGHT_REPORT
+
+TX_OFF = "off"
+TX_REPORT = "report"
+TX_CONVERT = "convert"
+TX_MODES = [TX_OFF, TX_REPORT, TX_CONVERT]
+DEFAULT_TX = TX_OFF
+
+REQUIRED_KEYS = ["scene", "shader", "geo"]
+
+
+def validate_job(job):
+    """
+    checks a job spec for the required keys and known modes
+    :param job: dict with the job spec
+    :return: str error message or None if the job is valid
+    """
+    from dw_kong_render_setup import functions
+
+    if not isinstance(job, dict):
+        return "Job is not a dict : {}".format(job)
+    missing = [x for x in REQUIRED_KEYS if not job.get(x)]
+    if missing:
+        return "Job is missing {}".format(", ".join(missing))
+
+    for key, values in (("mode", functions.BUILD_MODES), ("preflight", PREFLIGHT_MODES), ("tx", TX_MODES)):
+        if key in job and job[key] not in values:
+            return "Unknown {} {}, expected one of {}".format(key, job[key], ", ".join(values))
+    return None
+
+
+def run_job(job):
+    """
+    builds the render setup for a single job, expects an initialized maya standalone session
+    :param job: dict with the job spec
+    :return: dict with the job result
+    """
+    import maya.cmds as cmds
+
+    from dw_kong_render_setup import backend as scene_backend
+    from dw_kong_render_setup import functions
+    from dw_kong_render_setup import preflight
+    from dw_kong_render_setup import manifest
+
+    error = validate_job(job)
+    if error:
+        return {"status": STATUS_FAILED, "error": error}
+
+    if not cmds.pluginInfo("mtoa", query=True, loaded=True):
+        cmds.loadPlugin("mtoa", quiet=True)
+
+    cmds.file(job["scene"], open=True, force=True)
+
+    backend = scene_backend.get_backend()
+
+    if not backend.exists(job["shader"]):
+        return {"status": STATUS_FAILED, "error": "Shader {} not found".format(job["shader"])}
+
+    shader_result = functions.load_selected_shader([job["shader"]], backend=backend)
+    if not shader_result or not shader_result[0]:
+        return {"status": STATUS_FAILED, "error": "Couldn't load shader {}".format(job["shader"])}
+
+    valid, shader, asset_name, variations = shader_result
+    asset_name = job.get("asset_name") or asset_name
+    filename_prefix = functions.build_filename_prefix(job.get("category") or asset_name)
+
+    preflight_mode = job.get("preflight", DEFAULT_PREFLIGHT)
+    broken = []
+    if preflight_mode != PREFLIGHT_OFF:
+        broken = preflight.get_broken_variations(preflight.run_preflight(shader, variations))
+        if broken and preflight_mode == PREFLIGHT_FAIL:
+            return {"status": STATUS_FAILED, "error": "Broken textures in {}".format(", ".join(broken)),
+                    "broken": broken}
+
+    skip = broken if preflight_mode == PREFLIGHT_SKIP else []
+
+    tx_mode = job.get("tx", DEFAULT_TX)
+    tx = None
+    if tx_mode != TX_OFF:
+        tx_report = preflight.run_tx_preflight(shader, convert=tx_mode == TX_CONVERT)
+        tx = {"missing": len(tx_report["missing"]), "stale": len(tx_report["stale"]),
+              "converted": len([x for x in tx_report["conversions"] if not x["error"]]),
+              "failed": preflight.get_failed_conversions(tx_report)}
+
+    journal = functions.build_render_setup(job["geo"], job.get("shadow_geo", []), asset_name, filename_prefix, shader,
+                                 variations, job.get("background", DEFAULT_BACKGROUND),
+                                 job.get("mode", functions.BUILD_MODE_LAYERS), skip=skip)
+
+    if job.get("mode") == functions.BUILD_MODE_FRAMES:
+        built = dict((x, variations[x]) for x in variations if variations[x] not in skip)
+        mapping_path = job.get("frame_mapping") or functions.get_frame_mapping_path(job.get("output") or job["scene"],
+                                                                                   asset_name)
+        functions.write_frame_mapping(built, mapping_path)
+
+    if job.get("manifest"):
+        manifest.write_manifest(manifest.build_manifest(asset_name), job["manifest"])
+
+    output = job.get("output")
+    if output:
+        cmds.file(rename=output)
+    cmds.file(save=True, force=True)
+
+    # the frames mode builds a single layer, layers up to date from a previous build aren't created again
+    return {"status": STATUS_OK, "asset_name": asset_name, "layers": len(journal["layers"]), "broken": broken,
+            "tx": tx, "output": cmds.file(q=True, sn=True)}
+
+
+def run_worker(job_path, result_path):
+    """
+    worker process entry, initializes maya standalone, runs a single job and writes its result
+    :param job_path: path of the json file holding the job spec
+    :param result_path: path the json result gets written to
+    :return: exit code
+    """
+    with open(job_path) as f:
+        job = json.load(f)
+
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+        result = run_job(job)
+    except Exception as e:
+        logger.exception("Job for {} failed".format(job.get("scene")))
+        result = {"status": STATUS_FAILED, "error": str(e)}
+
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+    return 0 if result["status"] == STATUS_OK else 1
+
+
+def run_job_process(job, executable, timeout):
+    """
+    runs a single job in its own worker process
+    :param job: dict with the job spec
+    :param executable: python executable to run the worker with, mayapy
+    :param timeout: seconds after which the worker gets killed
+    :return: dict with the job result
+    """
+    error = validate_job(job)
+    if error:
+        logger.error("{} : {}".format(STATUS_FAILED, error))
+        scene, shader = (job.get("scene"), job.get("shader")) if isinstance(job, dict) else (None, None)
+        return {"status": STATUS_FAILED, "error": error, "scene": scene, "shader": shader, "duration": 0.0}
+
+    temp_dir = tempfile.mkdtemp(prefix="kong_batch_")
+    job_path = os.path.join(temp_dir, "job.json")
+    result_path = os.path.join(temp_dir, "result.json")
+
+    with open(job_path, "w") as f:
+        json.dump(job, f)
+
+    cmd = [executable, os.path.abspath(__file__), "--worker", job_path, result_path]
+    start = time.time()
+
+    try:
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+        if os.path.isfile(result_path):
+            with open(result_path) as f:
+                result = json.load(f)
+        else:
+            output = process.stdout.decode("utf-8", "replace")
+            result = {"status": STATUS_FAILED, "error": "Worker exited with {} : {}".format(process.returncode, output[-2000:])}
+    except subprocess.TimeoutExpired:
+        result = {"status": STATUS_TIMEOUT, "error": "Worker killed after {}s".format(timeout)}
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    result["scene"] = job["scene"]
+    result["shader"] = job["shader"]
+    result["duration"] = round(time.time() - start, 3)
+
+    logger.info("{} : {} {} in {}s".format(result["status"], job["scene"], job["shader"], result["duration"]))
+
+    return result
+
+
+def run_jobs(jobs, workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, executable=None):
+    """
+    runs all jobs in a pool of worker processes, one scene per worker
+    :param jobs: list of job specs
+    :param workers: max number of concurrent worker processes
+    :param timeout: seconds per job after which its worker gets killed
+    :param executable: python executable for the workers, defaults to the current one
+    :return: dict with the summary of all jobs
+    """
+    executable = executable or sys.executable
+    start = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda job: run_job_process(job, executable, timeout), jobs))
+
+    summary = {
+        "jobs": len(jobs),
+        "ok": len([x for x in results if x["status"] == STATUS_OK]),
+        "failed": len([x for x in results if x["status"] == STATUS_FAILED]),
+        "timeout": len([x for x in results if x["status"] == STATUS_TIMEOUT]),
+        "duration": round(time.time() - start, 3),
+        "results": results,
+    }
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build render setups for a list of scenes without ui.")
+    parser.add_argument("jobs", nargs="?", help="json file with the list of jobs")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="max number of concurrent scenes")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per scene before it gets killed")
+    parser.add_argument("--summary", help="json file the summary gets written to, printed if not given")
+    parser.add_argument("--mayapy", help="mayapy executable for the workers, defaults to the current interpreter")
+    parser.add_argument("--worker", nargs=2, metavar=("JOB", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(*args.worker)
+
+    if not args.jobs:
+        parser.error("No jobs file given.")
+
+    with open(args.jobs) as f:
+        jobs = json.load(f)
+
+    summary = run_jobs(jobs, args.workers, args.timeout, args.mayapy)
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=4)
+    else:
+        print(json.dumps(summary, indent=4))
+
+    return 0 if summary["ok"] == summary["jobs"] else 1
+
+
+if __name__ == "__main__":
+    # make the package importable when run as a script
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.exit(main())
@@ -0,0 +1,383 @@
+"""
+Benchmarks for shader loading and layer building on synthetic scenes.
+
+Runs on the in memory backend, no maya needed:
+
+    python benchmark.py --output results.json
+    python benchmark.py --quick --output new.json --compare results.json
+
+Every case of the size grid is timed per stage, results are written as json and can be
+compared against a previous run, stages slower than the threshold are reported as regressions.
+The default grid takes minutes, --full runs every size the tool is expected to handle and takes hours.
+"""
+
+# Import built-in modules
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import subprocess
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+# size grid, variations per switch, channels with a switch, content objects and history depth
+# the default grid runs in a few minutes, so it can be compared between commits
+GRID = {
+    "variations": [1, 50, 500],
+    "channels": [1, 7],
+    "content": [10, 1000, 10000],
+    "depth": [1, 10],
+}
+
+# every size the tool is expected to handle, takes hours
+FULL_GRID = {
+    "variations": [1, 10, 50, 100, 500],
+    "channels": [1, 4, 7],
+    "content": [10, 1000, 10000, 50000],
+    "depth": [1, 10, 50],
+}
+
+QUICK_GRID = {
+    "variations": [1, 50],
+    "channels": [1, 7],
+    "content": [10, 1000],
+    "depth": [1, 10],
+}
+
+DEFAULT_REPEAT = 3
+
+# content objects per group, every second run of objects is picked as a group instead of one by one
+GROUP_SIZE = 100
+DEFAULT_THRESHOLD = 1.25
+
+# seconds a cold import of functions may take, that's what the ui imports besides qt
+IMPORT_BUDGET = 0.05
+# packages that must not be imported with functions, they are deferred to the actions that need them
+DEFERRED_MODULES = ["pymel", "maya", "sqlite3", "subprocess"]
+
+IMPORT_SNIPPET = """
+import sys, time, json
+before = set(sys.modules)
+start = time.perf_counter()
+import dw_kong_render_setup.functions
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": sorted(set(sys.modules) - before)}))
+"""
+
+CHANNEL_ATTRS = {"clr": "baseColor", "dsp": "displacement", "mtl": "metalness", "nrm": "normalCamera",
+                 "opc": "opacity", "rgh": "specularRoughness", "emn": "emissionColor"}
+
+
+def build_synthetic_scene(backend, asset_name, variations, channels, depth):
+    """
+    builds a synthetic asset shading network in a backend
+    every channel gets a switch with one file per variation, all switches are driven by a shared floatConstant,
+    depth adds a chain of nodes between switch and shader and geometry history behind the shading engine
+    :param backend: MemoryBackend
+    :param asset_name: name of the asset
+    :param variations: number of variations per switch
+    :param channels: number of channels with a switch, max 7
+    :param depth: length of the node chains
+    :return: str name of the shading engine
+    """
+    from dw_kong_render_setup import channels as channel_registry
+
+    sg = backend.create_node("shadingEngine", "elements_{}_sg".format(asset_name))
+    shader = backend.create_node("aiStandardSurface", "{}_shd".format(asset_name))
+    backend.connect(shader + ".outColor", sg + ".surfaceShader")
+
+    # a single floatConstant drives the index of every switch, the variation layers override it
+    switch_index = backend.create_node("floatConstant", "{}_switch_index".format(asset_name))
+
+    for channel in [x["name"] for x in channel_registry.DEFAULT_CONFIG["channels"]][:channels]:
+        switch = backend.create_node("aiSwitch", "{}_{}_switch".format(asset_name, channel))
+        backend.connect(switch_index + ".outFloat", switch + ".index")
+
+        # chain of correction nodes between switch and shader
+        upstream = switch
+        for x in range(depth):
+            node = backend.create_node("aiColorCorrect")
+            backend.connect(upstream + ".outColor", node + ".input")
+            upstream = node
+        backend.connect(upstream + ".outColor", shader + "." + CHANNEL_ATTRS[channel])
+
+        for index in range(variations):
+            file_node = backend.create_node("file")
+            place = backend.create_node("place2dTexture")
+            backend.connect(place + ".outUV", file_node + ".uvCoord")
+            path = "/textures/{0}/var{1:03d}/v001/{0}_{2}.exr".format(asset_name, index, channel)
+            backend.set_attr(file_node, "fileTextureName", path)
+            backend.connect(file_node + ".outColor", switch + ".input{}".format(index))
+
+    # geometry history behind the shading engine, never part of the shading network
+    upstream = None
+    for x in range(depth):
+        node = backend.create_node("polyExtrudeFace")
+        if upstream:
+            backend.connect(upstream + ".output", node + ".inputPolymesh")
+        upstream = node
+    shape = backend.create_node("mesh", "{}Shape".format(asset_name))
+    if upstream:
+        backend.connect(upstream + ".output", shape + ".inMesh")
+    backend.connect(shape + ".instObjGroups", sg + ".dagSetMembers")
+
+    return sg
+
+
+def build_content(count, namespaces=10):
+    """
+    builds a list of content object names spread over namespaces
+    :param count: number of objects
+    :param namespaces: number of namespaces
+    :return: list of str
+    """
+    return ["asset{}:geo_{:05d}".format(x % namespaces, x) for x in range(count)]
+
+
+def build_content_nodes(backend, content, group_size=GROUP_SIZE):
+    """
+    creates a transform with a shape for every content object, every second run of objects below a group
+    :param backend: MemoryBackend
+    :param content: list of object names, from build_content
+    :param group_size: objects per run
+    :return: list of the groups and ungrouped transforms, the content as picked in the ui
+    """
+    roots = []
+    for start in range(0, len(content), group_size):
+        chunk = content[start:start + group_size]
+        group = None
+        if (start // group_size) % 2:
+            group = backend.create_node("transform", chunk[0] + "_grp")
+            roots.append(group)
+        for name in chunk:
+            transform = backend.create_node("transform", name, parent=group)
+            backend.create_node("mesh", name + "Shape", parent=transform)
+            if group is None:
+                roots.append(transform)
+    return roots
+
+
+def time_call(func, repeat):
+    """
+    times a callable, returns the fastest of repeat runs
+    :param func: callable without arguments
+    :param repeat: number of runs
+    :return: float seconds
+    """
+    timings = []
+    for x in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_case(variations, channels, content, depth, repeat=DEFAULT_REPEAT):
+    """
+    times every stage for one size case
+    :return: dict with stage name and seconds
+    """
+    from dw_kong_render_setup import functions
+    from dw_kong_render_setup import patterns
+    from dw_kong_render_setup.backend import MemoryBackend
+
+    content_list = build_content(content)
+    timings = {}
+
+    def load():
+        backend = MemoryBackend()
+        sg = build_synthetic_scene(backend, "bench", variations, channels, depth)
+        start = time.perf_counter()
+        functions.load_selected_shader([sg], backend=backend)
+        return time.perf_counter() - start
+
+    timings["load_selected_shader"] = min(load() for x in range(repeat))
+
+    timings["build_search_string"] = time_call(lambda: functions.build_search_string(content_list), repeat)
+
+    # scene names for the selector, the content plus as many unrelated objects
+    scene_names = content_list + ["other{}:geo_{:05d}".format(x % 10, x) for x in range(content)]
+    timings["compile_selector"] = time_call(lambda: patterns.compile_selector(content_list, scene_names), repeat)
+
+    name_index = patterns.build_name_index(scene_names)
+    search_string = functions.build_search_string(content_list)
+    timings["preview_expression"] = time_call(lambda: patterns.preview_expression(search_string, name_index), repeat)
+
+    for mode in functions.BUILD_MODES:
+        def build():
+            backend = MemoryBackend()
+            sg = build_synthetic_scene(backend, "bench", variations, channels, depth)
+            roots = build_content_nodes(backend, content_list)
+            shadow_roots = build_content_nodes(backend, ["ground"])
+            var_dict = functions.load_selected_shader([sg], backend=backend)[3]
+            args = ("bench", "shuffle/bench/<RenderLayer>", sg, var_dict, "background_grp", mode)
+
+            start = time.perf_counter()
+            functions.build_render_setup(roots, shadow_roots, *args, backend=backend)
+            build_seconds = time.perf_counter() - start
+
+            # a picked object less, every layer updates its content selector
+            start = time.perf_counter()
+            functions.build_render_setup(roots[1:], shadow_roots, *args, backend=backend)
+            return build_seconds, time.perf_counter() - start
+
+        results = [build() for x in range(repeat)]
+        timings["build_render_setup_{}".format(mode)] = min(x[0] for x in results)
+        timings["rebuild_render_setup_{}".format(mode)] = min(x[1] for x in results)
+
+    return timings
+
+
+def measure_startup(repeat=DEFAULT_REPEAT):
+    """
+    measures the cold import of functions in fresh interpreters
+    :param repeat: number of interpreters, the fastest import counts
+    :return: dict with import seconds and the deferred modules that got imported anyway
+    """
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join([package_root] + [x for x in [env.get("PYTHONPATH")] if x])
+
+    timings = []
+    modules = []
+    for x in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], env=env)
+        result = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        modules = result["modules"]
+
+    deferred = [x for x in modules if x.split(".")[0] in DEFERRED_MODULES]
+
+    return {"import_functions": min(timings), "budget": IMPORT_BUDGET, "deferred_modules_imported": deferred}
+
+
+def case_key(case):
+    return "v{variations}_c{channels}_n{content}_d{depth}".format(**case)
+
+
+def run_grid(grid, repeat=DEFAULT_REPEAT):
+    """
+    runs every case of a size grid
+    :param grid: dict with variations, channels, content and depth lists
+    :param repeat: runs per stage, the fastest one counts
+    :return: dict with the results
+    """
+    names = ["variations", "channels", "content", "depth"]
+    cases = {}
+
+    startup = measure_startup(repeat)
+    cases["startup"] = {"timings": {"import_functions": startup["import_functions"]}}
+    print("{:<32} {:.3f}s (budget {:.3f}s)".format("startup", startup["import_functions"], IMPORT_BUDGET))
+
+    for values in itertools.product(*[grid[x] for x in names]):
+        case = dict(zip(names, values))
+        key = case_key(case)
+        start = time.perf_counter()
+        case["timings"] = run_case(case["variations"], case["channels"], case["content"], case["depth"], repeat)
+        cases[key] = case
+        print("{:<32} {:.3f}s".format(key, time.perf_counter() - start))
+
+    return {"commit": get_commit(), "time": time.strftime("%Y-%m-%d %H:%M:%S"), "repeat": repeat, "cases": cases,
+            "startup": startup}
+
+
+def get_commit():
+    """
+    :return: str current git commit of the tool or None
+    """
+    try:
+        output = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                         cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.STDOUT)
+        return output.decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, results, threshold=DEFAULT_THRESHOLD, min_seconds=0.001):
+    """
+    compares two benchmark results
+    :param baseline: dict with the results to compare against
+    :param results: dict with the new results
+    :param threshold: ratio of new and old timing from which a stage counts as regression
+    :param min_seconds: stages faster than this in both runs are ignored, they are mostly noise
+    :return: list of tuples with case key, stage, old and new seconds
+    """
+    regressions = []
+
+    for key in sorted(results["cases"]):
+        if key not in baseline["cases"]:
+            continue
+        old_timings = baseline["cases"][key]["timings"]
+        new_timings = results["cases"][key]["timings"]
+        for stage in sorted(new_timings):
+            if stage not in old_timings:
+                continue
+            old, new = old_timings[stage], new_timings[stage]
+            if max(old, new) < min_seconds:
+                continue
+            if new > old * threshold:
+                regressions.append((key, stage, old, new))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark shader loading and layer building on synthetic scenes.")
+    parser.add_argument("--output", help="json file the results get written to")
+    parser.add_argument("--quick", action="store_true", help="run the small grid")
+    parser.add_argument("--full", action="store_true", help="run every size, takes hours")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per stage, the fastest one counts")
+    parser.add_argument("--compare", help="json results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown ratio counted as regression")
+    parser.add_argument("--trace", help="chrome trace json file for the whole run, opens in perfetto")
+    args = parser.parse_args(argv)
+
+    # functions sets the level on import, quiet it afterwards
+    from dw_kong_render_setup import functions
+    from dw_kong_render_setup import tracing
+    logger.setLevel(logging.WARNING)
+
+    if args.trace:
+        tracing.enable()
+
+    results = run_grid(QUICK_GRID if args.quick else FULL_GRID if args.full else GRID, args.repeat)
+
+    if args.trace:
+        tracing.export_chrome_trace(args.trace)
+        tracing.disable()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+
+    startup = results["startup"]
+    over_budget = startup["import_functions"] > startup["budget"]
+    if over_budget:
+        print("STARTUP OVER BUDGET : {:.4f}s > {:.4f}s".format(startup["import_functions"], startup["budget"]))
+    if startup["deferred_modules_imported"]:
+        print("STARTUP IMPORTS DEFERRED MODULES : {}".format(", ".join(startup["deferred_modules_imported"])))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for key, stage, old, new in regressions:
+            print("REGRESSION {} {} : {:.4f}s -> {:.4f}s ({:.2f}x)".format(key, stage, old, new, new / old))
+        if regressions:
+            return 1
+
+    if over_budget or startup["deferred_modules_imported"]:
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    # make the package importable when run as a script
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# Import built-in modules
+import time
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+# seconds of work per scheduler tick, the ui stays responsive between ticks
+DEFAULT_BUDGET = 0.05
+# number of last steps the eta is averaged over, early steps are often slower or faster
+ETA_WINDOW = 20
+
+
+class BuildJob(object):
+    """
+    runs a step wise build generator, like functions.iter_build_render_setup, a few steps at a time
+    the caller drives it from maya's main thread, through a qt timer or maya.utils.executeDeferred
+    measures the cost of every step for the eta and rolls back when cancelled or failed
+    """
+
+    def __init__(self, steps, rollback=None, session=None):
+        """
+        :param steps: generator yielding tuples of done steps, total steps and step label
+        :param rollback: optional callable reverting the steps done so far
+        :param session: optional callable returning a context manager every call of step runs in,
+                        like functions.bulk_edit, a session is never left open between two calls, a dropped
+                        timer chain would leave the undo chunk and the refresh suspension open for good,
+                        so a build is an undo step per call and the rollback reverts it from its journal
+        """
+        self._steps = steps
+        self._rollback = rollback
+        self._session = session
+        self._durations = []
+
+        self.done = 0
+        self.total = 0
+        self.label = ""
+        self.finished = False
+        self.cancelled = False
+        self.elapsed = 0.0
+
+    def step(self, budget=DEFAULT_BUDGET):
+        """
+        runs build steps until budget seconds passed or the build is finished
+        a failing step rolls the build back and raises
+        :param budget: seconds of work, at least one step always runs
+        :return: bool True while steps are left
+        """
+        if self._session is None:
+            return self._run_steps(budget)
+        with self._session():
+            return self._run_steps(budget)
+
+    def _run_steps(self, budget):
+        start = time.perf_counter()
+
+        while not self.finished:
+            step_start = time.perf_counter()
+            try:
+                self.done, self.total, self.label = next(self._steps)
+            except StopIteration:
+                self.finished = True
+                break
+            except Exception:
+                self.finished = True
+                logger.exception("Build step failed, rolling back.")
+                self._run_rollback()
+                raise
+            finally:
+                self.elapsed += time.perf_counter() - step_start
+
+            self._durations.append(time.perf_counter() - step_start)
+
+            if time.perf_counter() - start >= budget:
+                break
+
+        return not self.finished
+
+    def run(self):
+        """
+        runs all steps in one go
+        :return:
+        """
+        while self.step(budget=float("inf")):
+            pass
+
+    def eta(self):
+        """
+        :return: estimated seconds left from the measured cost of the last steps, None before the first step
+        """
+        durations = self._durations[-ETA_WINDOW:]
+        if not durations or not self.total:
+            return None
+        return sum(durations) / len(durations) * max(self.total - self.done, 0)
+
+    def progress(self):
+        """
+        :return: float between 0 and 1
+        """
+        if self.finished and not self.cancelled:
+            return 1.0
+        if not self.total:
+            return 0.0
+        return float(self.done) / self.total
+
+    def cancel(self):
+        """
+        stops the build after the current step and rolls back everything done so far
+        :return:
+        """
+        if self.finished:
+            return
+        # closing the generator runs its cleanup, like deleting the override prototypes
+        self._steps.close()
+        self.finished = True
+        self.cancelled = True
+        logger.info("Build cancelled after %s of %s steps.", self.done, self.total)
+        self._run_rollback()
+
+    def _run_rollback(self):
+        if self._rollback:
+            self._rollback()
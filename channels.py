@@ -0,0 +1,170 @@
+"""
+Registry of the texture channels and naming conventions switches and texture paths are parsed with.
+
+The default registry covers the channels of the standard surface setup. A project config replaces it,
+the path is read from the KONG_RENDER_SETUP_CHANNELS environment variable:
+
+    {
+        "channels": [
+            {"name": "clr", "label": "BaseColor", "aliases": ["diffuse"]},
+            {"name": "sss", "label": "Subsurface"},
+            {"name": "coat", "label": "Coat"}
+        ],
+        "switch_pattern": "_{channels}_switch.?$",
+        "version_pattern": "v\\d{3}"
+    }
+
+Channels are listed in priority order, the first channel with a switch provides the variation names.
+switch_pattern is searched in switch names, {channels} stands for the names and aliases of all channels.
+version_pattern matches the version folders of the <root>/<variation>/<version>/<files> texture layout.
+"""
+
+# Import built-in modules
+import os
+import re
+import json
+from collections import namedtuple
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+CONFIG_VARIABLE = "KONG_RENDER_SETUP_CHANNELS"
+
+DEFAULT_CONFIG = {
+    "channels": [
+        {"name": "clr", "label": "BaseColor"},
+        {"name": "dsp", "label": "Height"},
+        {"name": "mtl", "label": "Metalness"},
+        {"name": "nrm", "label": "Normal"},
+        {"name": "opc", "label": "Opacity"},
+        {"name": "rgh", "label": "Roughness"},
+        {"name": "emn", "label": "Emissive"},
+    ],
+    "switch_pattern": "_{channels}_switch.?$",
+    "version_pattern": r"v\d{3}",
+}
+
+# channel names in priority order, labels per channel, lower case token per channel name, label and alias,
+# compiled switch name, version folder and variation path matchers and the config key of the registry
+Registry = namedtuple("Registry", ["channels", "labels", "tokens", "switch", "version", "variation", "key"])
+
+# loaded registry, kept for the session
+_registry = None
+
+
+def compile_registry(config):
+    """
+    compiles a channel config into a registry
+    :param config: dict with channels, switch_pattern and version_pattern, missing keys are taken from the default
+    :return: Registry
+    """
+    settings = dict(DEFAULT_CONFIG)
+    settings.update(config)
+
+    names = []
+    labels = {}
+    tokens = {}
+    for channel in settings["channels"]:
+        name = channel["name"]
+        names.append(name)
+        labels[name] = channel.get("label", name)
+        for token in [name, labels[name]] + list(channel.get("aliases", [])):
+            tokens.setdefault(token.lower(), name)
+
+    # longest tokens first, a channel name that starts another one can't shadow it
+    alternatives = "|".join(re.escape(x) for x in sorted(tokens, key=lambda x: (-len(x), x)))
+    switch = re.compile(settings["switch_pattern"].replace("{channels}", "({})".format(alternatives)), re.IGNORECASE)
+    version = re.compile("^{}$".format(settings["version_pattern"]))
+    variation = re.compile(r"^(?:.*[\/\\]+)(\w+)(?:[\/\\]+)(?:{})".format(settings["version_pattern"]))
+
+    return Registry(names, labels, tokens, switch, version, variation, json.dumps(settings, sort_keys=True))
+
+
+def load_registry(path=None):
+    """
+    loads the registry from a config file and makes it the registry of the session
+    :param path: json config, defaults to the file set in KONG_RENDER_SETUP_CHANNELS, without one the default is used
+    :return: Registry
+    """
+    global _registry
+
+    path = path or os.environ.get(CONFIG_VARIABLE)
+    config = {}
+    if path:
+        try:
+            with open(path) as f:
+                config = json.load(f)
+            logger.info("Loaded channel config %s", path)
+        except (OSError, ValueError) as e:
+            logger.warning("Couldn't read channel config {}, using the default channels : {}".format(path, e))
+
+    try:
+        _registry = compile_registry(config)
+    except (KeyError, TypeError, re.error) as e:
+        logger.warning("Invalid channel config {}, using the default channels : {}".format(path, e))
+        _registry = compile_registry({})
+
+    return _registry
+
+
+def get_registry():
+    """
+    :return: Registry of the session, loaded on first use
+    """
+    return _registry or load_registry()
+
+
+def get_switch_channel(switch, registry=None):
+    """
+    returns the channel a switch drives, from the switch naming
+    :param switch: switch node name
+    :param registry: optional Registry, defaults to the registry of the session
+    :return: str channel or None if the name doesn't contain one
+    """
+    registry = registry or get_registry()
+    match = registry.switch.search(str(switch))
+    if not match:
+        return None
+    return registry.tokens[match.group(1).lower()]
+
+
+def classify_switches(switches, registry=None):
+    """
+    :param switches: list of switch node names
+    :param registry: optional Registry, defaults to the registry of the session
+    :return: dict with switch name and channel or None
+    """
+    registry = registry or get_registry()
+    return dict((x, get_switch_channel(x, registry)) for x in switches)
+
+
+def get_file_channel(file_name, registry=None):
+    """
+    :param file_name: texture file name
+    :param registry: optional Registry, defaults to the registry of the session
+    :return: str channel of the file name token with the highest priority or None if no token is a channel
+    """
+    registry = registry or get_registry()
+    found = set()
+    for token in re.split(r"[_.\-]", os.path.splitext(file_name)[0]):
+        channel = registry.tokens.get(token.lower())
+        if channel:
+            found.add(channel)
+    if not found:
+        return None
+    return min(found, key=registry.channels.index)
+
+
+def get_variation_name(file_path, registry=None):
+    """
+    :param file_path: texture path like <root>/<variation>/<version>/<file>
+    :param registry: optional Registry, defaults to the registry of the session
+    :return: str name of the folder above the version folder or None if the path doesn't follow the layout
+    """
+    registry = registry or get_registry()
+    names = registry.variation.findall(os.path.normpath(str(file_path)))
+    if len(names) != 1:
+        return None
+    return names[0]
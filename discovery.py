@@ -0,0 +1,94 @@
+# Import built-in modules
+import re
+
+# Logger
+import logging
+
+from dw_kong_render_setup import backend as scene_backend
+from dw_kong_render_setup import functions
+from dw_kong_render_setup import tracing
+
+logger = logging.getLogger('Kong Render Setup')
+
+# shading engines of shuffle assets, the group is the asset name
+ASSET_SG_PATTERN = re.compile(r"^elements_(\w+)_sg$")
+
+
+def get_asset_names(shading_engines):
+    """
+    names the assets of shading engines, referenced assets are namespaced but namespaces aren't valid in
+    render layer names and output paths, the namespace only goes into the name when several references
+    of an asset would otherwise share it
+    :param shading_engines: list of asset shading engine names
+    :return: dict with shading engine and asset name
+    """
+    names = dict((x, ASSET_SG_PATTERN.match(x.split(":")[-1]).group(1)) for x in shading_engines)
+    counts = {}
+    for name in names.values():
+        counts[name] = counts.get(name, 0) + 1
+
+    for sg in names:
+        namespace = sg.rpartition(":")[0]
+        if counts[names[sg]] > 1 and namespace:
+            names[sg] = namespace.replace(":", "_") + "_" + names[sg]
+    return names
+
+
+def discover_assets(backend=None):
+    """
+    indexes every asset shading engine of the scene with its switch variations and assigned geometry
+    the shading engines are listed with a single scene query
+    :param backend: scene backend, defaults to the current backend
+    :return: list of dicts with shader, asset_name, variations and geo
+    """
+    backend = backend or scene_backend.get_backend()
+    assets = []
+
+    with tracing.span("discover_assets"):
+        shading_engines = [str(x) for x in backend.list_nodes("shadingEngine")
+                           if ASSET_SG_PATTERN.match(str(x).split(":")[-1])]
+        asset_names = get_asset_names(shading_engines)
+
+        for sg in sorted(shading_engines):
+            result = functions.load_selected_shader([sg], backend=backend)
+            if not result or not result[0]:
+                logger.warning("Couldn't load shader {}. Skipping.".format(sg))
+                continue
+
+            valid, shader, asset_name, variations = result
+            asset_name = asset_names[sg]
+
+            geo = backend.get_assigned_geometry(sg)
+            if not geo:
+                logger.warning("No geometry assigned to {}. Skipping.".format(sg))
+                continue
+
+            assets.append({"shader": shader, "asset_name": asset_name, "variations": variations, "geo": geo})
+
+    logger.info("Discovered %s assets : %s", len(assets), [x["asset_name"] for x in assets])
+
+    return assets
+
+
+def build_assets(assets, content_shadow=None, bg_selector="", mode=functions.BUILD_MODE_LAYERS, backend=None):
+    """
+    builds the render setup of every discovered asset in a single bulk edit session
+    the scene names the collection selectors get compiled against are listed once for all assets
+    :param assets: list of dicts from discover_assets
+    :param content_shadow: content of the shadow catcher, shared by all assets
+    :param bg_selector: background selector pattern
+    :param mode: one of functions.BUILD_MODES
+    :param backend: scene backend, defaults to the current backend
+    :return:
+    """
+    backend = backend or scene_backend.get_backend()
+    content_shadow = content_shadow or []
+
+    with functions.bulk_edit("Kong Build All Assets", backend):
+        with tracing.span("build_assets", assets=len(assets)):
+            names = backend.list_node_names()
+            for asset in assets:
+                filename_prefix = functions.build_filename_prefix(asset["asset_name"])
+                functions.build_render_setup(asset["geo"], content_shadow, asset["asset_name"], filename_prefix,
+                                             asset["shader"], asset["variations"], bg_selector, mode,
+                                             backend=backend, names=names)
@@ -1,383 +1,971 @@
-# Import third-party modules
-import maya.cmds as cmds
-import pymel.core as pmc
-import maya.mel as mel
-import tempfile
-import os
-import re
-
-import subprocess
-
-# Logger
-import logging
-
-# Render Setup
-import maya.app.renderSetup.model.override as override
-import maya.app.renderSetup.model.selector as selector
-import maya.app.renderSetup.model.collection as collection
-import maya.app.renderSetup.model.renderLayer as renderLayer
-import maya.app.renderSetup.model.renderSetup as renderSetup
-from maya.app.renderSetup.model.connectionOverride import MaterialOverride
-
-logging.basicConfig()
-logger = logging.getLogger('Kong Render Setup')
-logger.setLevel(logging.INFO)
-
-NAME_MATCHING = {"clr":"BaseColor", "dsp":"Height", "mtl":"Metalness", "nrm":"Normal", "opc":"Opacity", "rgh":"Roughness", "emn":"Emissive"}
-
-def kill_existing_app(windowName):
-    """Kill the app if it's running.
-
-    Args:
-        windowName (str): Window object name of the app.
-    """
-    if cmds.window(windowName, exists=True, q=True):
-        cmds.deleteUI(windowName)
-
-def show_help():
-
-    help_path = "T:/david.waldhaus/documentation/fixPref/fixPref_documentation.pdf"
-
-    subprocess.Popen(help_path, shell=True)
-
-def is_group(node):
-    try:
-        children = node.getChildren()
-        for child in children:
-            if type(child) is not pmc.nodetypes.Transform:
-                return False
-        return True
-    except:
-        return False
-
-def load_selected_geo():
-
-    sel = pmc.ls(sl=1)
-    if not sel:
-        logger.warning("Nothing selected!")
-        return
-
-    return sel,str(sel)
-
-def load_selected_shader(shader=None):
-    """
-    loads the selected shading engine
-    returns str asset name, dir with plug index and variation name
-    :param shader:
-    :return:
-    """
-
-    valid = False
-    shader = shader
-    asset_name = ""
-    switch_nodes = {}
-    max_input = 0
-
-    # validate that selection is only a single SG node
-
-    if len(shader) != 1:
-        pmc.warning("Please Select only 1 shader!.")
-        return valid, shader, switch_nodes, max_input
-
-    shader = shader[0]
-
-    if not shader.type() == "shadingEngine":
-        pmc.warning("Please Select a Shading Engine Only")
-        return valid, shader, switch_nodes, max_input
-
-    # selection from here on is validated
-    # contains only a single shd engine
-
-    valid = True
-
-    # get asset name from shader naming
-
-    asset_name = str(shader).replace("elements_", "").replace("_sg", "")
-
-    # get switch nodes from sg
-    all_nodes = pmc.listHistory(shader)
-    all_switches = [x for x in all_nodes if x.type() == "aiSwitch"]
-
-    logger.info("Unfiltered Switches : {}".format(all_switches))
-
-    # get plug name for switches, switch is only valid if a plug is found
-
-    switch_dir_unvalidated = {}
-
-    for switch in all_switches:
-        plug = re.findall(r".*_(clr|dsp|mtl|nrm|opc|rgh|emn)_switch.?$", str(switch))
-        if len(plug) == 1:
-            plug = plug[0]
-            switch_dir_unvalidated[plug] = switch
-        else:
-            logger.info("Couldn't identify channel for {}. Skipping.".format(switch))
-
-    logger.info("Ordered the found Switches this way : \n {}".format(switch_dir_unvalidated))
-
-    # validate the found switches against main dict
-
-    switch_dir_validated = {}
-
-    for plug in NAME_MATCHING:
-        if plug in switch_dir_unvalidated:
-            switch_dir_validated[plug] = switch_dir_unvalidated[plug]
-        else:
-            switch_dir_validated[plug] = None
-
-    logger.info("Ordered the Switches! Final List : \n {}".format(switch_dir_validated))
-
-    switch_nodes = switch_dir_validated
-
-    # get max input number
-
-    max_input = 0
-    skipped_slots = []
-
-    for switch in switch_nodes:
-        temp_max = 0
-        for x in range(20):
-            # if no switch node exists for the slot, skip it
-            if switch_nodes[switch]:
-                connection = switch_nodes[switch] + ".input{}".format(x)
-                is_connected = pmc.connectionInfo(connection, isDestination=True)
-                if not is_connected:
-                    continue
-                else:
-                    temp_max += 1
-            else:
-                if not switch in skipped_slots:
-                    skipped_slots.append(switch)
-                continue
-        if temp_max > max_input:
-            max_input = temp_max
-
-    logger.info("Determined max number of switch inputs : {}".format(max_input))
-    logger.info("Skipping switch for the following slots, since no input was found : {}".format(skipped_slots))
-
-    # build a dict with slot number and variation name
-
-    # pick clr switch as base to determine variation names, if thats not available use next best choice
-
-    base_switch = None
-
-    for switch in switch_nodes:
-        if switch_nodes[switch]:
-            base_switch = switch_nodes[switch]
-            break
-        else:
-            continue
-
-    if base_switch:
-        logger.info("Determined {} switch to pick variations from.".format(base_switch))
-    else:
-        logger.warning("Could not determine a base switch. Aborting.")
-        return False
-
-    # iterate over base switches inputs until max input is reached, and get variation name
-
-    variations = {}
-
-    for x in range(max_input):
-        variation_name = ""
-        node = pmc.listConnections(base_switch + ".input{}".format(x))[0]
-        file_path = node.fileTextureName.get()
-        # regex to get folder above version folder
-        variation_name = re.findall(r"^(?:.*[\/\\]+)(\w+)(?:[\/\\]+)(?:v\d{3})", str(os.path.normpath(file_path)))
-        if variation_name:
-            if len(variation_name) == 1:
-                variation_name = variation_name[0]
-            else:
-                logger.warning("Error fetching variation name for path : {}".format(file_path))
-                return False
-        else:
-            logger.warning("Error fetching variation name for path : {}".format(file_path))
-            return False
-
-        variations[x] = variation_name
-
-    return valid, shader, asset_name, variations
-
-def createShader(shaderType):
-    """ Create a shader of the given type"""
-    shaderName = cmds.shadingNode(shaderType, asShader=True)
-    sgName = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name=(shaderName + "SG"))
-    cmds.connectAttr(shaderName + ".outColor", sgName + ".surfaceShader")
-    return (shaderName, sgName)
-
-def build_render_setup(content=None, content_shadow=None, asset_name="default", filename_prefix="", shading_engine="", variations={}, bg_selector=""):
-    """
-    builds the render setup
-    :param content: content of main description
-    :param asset_name: name of the asset, used to build render layer naming
-    :param filename_prefix:  file name prefix set in render layer
-    :param shading_engine: sg for material OR
-    :param variations: dict with variations & indices to build layers for switch variations
-    :return:
-    """
-
-    logger.info("Building Shader with the following Parameters : \n"
-                "Content : {} \n"
-                "Shadow Catch Conent : {} \n"
-                "Background : {} \n"
-                "File Name Prefix : {} \n"
-                "Asset Name : {} \n"
-                "Shading Engine : {} \n"
-                "Var Dict : {}".format(content, content_shadow, bg_selector, filename_prefix, asset_name, shading_engine, variations))
-
-    # iterate over variations dict to build layers for each var
-
-    rs = renderSetup.instance()
-
-    for index in variations:
-
-        # create main render layer
-        layer_name = asset_name + "_" + variations[index]
-        rl = rs.createRenderLayer(layer_name)
-
-        # create render setting override for image path
-        file_prefix = filename_prefix
-
-        settings_coll = rl.renderSettingsCollectionInstance()
-        attr_name = 'imageFilePrefix'
-        override = settings_coll.createAbsoluteOverride('defaultRenderGlobals', attr_name)
-        override.setAttrValue(file_prefix)
-        override.setName(layer_name + '_' + attr_name)
-
-        # create collection for head
-        c_shadow_catcher = rl.createCollection("shadow_catcher")
-        # build list from obj list
-        shdw_string = build_search_string(content_shadow)
-        c_shadow_catcher.getSelector().setPattern(shdw_string)
-        # create shader override
-        ov1 = c_shadow_catcher.createOverride('shadow_catcher', MaterialOverride.kTypeId)
-
-        # check if shadow catcher exists, if not create a new one
-
-        if not pmc.objExists("aiShadowMatte1SG"):
-            shadow_matte_sg = createShader("aiShadowMatte")[-1]
-            logger.info("No existing shadow catcher found, creating new aiShadowMatte: {}".format(shadow_matte_sg))
-        else:
-            shadow_matte_sg = pmc.PyNode("aiShadowMatte1SG")
-            logger.info("Using existing aiShadowMatte as shadow catcher: {}".format(shadow_matte_sg))
-
-        ov1.setSource(str(shadow_matte_sg)+".message")
-   
-        # set self shadows off on shapes
-        """
-        # shape collection gets created automatically
-        c_head_shapes = c_shadow_catcher.createCollection('head_shapes')  # create sub collection
-        c_head_shapes.getSelector().setPattern('*')
-        c_head_shapes.getSelector().setFilterType(selector.Filters.kShapes)
-        """
-        attr_name = 'aiSelfShadows'
-
-        cmds.polyCube(n='dummyObj')
-        or_self_shadows = c_shadow_catcher.createAbsoluteOverride('dummyObjShape', attr_name)
-        or_self_shadows.setName(c_shadow_catcher.name() + "_self_shadows_off")
-        or_self_shadows.setAttrValue(0)
-        cmds.delete('dummyObj')
-
-        # create aov collection and disable all
-        c_aovs = rl.createCollection('aovs_off')  # create sub collection
-        c_aovs.getSelector().setPattern('*')
-        c_aovs.getSelector().setFilterType(selector.Filters.kCustom)
-        c_aovs.getSelector().setCustomFilterValue("aiAOV")
-
-        attr_enabled = "enabled"
-        dummy_aov = pmc.createNode( 'aiAOV' , name = 'Dummy' )
-        or_enabled = c_aovs.createAbsoluteOverride(str(dummy_aov), attr_enabled)
-        or_enabled.setName(c_aovs.name() + "_enabled")
-        or_enabled.setAttrValue(0)
-        pmc.delete(dummy_aov)
-
-        # create bg collection
-        c_bg = rl.createCollection("background")
-        c_bg.getSelector().setPattern(bg_selector)
-
-        # create empty collection for visibility
-        c_visibility = rl.createCollection("visibility")
-        cmds.polyCube(n='dummyObj')
-        or_self_shadows = c_visibility.createAbsoluteOverride('dummyObj', "visibility")
-        or_self_shadows.setName(c_visibility.name() + "_visibility_off")
-        or_self_shadows.setAttrValue(0)
-        cmds.delete('dummyObj')
-
-        # create main collection for asset geo
-        c_asset = rl.createCollection(asset_name)
-
-        # add content
-        """
-        #selector
-        sl = c_asset.getSelector()
-        # static selection
-        ss = sl.staticSelection
-        # add items
-
-        # create str list from items
-        str_content = []
-
-        for obj in content:
-            str_content.append(str(obj))
-
-        ss.add(str_content)
-        """
-
-        # build list from obj list
-
-        sel_string = build_search_string(content)
-        c_asset.getSelector().setPattern(sel_string)
-
-        # create shader override
-        or_material = c_asset.createOverride('asset_shader', MaterialOverride.kTypeId)
-        or_material.setSource(str(shading_engine) + ".message")
-
-        # floatConstant override for switch index
-        c_float_constant = c_asset.createCollection('float_switch_select')  # create sub collection
-        c_float_constant.getSelector().setPattern('*')
-        c_float_constant.getSelector().setFilterType(selector.Filters.kCustom)
-        c_float_constant.getSelector().setCustomFilterValue("floatConstant")
-
-        attr_in_float = "inFloat"
-        dummy_float = pmc.createNode('floatConstant', name='dummy_float')
-        or_enabled = c_float_constant.createAbsoluteOverride(str(dummy_float), attr_in_float)
-        or_enabled.setName(c_float_constant.name() + "_inFloat")
-        or_enabled.setAttrValue(index)
-        pmc.delete(dummy_float)
-
-
-def build_search_string(content):
-    """
-    builds a search string for render layer expression from a given list of nodes
-    :param content: list of nodes
-    :return:
-    """
-    sel_string = ""
-
-    for asset in content:
-        asset = str(asset)
-        if ":" in asset:
-            search_string = "*:" + asset.split(":")[-1]
-
-        else:
-            search_string = "*" + asset
-
-        if not sel_string:
-            sel_string = sel_string + search_string
-        else:
-            sel_string = sel_string + ", " + search_string
-
-    return sel_string
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+# Import built-in modules
+import os
+import json
+import time
+from contextlib import contextmanager
+
+# Logger
+import logging
+
+# scene access goes through the backend, maya modules are only imported by the MayaBackend
+# shader_cache (sqlite) is imported by load_selected_shader when it's needed
+from dw_kong_render_setup import backend as scene_backend
+from dw_kong_render_setup import channels
+from dw_kong_render_setup import hierarchy
+from dw_kong_render_setup import patterns
+from dw_kong_render_setup import reconcile
+from dw_kong_render_setup import tracing
+
+logging.basicConfig()
+logger = logging.getLogger('Kong Render Setup')
+logger.setLevel(logging.INFO)
+
+# build modes for build_render_setup
+# layers : every variation layer is built through the render setup api
+# clone  : the first variation is built as template, all others are cloned from its json encoding in a single decode
+# frames : a single layer, the switch index is keyed to the frame number so variation N renders on frame N
+BUILD_MODE_LAYERS = "layers"
+BUILD_MODE_CLONE = "clone"
+BUILD_MODE_FRAMES = "frames"
+BUILD_MODES = [BUILD_MODE_LAYERS, BUILD_MODE_CLONE, BUILD_MODE_FRAMES]
+
+# layer name suffix of the single layer of the frames mode
+FRAMES_LAYER = "shuffle"
+
+# cloned layers decoded per build step, keeps a step short enough for progress updates
+CLONE_CHUNK_SIZE = 20
+
+# builds run their scene edits in a bulk edit session, disable to measure the savings
+BULK_EDIT = True
+_bulk_edit_depth = 0
+
+# content groups are expanded into the shapes below them once per build, collections select the shapes
+EXPAND_HIERARCHY = True
+
+# floatConstant nodes driving the switch index per shading engine, kept for the session
+_switch_drivers = {}
+
+# switch input snapshot per shading engine, taken by the last load_selected_shader
+_switch_textures = {}
+
+def kill_existing_app(windowName):
+    """Kill the app if it's running.
+
+    Args:
+        windowName (str): Window object name of the app.
+    """
+    import maya.cmds as cmds
+
+    if cmds.window(windowName, exists=True, q=True):
+        cmds.deleteUI(windowName)
+
+def show_help():
+
+    import subprocess
+
+    help_path = "T:/david.waldhaus/documentation/fixPref/fixPref_documentation.pdf"
+
+    subprocess.Popen(help_path, shell=True)
+
+def is_group(node):
+    import pymel.core as pmc
+
+    try:
+        children = node.getChildren()
+        for child in children:
+            if type(child) is not pmc.nodetypes.Transform:
+                return False
+        return True
+    except:
+        return False
+
+def load_selected_geo():
+    import pymel.core as pmc
+
+    sel = pmc.ls(sl=1)
+    if not sel:
+        logger.warning("Nothing selected!")
+        return
+
+    return sel,str(sel)
+
+def load_selected_shader(shader=None, backend=None):
+    """
+    loads the selected shading engine
+    returns str asset name, dir with plug index and variation name
+    :param shader:
+    :param backend: scene backend, defaults to the current backend
+    :return:
+    """
+
+    from dw_kong_render_setup import shader_cache
+
+    backend = backend or scene_backend.get_backend()
+
+    valid = False
+    shader = shader
+    asset_name = ""
+    switch_nodes = {}
+    max_input = 0
+
+    # validate that selection is only a single SG node
+
+    if len(shader) != 1:
+        backend.warning("Please Select only 1 shader!.")
+        return valid, shader, switch_nodes, max_input
+
+    shader = shader[0]
+
+    if not backend.node_type(shader) == "shadingEngine":
+        backend.warning("Please Select a Shading Engine Only")
+        return valid, shader, switch_nodes, max_input
+
+    # selection from here on is validated
+    # contains only a single shd engine
+
+    valid = True
+
+    # get asset name from shader naming
+
+    # the namespace of referenced assets isn't valid in render layer names and output paths
+    asset_name = str(shader).split(":")[-1].replace("elements_", "").replace("_sg", "")
+
+    # get switch nodes from sg, walks the shading network upstream and stops at every switch
+    with tracing.span("scan_shading_network", shader=shader):
+        switch_textures = backend.scan_shading_network(shader)
+    _switch_textures[str(shader)] = switch_textures
+    all_switches = list(switch_textures)
+
+    # the switch index drivers are traced from the switches found, the build selects exactly these nodes
+    get_switch_drivers(shader, backend, all_switches, refresh=True)
+
+    logger.info("Unfiltered Switches : %s", switch_textures)
+
+    # reuse a cached analysis as long as the network didn't change
+
+    # the analysis depends on the channel config as much as on the network
+    registry = channels.get_registry()
+
+    cache_path = shader_cache.get_cache_path(backend.prefs_dir())
+    network_fingerprint = shader_cache.fingerprint(shader, switch_textures, registry.key)
+    with tracing.span("shader_cache.get"):
+        cached = shader_cache.get(shader, network_fingerprint, cache_path) if cache_path else None
+
+    if cached:
+        logger.info("Using cached analysis for %s : %s", shader, cached)
+        return valid, shader, asset_name, cached["variations"]
+
+    # get plug name for switches, switch is only valid if a plug is found
+
+    switch_dir_unvalidated = {}
+    switch_channels = channels.classify_switches(all_switches, registry)
+
+    for switch in all_switches:
+        plug = switch_channels[switch]
+        if plug:
+            switch_dir_unvalidated[plug] = switch
+        else:
+            logger.info("Couldn't identify channel for {}. Skipping.".format(switch))
+
+    logger.info("Ordered the found Switches this way : \n %s", switch_dir_unvalidated)
+
+    # validate the found switches against the channel registry
+
+    switch_dir_validated = {}
+
+    for plug in registry.channels:
+        if plug in switch_dir_unvalidated:
+            switch_dir_validated[plug] = switch_dir_unvalidated[plug]
+        else:
+            switch_dir_validated[plug] = None
+
+    logger.info("Ordered the Switches! Final List : \n %s", switch_dir_validated)
+
+    switch_nodes = switch_dir_validated
+
+    # get max input number, counted from the input snapshot of every switch
+
+    max_input = 0
+    skipped_slots = []
+
+    for switch in switch_nodes:
+        # if no switch node exists for the slot, skip it
+        if switch_nodes[switch]:
+            temp_max = len(switch_textures[switch_nodes[switch]])
+            if temp_max > max_input:
+                max_input = temp_max
+        else:
+            skipped_slots.append(switch)
+
+    logger.info("Determined max number of switch inputs : {}".format(max_input))
+    logger.info("Skipping switch for the following slots, since no input was found : {}".format(skipped_slots))
+
+    # build a dict with slot number and variation name
+
+    # pick clr switch as base to determine variation names, if thats not available use next best choice
+
+    base_switch = None
+
+    for switch in switch_nodes:
+        if switch_nodes[switch]:
+            base_switch = switch_nodes[switch]
+            break
+        else:
+            continue
+
+    if base_switch:
+        logger.info("Determined {} switch to pick variations from.".format(base_switch))
+    else:
+        logger.warning("Could not determine a base switch. Aborting.")
+        return False
+
+    # iterate over the connected inputs of the base switch, indices may be sparse, and get variation name
+
+    variations = {}
+    base_inputs = switch_textures[base_switch]
+
+    for x in sorted(base_inputs):
+        variation_name = ""
+        file_path = base_inputs[x][1]
+        if not file_path:
+            logger.warning("No texture path found for {} input {}".format(base_switch, x))
+            return False
+        # folder above version folder
+        variation_name = channels.get_variation_name(file_path, registry)
+        if not variation_name:
+            logger.warning("Error fetching variation name for path : {}".format(file_path))
+            return False
+
+        variations[x] = variation_name
+
+    if cache_path:
+        with tracing.span("shader_cache.put"):
+            shader_cache.put(shader, network_fingerprint, switch_nodes, max_input, variations, cache_path)
+
+    return valid, shader, asset_name, variations
+
+def get_switch_channel(switch):
+    """
+    returns the channel a switch drives, from the switch naming
+    :param switch: switch node name
+    :return: str channel or None if the name doesn't contain one
+    """
+    return channels.get_switch_channel(switch)
+
+def get_switch_drivers(shading_engine, backend=None, switches=None, refresh=False):
+    """
+    returns the floatConstant nodes driving the index input of the switches of a shading engine
+    the result is cached per shading engine and traced again once a cached node doesn't exist anymore
+    :param shading_engine: shading engine
+    :param backend: scene backend, defaults to the current backend
+    :param switches: optional list of switch names, scanned from the shading network if not given
+    :param refresh: trace again even if a cached result exists
+    :return: sorted list of floatConstant node names
+    """
+    backend = backend or scene_backend.get_backend()
+    shading_engine = str(shading_engine)
+
+    drivers = _switch_drivers.get(shading_engine)
+    if drivers is not None and not refresh and all(backend.exists(x) for x in drivers):
+        return drivers
+
+    with tracing.span("find_switch_drivers", shader=shading_engine):
+        if switches is None:
+            switches = list(backend.scan_shading_network(shading_engine))
+        drivers = backend.find_switch_drivers(switches)
+
+    if not drivers:
+        logger.warning("No floatConstant drives the switch index of {}, "
+                       "the variation layers can't select their variation".format(shading_engine))
+    logger.info("Switch index drivers of %s : %s", shading_engine, drivers)
+
+    _switch_drivers[shading_engine] = drivers
+    return drivers
+
+def get_switch_textures(shading_engine, backend=None):
+    """
+    returns the switch input snapshot of a shading engine, the one of the last load_selected_shader
+    the network is only scanned if the shading engine wasn't loaded
+    :param shading_engine: shading engine
+    :param backend: scene backend, defaults to the current backend
+    :return: dict with switch name and input snapshot, as returned by scan_shading_network
+    """
+    switch_textures = _switch_textures.get(str(shading_engine))
+    if switch_textures is None:
+        backend = backend or scene_backend.get_backend()
+        with tracing.span("scan_shading_network", shader=shading_engine):
+            switch_textures = _switch_textures[str(shading_engine)] = backend.scan_shading_network(shading_engine)
+    return switch_textures
+
+def get_texture_root(shader, backend=None):
+    """
+    returns the texture root of an asset on disk, found from the first texture path of its switches
+    :param shader: shading engine
+    :param backend: scene backend, defaults to the current backend
+    :return: str texture root or None if none is found
+    """
+
+    from dw_kong_render_setup import texture_index
+
+    switch_textures = get_switch_textures(shader, backend)
+
+    for inputs in switch_textures.values():
+        for x in inputs.values():
+            root = texture_index.get_texture_root(x[1]) if x[1] else None
+            if root:
+                return root
+
+    logger.warning("No texture root found for {}".format(shader))
+    return None
+
+def index_textures(shader, backend=None):
+    """
+    indexes the texture tree of an asset on disk, found from the first texture path of its switches
+    lists available variations and versions without walking the shading network again
+    :param shader: shading engine
+    :param backend: scene backend, defaults to the current backend
+    :return: dict texture index or None if no texture root is found
+    """
+
+    from dw_kong_render_setup import texture_index
+
+    backend = backend or scene_backend.get_backend()
+
+    root = get_texture_root(shader, backend)
+    if not root:
+        return None
+
+    return texture_index.get_index(root, texture_index.get_cache_path(backend.prefs_dir()))
+
+def createShader(shaderType, backend=None):
+    """ Create a shader of the given type"""
+    backend = backend or scene_backend.get_backend()
+    return backend.create_shader(shaderType)
+
+def build_render_setup(content=None, content_shadow=None, asset_name="default", filename_prefix="", shading_engine="", variations={}, bg_selector="", mode=BUILD_MODE_LAYERS, backend=None, names=None, skip=None):
+    """
+    builds the render setup, running it again only applies what changed
+    :param content: content of main description
+    :param asset_name: name of the asset, used to build render layer naming
+    :param filename_prefix:  file name prefix set in render layer
+    :param shading_engine: sg for material OR
+    :param variations: dict with variations & indices to build layers for switch variations
+    :param mode: one of BUILD_MODES
+    :param backend: scene backend, defaults to the current backend
+    :param names: optional list of scene dag node names, listed by the build if not given
+    :param skip: optional list of variation names not to build, their existing layers are left untouched
+    :return: dict from new_build_journal with the names of the created layers
+    """
+
+    journal = new_build_journal()
+
+    with bulk_edit("Kong Build Render Setup", backend):
+        with tracing.span("build_render_setup", asset=asset_name, mode=mode, variations=len(variations)):
+            for step in iter_build_render_setup(content, content_shadow, asset_name, filename_prefix, shading_engine,
+                                                variations, bg_selector, mode, backend, names, journal, skip):
+                pass
+
+    return journal
+
+
+@contextmanager
+def bulk_edit(name, backend=None):
+    """
+    bulk edit session of the backend, a single undo step with refresh and ui updates suspended
+    everything is restored on exceptions, nested sessions run inside the outermost one
+    :param name: name of the undo step
+    :param backend: scene backend, defaults to the current backend
+    :return: context manager yielding a dict, its seconds are set when the session is left
+    """
+    global _bulk_edit_depth
+
+    backend = backend or scene_backend.get_backend()
+    stats = {"name": name, "bulk": BULK_EDIT and not _bulk_edit_depth, "seconds": None}
+    start = time.perf_counter()
+
+    _bulk_edit_depth += 1
+    try:
+        if stats["bulk"]:
+            with tracing.span("bulk_edit", label=name):
+                with backend.bulk_edit(name):
+                    yield stats
+        else:
+            yield stats
+    finally:
+        _bulk_edit_depth -= 1
+        stats["seconds"] = time.perf_counter() - start
+        if stats["bulk"] or not BULK_EDIT:
+            logger.info("%s took %.3fs, bulk edit %s", name, stats["seconds"], "on" if stats["bulk"] else "off")
+
+
+def iter_build_render_setup(content=None, content_shadow=None, asset_name="default", filename_prefix="", shading_engine="", variations={}, bg_selector="", mode=BUILD_MODE_LAYERS, backend=None, names=None, journal=None, skip=None):
+    """
+    step wise build_render_setup, every step builds a single layer or a chunk of cloned layers
+    the generator can be driven from a timer, closing it stops the build after the current step
+    :param journal: optional dict from new_build_journal, records everything rollback_build needs
+    :return: generator yielding tuples of done steps, total steps and step label
+    """
+
+    backend = backend or scene_backend.get_backend()
+
+    # lazy logging args, the content lists and var dict only get formatted if info is logged
+    logger.info("Building Shader with the following Parameters : \n"
+                "Content : %s \n"
+                "Shadow Catch Conent : %s \n"
+                "Background : %s \n"
+                "File Name Prefix : %s \n"
+                "Asset Name : %s \n"
+                "Shading Engine : %s \n"
+                "Var Dict : %s \n"
+                "Build Mode : %s", content, content_shadow, bg_selector, filename_prefix, asset_name, shading_engine, variations, mode)
+
+    if mode not in BUILD_MODES:
+        logger.warning("Unknown build mode {}. Aborting.".format(mode))
+        return
+
+    # iterate over variations dict to build layers for each var
+
+    rs = backend.render_setup()
+
+    for step in iter_build_layers(rs, content, content_shadow, asset_name, filename_prefix, shading_engine, variations,
+                                  bg_selector, mode, backend, names, journal, skip):
+        yield step
+
+
+def iter_build_layers(rs, content, content_shadow, asset_name, filename_prefix, shading_engine, variations,
+                      bg_selector, mode, backend, names=None, journal=None, skip=None):
+    """
+    builds the variation layers of build_render_setup step by step
+    existing layers of the asset are reconciled, changed values are updated in place, only missing layers
+    are built and layers of removed variations are deleted in the last step, so a cancelled build never
+    has to restore deleted layers
+    :param rs: render setup instance
+    :param backend: scene backend
+    :param names: optional list of scene dag node names
+    :param journal: optional dict from new_build_journal
+    :param skip: optional list of variation names not to build, their existing layers are left untouched
+    :return: generator yielding tuples of done steps, total steps and step label
+    """
+    if journal is None:
+        journal = new_build_journal()
+
+    skip = set(skip or [])
+    keep = [asset_name + "_" + variations[x] for x in variations if variations[x] in skip]
+    variations = dict((x, variations[x]) for x in variations if variations[x] not in skip)
+
+    # the frames mode reconciles a single layer, its switch index gets keyed once it exists
+    frame_variations = None
+    if mode == BUILD_MODE_FRAMES and variations:
+        frame_variations = variations
+        variations = {min(variations): FRAMES_LAYER}
+
+    # resolve the shadow catcher once per build, every layer points at the same sg
+
+    shadow_matte_sg = get_shadow_matte_sg(backend, journal)
+
+    # compile the content selectors once per build against the scene names
+
+    with tracing.span("compile_selectors"):
+        if names is None:
+            names = backend.list_node_names()
+        if EXPAND_HIERARCHY:
+            index = hierarchy.index_content(content, content_shadow, backend)
+            content_selector = patterns.compile_selector(index["content"], names, exact=True)
+            shadow_selector = patterns.compile_selector(index["shadow"], names, exact=True)
+        else:
+            content_selector = patterns.compile_selector(content, names)
+            shadow_selector = patterns.compile_selector(content_shadow, names)
+
+    # only the floatConstants driving the switch index of this shading engine get the index override
+    switch_selector = patterns.Selector(None, get_switch_drivers(shading_engine, backend))
+
+    # reconcile against the existing layers of the asset, only missing layers get built
+
+    with tracing.span("reconcile"):
+        specs = reconcile.build_layer_specs(asset_name, variations, filename_prefix, shading_engine, shadow_matte_sg,
+                                            content_selector, shadow_selector, bg_selector, switch_selector)
+        plan = reconcile.plan_layers(rs, asset_name, specs, keep)
+        changes = sum(reconcile.update_layer(state, spec, journal["undo"]) for state, spec in plan["update"])
+
+    logger.info("Reconciled layers of %s : %s to create, %s kept with %s changed values, %s to replace, %s to delete",
+                asset_name, len(plan["create"]), len(plan["update"]), changes, len(plan["replace"]),
+                len(plan["delete"]))
+
+    # layers holding a name to create are renamed aside before the new layer takes the name,
+    # they get deleted with the removed layers in the last step, a rollback renames them back
+    for layer in plan["replace"]:
+        name = layer.name()
+        journal["undo"].append((layer.setName, (name,)))
+        layer.setName(name + reconcile.REPLACED_SUFFIX)
+    plan["delete"].extend(plan["replace"])
+
+    variations = dict((specs[x]["index"], specs[x]["variation"]) for x in plan["create"])
+    indices = list(variations)
+
+    # one step per built layer, clones are decoded in chunks, deletes are a single last step
+
+    if mode == BUILD_MODE_CLONE and len(indices) > 1:
+        clone_chunks = [indices[x:x + CLONE_CHUNK_SIZE] for x in range(1, len(indices), CLONE_CHUNK_SIZE)]
+        total = 1 + len(clone_chunks)
+    else:
+        clone_chunks = []
+        total = len(indices)
+    if plan["delete"]:
+        total += 1
+    if frame_variations:
+        total += 1
+
+    done = 0
+    yield done, total, "reconcile"
+
+    if indices:
+        # one throwaway node per override target type, shared by all layers of this build
+
+        prototypes = create_override_prototypes(backend)
+
+        try:
+            if clone_chunks:
+                # build the first variation as template, clone the rest from its json
+                template_index = indices[0]
+                with tracing.span("layer", variation=variations[template_index]):
+                    template = build_variation_layer(rs, template_index, variations[template_index], prototypes,
+                                                     content_selector, shadow_selector, asset_name, filename_prefix,
+                                                     shading_engine, shadow_matte_sg, bg_selector, backend,
+                                                     switch_selector)
+                journal["layers"].append(template.name())
+                done += 1
+                yield done, total, template.name()
+
+                for chunk in clone_chunks:
+                    with tracing.span("clone_variation_layers", layers=len(chunk)):
+                        layer_names = clone_variation_layers(rs, template, asset_name,
+                                                             dict((x, variations[x]) for x in chunk), backend)
+                    journal["layers"].extend(layer_names)
+                    done += 1
+                    yield done, total, layer_names[-1]
+            else:
+                for index in indices:
+                    with tracing.span("layer", variation=variations[index]):
+                        layer = build_variation_layer(rs, index, variations[index], prototypes, content_selector,
+                                                      shadow_selector, asset_name, filename_prefix, shading_engine,
+                                                      shadow_matte_sg, bg_selector, backend, switch_selector)
+                    journal["layers"].append(layer.name())
+                    done += 1
+                    yield done, total, layer.name()
+        finally:
+            delete_override_prototypes(prototypes, backend)
+
+    if frame_variations:
+        with tracing.span("key_frame_layer", frames=len(frame_variations)):
+            key_frame_layer(rs.getRenderLayer(asset_name + "_" + FRAMES_LAYER), asset_name, frame_variations,
+                            backend, journal)
+        done += 1
+        yield done, total, "keys"
+
+    if plan["delete"]:
+        backend.delete_render_layers(rs, plan["delete"])
+        done += 1
+        yield done, total, "delete"
+
+
+def key_frame_layer(layer, asset_name, variations, backend, journal=None):
+    """
+    keys the switch index override of the frames mode layer to the frame number and overrides the frame range
+    :param layer: render layer built by build_variation_layer
+    :param asset_name: name of the asset
+    :param variations: dict with variations & indices, variation N renders on frame N
+    :param backend: scene backend
+    :param journal: optional build journal the previous keys and values get recorded in
+    :return:
+    """
+    state = reconcile.read_layer(layer, asset_name)
+    index_override = state["index"].name()
+
+    keys = get_frame_mapping(variations, indices=True)
+    old_keys = backend.get_keys(index_override, "attrValue")
+    if old_keys != keys:
+        if journal is not None:
+            journal["undo"].append((backend.set_keys, (index_override, "attrValue", old_keys)))
+        backend.set_keys(index_override, "attrValue", keys)
+
+    indices = sorted(variations)
+    if indices != list(range(indices[0], indices[-1] + 1)):
+        logger.warning("Switch indices of {} aren't contiguous, frames in between render the previous variation."
+                       .format(asset_name))
+
+    # render the whole range of switch indices
+    settings_coll = layer.renderSettingsCollectionInstance()
+    for attr_name, value in (("animation", 1), ("startFrame", indices[0]), ("endFrame", indices[-1])):
+        ov = reconcile.find_override(settings_coll, attr_name)
+        if ov is None:
+            create_absolute_override(settings_coll, 'defaultRenderGlobals', attr_name, value,
+                                     layer.name() + '_' + attr_name)
+        elif ov.getAttrValue() != value:
+            if journal is not None:
+                journal["undo"].append((ov.setAttrValue, (ov.getAttrValue(),)))
+            ov.setAttrValue(value)
+
+
+def get_frame_mapping(variations, indices=False):
+    """
+    maps the frames of the frames mode to their variation, variation N renders on frame N
+    :param variations: dict with variations & indices
+    :param indices: map to the switch index instead of the variation name
+    :return: dict with frame and variation name or switch index
+    """
+    return dict((x, x if indices else variations[x]) for x in variations)
+
+
+def get_frame_mapping_path(scene_path, asset_name):
+    """
+    returns the default path of the frame mapping of an asset, next to the scene
+    the asset name keeps the mappings of several assets in one scene apart
+    :param scene_path: path of the saved scene
+    :param asset_name: name of the asset
+    :return: str json file path
+    """
+    return os.path.splitext(scene_path)[0] + "_" + asset_name + "_frames.json"
+
+
+def write_frame_mapping(variations, path):
+    """
+    writes the frame to variation name mapping of the frames mode as json
+    :param variations: dict with variations & indices
+    :param path: json file path
+    :return:
+    """
+    mapping = get_frame_mapping(variations)
+    with open(path, "w") as f:
+        json.dump(dict((str(x), mapping[x]) for x in sorted(mapping)), f, indent=4)
+
+    logger.info("Wrote frame mapping of %s variations to %s", len(mapping), path)
+
+
+def new_build_journal():
+    """
+    :return: dict recording created layers, created nodes and undo callbacks of changed values of a build
+    """
+    return {"layers": [], "nodes": [], "undo": []}
+
+
+def rollback_build(journal, backend=None):
+    """
+    reverts everything recorded in a build journal, used when a step wise build gets cancelled
+    :param journal: dict from new_build_journal
+    :param backend: scene backend, defaults to the current backend
+    :return:
+    """
+    backend = backend or scene_backend.get_backend()
+    rs = backend.render_setup()
+
+    with bulk_edit("Kong Rollback Build", backend):
+        layers = [rs.getRenderLayer(x) for x in journal["layers"]]
+        backend.delete_render_layers(rs, [x for x in layers if x])
+
+        for func, args in reversed(journal["undo"]):
+            func(*args)
+
+        nodes = [x for x in journal["nodes"] if backend.exists(x)]
+        if nodes:
+            backend.delete(nodes)
+
+    logger.info("Rolled back build, deleted %s layers and %s nodes, restored %s values",
+                len(journal["layers"]), len(nodes), len(journal["undo"]))
+
+
+def get_shadow_matte_sg(backend, journal=None):
+    """
+    returns the shading engine of the scenes shadow catcher, creates a new aiShadowMatte if none exists
+    :param backend: scene backend
+    :param journal: optional build journal the created nodes get recorded in
+    :return: str name of the aiShadowMatte shading engine
+    """
+    if not backend.exists("aiShadowMatte1SG"):
+        created = createShader("aiShadowMatte", backend)
+        shadow_matte_sg = created[-1]
+        if journal is not None:
+            journal["nodes"].extend(created)
+        logger.info("No existing shadow catcher found, creating new aiShadowMatte: {}".format(shadow_matte_sg))
+    else:
+        shadow_matte_sg = "aiShadowMatte1SG"
+        logger.info("Using existing aiShadowMatte as shadow catcher: {}".format(shadow_matte_sg))
+
+    return shadow_matte_sg
+
+
+def create_override_prototypes(backend):
+    """
+    creates one prototype node per override target type
+    absolute overrides only read the plug type from the node they are created from, so a single
+    node per type can serve every layer of a build instead of creating and deleting one per layer
+    :param backend: scene backend
+    :return: dict with prototype node names, keyed by shape, transform, aov and float
+    """
+    shape = backend.create_node("mesh", "kongPrototypeShape")
+    transform = backend.get_parent(shape)
+    aov = backend.create_node("aiAOV", "kongPrototypeAOV")
+    float_constant = backend.create_node("floatConstant", "kongPrototypeFloat")
+
+    return {"shape": shape, "transform": transform, "aov": aov, "float": float_constant}
+
+
+def delete_override_prototypes(prototypes, backend):
+    """
+    deletes the prototype nodes created by create_override_prototypes
+    :param prototypes: dict with prototype node names
+    :param backend: scene backend
+    :return:
+    """
+    nodes = [prototypes[x] for x in ("transform", "aov", "float") if backend.exists(prototypes[x])]
+    if nodes:
+        backend.delete(nodes)
+
+
+def build_variation_layer(rs, index, variation, prototypes, content_selector, shadow_selector, asset_name,
+                          filename_prefix, shading_engine, shadow_matte_sg, bg_selector, backend, switch_selector=None):
+    """
+    builds the render layer for a single switch variation
+    :param rs: render setup instance
+    :param index: switch index of the variation
+    :param variation: variation name
+    :param prototypes: dict with override prototype nodes
+    :param content_selector: compiled patterns.Selector of the asset content
+    :param shadow_selector: compiled patterns.Selector of the shadow catcher content
+    :param shadow_matte_sg: shading engine used for the shadow catcher override
+    :param backend: scene backend
+    :param switch_selector: patterns.Selector of the floatConstants driving the switch index,
+                            traced from the shading engine if not given
+    :return: created render layer
+    """
+
+    if switch_selector is None:
+        switch_selector = patterns.Selector(None, get_switch_drivers(shading_engine, backend))
+
+    # create main render layer
+    layer_name = asset_name + "_" + variation
+    rl = rs.createRenderLayer(layer_name)
+    tracing.count("layers")
+
+    # create render setting override for image path
+    file_prefix = filename_prefix
+
+    settings_coll = rl.renderSettingsCollectionInstance()
+    attr_name = 'imageFilePrefix'
+    create_absolute_override(settings_coll, 'defaultRenderGlobals', attr_name, file_prefix, layer_name + '_' + attr_name)
+
+    # create collection for head
+    with tracing.span("collection", label="shadow_catcher"):
+        c_shadow_catcher = create_collection(rl, reconcile.SHADOW_CATCHER, shadow_selector)
+        # create shader override
+        create_material_override(c_shadow_catcher, 'shadow_catcher', shadow_matte_sg, backend)
+
+        # set self shadows off on shapes
+        """
+        # shape collection gets created automatically
+        c_head_shapes = c_shadow_catcher.createCollection('head_shapes')  # create sub collection
+        c_head_shapes.getSelector().setPattern('*')
+        c_head_shapes.getSelector().setFilterType(selector.Filters.kShapes)
+        """
+        attr_name = 'aiSelfShadows'
+        create_absolute_override(c_shadow_catcher, prototypes["shape"], attr_name, 0,
+                                 c_shadow_catcher.name() + "_self_shadows_off")
+
+    # create aov collection and disable all
+    with tracing.span("collection", label="aovs_off"):
+        c_aovs = create_collection(rl, 'aovs_off', '*', "aiAOV", backend)
+        attr_enabled = "enabled"
+        create_absolute_override(c_aovs, prototypes["aov"], attr_enabled, 0, c_aovs.name() + "_enabled")
+
+    # create bg collection
+    with tracing.span("collection", label="background"):
+        create_collection(rl, reconcile.BACKGROUND, bg_selector)
+
+    # create empty collection for visibility
+    with tracing.span("collection", label="visibility"):
+        c_visibility = create_collection(rl, "visibility")
+        create_absolute_override(c_visibility, prototypes["transform"], "visibility", 0,
+                                 c_visibility.name() + "_visibility_off")
+
+    # add content
+    """
+    #selector
+    sl = c_asset.getSelector()
+    # static selection
+    ss = sl.staticSelection
+    # add items
+
+    # create str list from items
+    str_content = []
+
+    for obj in content:
+        str_content.append(str(obj))
+
+    ss.add(str_content)
+    """
+
+    # create main collection for asset geo
+    with tracing.span("collection", label=asset_name):
+        c_asset = create_collection(rl, asset_name, content_selector)
+
+        # create shader override
+        create_material_override(c_asset, 'asset_shader', shading_engine, backend)
+
+        # floatConstant override for switch index
+        with tracing.span("collection", label="float_switch_select"):
+            c_float_constant = create_collection(c_asset, reconcile.FLOAT_SWITCH_SELECT, switch_selector,
+                                                 "floatConstant", backend)
+            attr_in_float = "inFloat"
+            create_absolute_override(c_float_constant, prototypes["float"], attr_in_float, index,
+                                     c_float_constant.name() + "_inFloat")
+
+    return rl
+
+
+def create_collection(parent, name, pattern=None, custom_filter=None, backend=None):
+    """
+    creates a collection under a render layer or collection
+    :param parent: render layer or collection
+    :param name: name of the collection
+    :param pattern: optional selector pattern, str or compiled patterns.Selector
+    :param custom_filter: optional node type for a custom selector filter, needs backend
+    :param backend: scene backend, only needed for a custom filter
+    :return: created collection
+    """
+    tracing.count("collections")
+    coll = parent.createCollection(name)
+    if isinstance(pattern, patterns.Selector):
+        if pattern.static:
+            coll.getSelector().staticSelection.add(pattern.static)
+        elif pattern.pattern:
+            coll.getSelector().setPattern(pattern.pattern)
+    elif pattern:
+        coll.getSelector().setPattern(pattern)
+    if custom_filter:
+        coll.getSelector().setFilterType(backend.filter_custom)
+        coll.getSelector().setCustomFilterValue(custom_filter)
+    return coll
+
+
+def create_absolute_override(coll, node, attr_name, value, name):
+    """
+    creates an absolute override in a collection
+    :param coll: collection
+    :param node: node the attribute type is read from
+    :param attr_name: name of the overridden attribute
+    :param value: override value
+    :param name: name of the override
+    :return: created override
+    """
+    with tracing.span("override", attr=attr_name):
+        tracing.count("overrides")
+        ov = coll.createAbsoluteOverride(node, attr_name)
+        ov.setAttrValue(value)
+        ov.setName(name)
+    return ov
+
+
+def create_material_override(coll, name, shading_engine, backend):
+    """
+    creates a material override in a collection
+    :param coll: collection
+    :param name: name of the override
+    :param shading_engine: shading engine assigned by the override
+    :param backend: scene backend
+    :return: created override
+    """
+    with tracing.span("override", attr="material"):
+        tracing.count("overrides")
+        ov = coll.createOverride(name, backend.material_override)
+        ov.setSource(str(shading_engine) + ".message")
+    return ov
+
+
+def clone_variation_layers(rs, template, asset_name, variations, backend):
+    """
+    clones a built variation layer for every given variation through the render setup json format
+    the template gets encoded and serialized once, every clone is a patched copy of that json,
+    all clones are imported with a single decode
+    :param rs: render setup instance
+    :param template: render layer built by build_variation_layer, used as template
+    :param asset_name: name of the asset, used to build render layer naming
+    :param variations: dict with variations & indices to clone layers for
+    :param backend: scene backend
+    :return: list of cloned layer names
+    """
+    template_name = template.name()
+    template_json = json.dumps(template.encode())
+
+    encoded_layers = []
+    layer_names = []
+
+    for index in variations:
+        layer_name = asset_name + "_" + variations[index]
+        encoded_layer = json.loads(template_json)
+        patch_encoded_layer(encoded_layer, template_name, layer_name, index)
+        encoded_layers.append(encoded_layer)
+        layer_names.append(layer_name)
+
+    logger.info("Cloning %s layers from template %s", len(encoded_layers), template_name)
+
+    rs.decode({rs.typeName(): {"renderLayers": encoded_layers}}, backend.decode_merge, None)
+
+    return layer_names
+
+
+def patch_encoded_layer(data, template_name, layer_name, index):
+    """
+    patches an encoded template layer in place for a variation
+    renames the layer and every node named after it, sets the inFloat override value to the switch index
+    :param data: encoded render setup data, dict or list
+    :param template_name: name of the template layer
+    :param layer_name: name of the variation layer
+    :param index: switch index of the variation
+    :return:
+    """
+    if isinstance(data, dict):
+        name = data.get("name")
+        if name == template_name or (isinstance(name, str) and name.startswith(template_name + "_")):
+            data["name"] = layer_name + name[len(template_name):]
+        # maya encodes the overridden attribute of an override under "attribute"
+        if data.get("attribute") == "inFloat" and "attrValue" in data:
+            data["attrValue"] = index
+        for value in data.values():
+            patch_encoded_layer(value, template_name, layer_name, index)
+    elif isinstance(data, list):
+        for value in data:
+            patch_encoded_layer(value, template_name, layer_name, index)
+
+
+def build_filename_prefix(category):
+    """
+    builds the render layer file name prefix for an asset category
+    :param category: asset category
+    :return: str file name prefix
+    """
+    file_name_prefix = "shuffle/" + category  + "/<RenderLayer>"
+    return file_name_prefix
+
+
+def build_search_string(content):
+    """
+    builds a search string for render layer expression from a given list of nodes
+    :param content: list of nodes
+    :return:
+    """
+    sel_string = ", ".join(patterns.build_terms(content))
+
+    return sel_string
+
+
+
+
+
+
+
+
+
+
+
+
+
+
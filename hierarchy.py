@@ -0,0 +1,58 @@
+# Logger
+import logging
+
+from dw_kong_render_setup import backend as scene_backend
+from dw_kong_render_setup import tracing
+
+logger = logging.getLogger('Kong Render Setup')
+
+
+def expand_content(content, shapes):
+    """
+    replaces every node of a content list by the shapes below it
+    nodes that don't exist in the scene or have no shapes below them are kept as they are
+    :param content: list of nodes
+    :param shapes: dict with node and list of shape paths, as returned by list_descendant_shapes
+    :return: list of unique shape paths and kept nodes, in content order
+    """
+    expanded = []
+    seen = set()
+    for node in content:
+        node = str(node)
+        for member in shapes.get(node) or [node]:
+            if member not in seen:
+                seen.add(member)
+                expanded.append(member)
+    return expanded
+
+
+def index_content(content, content_shadow=None, backend=None):
+    """
+    resolves the shapes below the beauty and the shadow catcher content in a single dag query
+    shapes reached through several groups are listed once, shapes in both lists are flagged as overlap
+    :param content: list of beauty nodes, groups or shapes
+    :param content_shadow: optional list of shadow catcher nodes
+    :param backend: scene backend, defaults to the current backend
+    :return: dict with content and shadow lists of shapes and kept nodes, and the sorted list of overlapping shapes
+    """
+    backend = backend or scene_backend.get_backend()
+    content = [str(x) for x in content or []]
+    content_shadow = [str(x) for x in content_shadow or []]
+
+    with tracing.span("index_hierarchy", roots=len(content) + len(content_shadow)):
+        shapes = backend.list_descendant_shapes(sorted(set(content + content_shadow)))
+
+    index = {"content": expand_content(content, shapes), "shadow": expand_content(content_shadow, shapes)}
+    # nodes kept as they are aren't resolved, only shapes found in the scene can overlap
+    resolved = set(x for members in shapes.values() for x in members)
+    index["overlap"] = sorted(set(index["content"]) & set(index["shadow"]) & resolved)
+
+    tracing.count("shapes_indexed", len(index["content"]) + len(index["shadow"]))
+    logger.info("Indexed %s content and %s shadow catcher members from %s nodes",
+                len(index["content"]), len(index["shadow"]), len(content) + len(content_shadow))
+
+    if index["overlap"]:
+        logger.warning("{} shapes are part of the content and the shadow catcher content : {}".format(
+            len(index["overlap"]), ", ".join(index["overlap"])))
+
+    return index
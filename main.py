@@ -1,519 +1,883 @@
-# Import built-in modules
-import os
-
-import maya.cmds as cmds
-import pymel.core as pmc
-
-import os
-import sys
-
-file_dir = os.path.dirname(__file__)
-sys.path.append(file_dir)
-
-# Import third-party modules
-from PySide2 import QtCore, QtGui, QtWidgets
-
-import importlib as imp
-from dw_kong_render_setup import functions
-imp.reload(functions)
-
-
-tool_name = "Omegas Render Setup"
-version = "v001"
-
-class SelectionManagerWidget(QtWidgets.QWidget):
-    """
-    Custom Qt Widget with selection list widget, add, remove and clear btn
-    """
-    def __init__(self, name="Content"):
-
-        super(SelectionManagerWidget, self).__init__()
-
-        layout = QtWidgets.QVBoxLayout()
-        self.lbl_name = QtWidgets.QLabel()
-        self.lbl_name.setText(name)
-        font = QtGui.QFont()
-        font.setPointSize(7)
-        font.setBold(True)
-        font.setWeight(75)
-        self.lbl_name.setFont(font)
-        layout.addWidget(self.lbl_name)
-
-        self.lw_selection = QtWidgets.QListWidget()
-        self.lw_selection.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
-        layout.addWidget(self.lw_selection)
-
-        layout_controls = QtWidgets.QHBoxLayout()
-
-        self.btn_add_content = QtWidgets.QPushButton("+")
-        self.btn_add_content.setMinimumSize(QtCore.QSize(0, 15))
-        self.btn_add_content.setObjectName("btn_add_content")
-        layout_controls.addWidget(self.btn_add_content)
-
-        self.btn_remove_content = QtWidgets.QPushButton("-")
-        self.btn_remove_content.setMinimumSize(QtCore.QSize(0, 15))
-        self.btn_remove_content.setObjectName("btn_remove_content")
-        layout_controls.addWidget(self.btn_remove_content)
-
-        self.btn_clear_content = QtWidgets.QToolButton()
-        self.btn_clear_content.setMinimumSize((QtCore.QSize(0, 15)))
-        self.btn_clear_content.setIcon(self.btn_clear_content.style().standardIcon(QtWidgets.QStyle.SP_DialogCancelButton))
-        self.btn_clear_content.setObjectName("btn_clear_content")
-        layout_controls.addWidget(self.btn_clear_content)
-
-        layout.addLayout(layout_controls)
-
-        self.setLayout(layout)
-
-        self.btn_add_content.clicked.connect(lambda : self.populate(self.lw_selection))
-        self.btn_remove_content.clicked.connect(lambda : self.remove_sel(self.lw_selection))
-        self.btn_clear_content.clicked.connect(lambda : self.clear_list(self.lw_selection))
-
-
-
-    def get_items(self, listWidget):
-        items = [i for i in listWidget.findItems("", QtCore.Qt.MatchContains)]
-
-        return items
-
-    def remove_sel(self, listWidget):
-        listWidget = listWidget
-        listItems = listWidget.selectedItems()
-
-        if not listItems:
-            return
-        for item in listItems:
-            listWidget.takeItem(listWidget.row(item))
-
-    def clear_list(self, listWidget):
-        listWidget = listWidget
-
-        items = self.get_items(listWidget)
-
-        if not items:
-            return
-        for item in items:
-            listWidget.takeItem(listWidget.row(item))
-
-    def populate(self, listWidget):
-        listWidget = listWidget
-
-        sel = pmc.ls(sl=1)
-
-        existing = [i.text() for i in self.get_items(listWidget)]
-
-        for obj in sel:
-            name = str(obj)
-            if obj in existing:
-                continue
-            listWidget.addItem(name)
-
-        listWidget.scrollToBottom()
-
-    def clear_file_path(self):
-        print ("Clearing Widget {}".format(self.le_file_path))
-        self.le_file_path.setText("")
-        self.drp_cc_select.setCurrentText("Off")
-        return
-
-class Ui_kong_render_setup_generatorWindow(object):
-
-    def __init__(self):
-        self.geo = None
-        self.sg = ""
-        self.asset_name = "default"
-        self.variations = {}
-
-    def setupUi(self, kong_render_setup_generatorWindow):
-
-        kong_render_setup_generatorWindow.setObjectName("kong_render_setup_generatorWindow")
-        kong_render_setup_generatorWindow.resize(600, 300)
-
-        self.build_default_header(kong_render_setup_generatorWindow)
-
-        self.build_help()
-
-        # Tool Specific UI
-
-        self.gL_main_grp = QtWidgets.QGridLayout()
-        self.gL_main_grp.setObjectName("gL_source")
-
-
-        hL_main_controls = QtWidgets.QHBoxLayout()
-
-        vL_content = QtWidgets.QVBoxLayout()
-        self.content_widget = SelectionManagerWidget("Beauty Geo")
-        vL_content.addWidget(self.content_widget)
-
-        self.shadow_catch_content = SelectionManagerWidget("Shadow Catch Geo")
-        vL_content.addWidget(self.shadow_catch_content)
-
-        hL_main_controls.addLayout(vL_content)
-
-
-        """"
-
-        # Add Geo Widgets
-
-        self.lbl_geo = QtWidgets.QLabel("Geo")
-        font = QtGui.QFont()
-        font.setPointSize(7)
-        font.setBold(True)
-        font.setWeight(75)
-        self.lbl_geo.setFont(font)
-        self.lbl_geo.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        self.lbl_geo.setObjectName("lbl_geo")
-        self.gL_main_grp.addWidget(self.lbl_geo, 0, 0)
-
-        self.le_geo = QtWidgets.QLineEdit(self.centralwidget)
-        self.le_geo.setMinimumSize(QtCore.QSize(250, 30))
-        self.le_geo.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        # self.le_export_path.setDragEnabled(True)
-        self.le_geo.setObjectName("le_geo")
-        self.le_geo.setEnabled(False)
-        self.gL_main_grp.addWidget(self.le_geo, 1, 0)
-
-        self.btn_load_geo = QtWidgets.QToolButton()
-        self.btn_load_geo.setMinimumSize(QtCore.QSize(0, 30))
-        self.btn_load_geo.setIcon(self.btn_load_geo.style().standardIcon(QtWidgets.QStyle.SP_DialogOkButton))
-        self.btn_load_geo.setObjectName("btn_shader")
-        #self.set_export_path()
-
-        self.gL_main_grp.addWidget(self.btn_load_geo, 1, 1)
-        """
-
-        # Add Shader Widgets
-
-        self.lbl_shader = QtWidgets.QLabel("Shader")
-        font = QtGui.QFont()
-        font.setPointSize(7)
-        font.setBold(True)
-        font.setWeight(75)
-        self.lbl_shader.setFont(font)
-        self.lbl_shader.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        self.lbl_shader.setObjectName("lbl_shader")
-        self.gL_main_grp.addWidget(self.lbl_shader, 0, 0)
-
-        self.le_shader = QtWidgets.QLineEdit(self.centralwidget)
-        self.le_shader.setMinimumSize(QtCore.QSize(250, 30))
-        self.le_shader.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        # self.le_export_path.setDragEnabled(True)
-        self.le_shader.setObjectName("le_shader")
-        self.le_shader.setEnabled(False)
-        self.gL_main_grp.addWidget(self.le_shader, 1, 0)
-
-        self.btn_load_shader = QtWidgets.QToolButton()
-        self.btn_load_shader.setMinimumSize(QtCore.QSize(0, 30))
-        self.btn_load_shader.setIcon(self.btn_load_shader.style().standardIcon(QtWidgets.QStyle.SP_DialogOkButton))
-        self.btn_load_shader.setObjectName("btn_load_shader")
-
-        self.gL_main_grp.addWidget(self.btn_load_shader, 1, 1)
-
-        self.lbl_asset_name = QtWidgets.QLabel("Asset Name")
-        self.lbl_asset_name.setFont(font)
-        self.lbl_asset_name.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        self.gL_main_grp.addWidget(self.lbl_asset_name, 2, 0)
-
-        self.le_asset_name = QtWidgets.QLineEdit(self.centralwidget)
-        self.le_asset_name.setMinimumSize(QtCore.QSize(250, 25))
-        self.le_asset_name.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        #self.le_asset_name.setEnabled(False)
-        self.gL_main_grp.addWidget(self.le_asset_name, 3, 0)
-
-        self.lbl_asset_category = QtWidgets.QLabel("Asset Category")
-        self.lbl_asset_category.setFont(font)
-        self.lbl_asset_category.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        self.gL_main_grp.addWidget(self.lbl_asset_category, 4, 0)
-
-        self.le_asset_category = QtWidgets.QLineEdit(self.centralwidget)
-        self.le_asset_category.setMinimumSize(QtCore.QSize(250, 25))
-        self.le_asset_category.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        #self.le_asset_category.setEnabled(False)
-        self.gL_main_grp.addWidget(self.le_asset_category, 5, 0)
-
-        self.lbl_filename_prefix = QtWidgets.QLabel("File Name Prefix")
-        self.lbl_filename_prefix.setFont(font)
-        self.lbl_filename_prefix.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        self.gL_main_grp.addWidget(self.lbl_filename_prefix, 6, 0)
-
-        self.le_filename_prefix = QtWidgets.QLineEdit(self.centralwidget)
-        self.le_filename_prefix.setMinimumSize(QtCore.QSize(250, 25))
-        self.le_filename_prefix.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        # self.le_asset_category.setEnabled(False)
-        self.gL_main_grp.addWidget(self.le_filename_prefix, 7, 0)
-
-        self.lbl_background = QtWidgets.QLabel("Background Selector")
-        self.lbl_background.setFont(font)
-        self.lbl_background.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        self.gL_main_grp.addWidget(self.lbl_background, 8, 0)
-
-        self.le_background = QtWidgets.QLineEdit(self.centralwidget)
-        self.le_background.setMinimumSize(QtCore.QSize(250, 25))
-        self.le_background.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
-        )
-        # self.le_asset_category.setEnabled(False)
-
-        self.gL_main_grp.addWidget(self.le_background, 9, 0)
-
-        vL_shader_controls = QtWidgets.QVBoxLayout()
-        vL_shader_controls.addLayout(self.gL_main_grp)
-        hL_main_controls.addLayout(vL_shader_controls)
-        self.verticalLayout.addLayout(hL_main_controls)
-
-        spacerItem7 = QtWidgets.QSpacerItem(
-            10, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum
-        )
-        self.verticalLayout.addItem(spacerItem7)
-
-        self.btn_build_layers = QtWidgets.QPushButton()
-        self.verticalLayout.addWidget(self.btn_build_layers)
-
-        spacerItem9 = QtWidgets.QSpacerItem(
-            10, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum
-        )
-        self.verticalLayout.addItem(spacerItem9)
-
-
-        kong_render_setup_generatorWindow.setCentralWidget(self.centralwidget)
-        self.retranslateUi(kong_render_setup_generatorWindow)
-
-    def build_help(self):
-        # Help Button
-        self.hL_help = QtWidgets.QHBoxLayout()
-        self.hL_help.setObjectName("hL_help")
-        self.btn_help = QtWidgets.QToolButton()
-        # self.btn_help.setIconSize(QtCore.QSize(10, 10))
-        font = QtGui.QFont()
-        font.setBold(True)
-        font.setUnderline(True)
-        font.setWeight(75)
-        font.setPointSize(7)
-        self.btn_help.setFont(font)
-        self.btn_help.setStyleSheet("color: rgb(77, 187, 237);")
-        self.btn_help.setObjectName("btn_help")
-        self.hL_help.addWidget(self.btn_help)
-        self.hL_help.setAlignment(
-            QtCore.Qt.AlignRight | QtCore.Qt.AlignTrailing | QtCore.Qt.AlignVCenter
-        )
-        self.verticalLayout.addLayout(self.hL_help)
-        spacerItem_help = QtWidgets.QSpacerItem(
-            20, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
-        )
-        self.verticalLayout.addItem(spacerItem_help)
-
-    def build_default_header(self, kong_render_setup_generatorWindow):
-        # Setting up the default PXO header
-        self.centralwidget = QtWidgets.QWidget(kong_render_setup_generatorWindow)
-        self.centralwidget.setObjectName("centralwidget")
-        self.verticalLayout = QtWidgets.QVBoxLayout(self.centralwidget)
-        self.verticalLayout.setObjectName("verticalLayout")
-        self.gridLayout = QtWidgets.QGridLayout()
-        self.gridLayout.setObjectName("gridLayout")
-        # Shot Field Displaying current Workspace
-        self.shotField = QtWidgets.QLabel(self.centralwidget)
-        font = QtGui.QFont()
-        font.setPointSize(7)
-        self.shotField.setFont(font)
-        self.shotField.setAlignment(
-            QtCore.Qt.AlignRight | QtCore.Qt.AlignTrailing | QtCore.Qt.AlignVCenter
-        )
-        self.shotField.setObjectName("shotField")
-        # Getting Contents from environment variables
-
-        self.gridLayout.addWidget(self.shotField, 2, 2, 1, 1)
-        self.projectField = QtWidgets.QLabel(self.centralwidget)
-        font = QtGui.QFont()
-        font.setPointSize(7)
-        font.setBold(True)
-        font.setWeight(75)
-        self.projectField.setFont(font)
-        self.projectField.setAlignment(
-            QtCore.Qt.AlignRight | QtCore.Qt.AlignTrailing | QtCore.Qt.AlignVCenter
-        )
-        self.projectField.setObjectName("projectField")
-        self.gridLayout.addWidget(self.projectField, 1, 2, 1, 1)
-
-        # Adding the tool name header
-        self.toolName = QtWidgets.QLabel(self.centralwidget)
-        font = QtGui.QFont()
-        font.setPointSize(14)
-        font.setBold(True)
-        font.setWeight(75)
-        self.toolName.setFont(font)
-        self.toolName.setAlignment(
-            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter # QtCore.Qt.AlignTrailing
-        )
-        self.toolName.setObjectName("toolName")
-        self.gridLayout.addWidget(self.toolName, 0, 0, 4, 1)
-        # Adding Spacers and Lines
-        spacerItem = QtWidgets.QSpacerItem(
-            40, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
-        )
-        self.gridLayout.addItem(spacerItem, 4, 0, 1, 1)
-        self.verticalLine = QtWidgets.QFrame(self.centralwidget)
-        sizePolicy = QtWidgets.QSizePolicy(
-            QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Preferred
-        )
-        sizePolicy.setHorizontalStretch(0)
-        sizePolicy.setVerticalStretch(0)
-        sizePolicy.setHeightForWidth(self.verticalLine.sizePolicy().hasHeightForWidth())
-        self.verticalLine.setSizePolicy(sizePolicy)
-        self.verticalLine.setFrameShadow(QtWidgets.QFrame.Plain)
-        self.verticalLine.setFrameShape(QtWidgets.QFrame.VLine)
-        self.verticalLine.setObjectName("verticalLine")
-        self.gridLayout.addWidget(self.verticalLine, 0, 1, 4, 1)
-        spacerItem1 = QtWidgets.QSpacerItem(
-            40, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
-        )
-        self.gridLayout.addItem(spacerItem1, 4, 2, 1, 1)
-        self.horizontalLineTop = QtWidgets.QFrame(self.centralwidget)
-        self.horizontalLineTop.setFrameShadow(QtWidgets.QFrame.Plain)
-        self.horizontalLineTop.setFrameShape(QtWidgets.QFrame.HLine)
-        self.horizontalLineTop.setObjectName("horizontalLineTop")
-        self.gridLayout.addWidget(self.horizontalLineTop, 5, 0, 1, 3)
-        spacerItem2 = QtWidgets.QSpacerItem(
-            40, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
-        )
-        self.verticalLayout.addItem(spacerItem2)
-        self.verticalLayout.addLayout(self.gridLayout)
-
-    def retranslateUi(self, kong_render_setup_generatorWindow):
-        _translate = QtCore.QCoreApplication.translate
-        kong_render_setup_generatorWindow.setWindowTitle(
-            _translate(
-                "kong_render_setup_generatorWindow", "{} {}".format(tool_name, version)
-            )
-        )
-        self.projectField.setText(
-            "Written for Meta by Art"
-        )
-
-        self.shotField.setText(
-            "Project: AKC"
-        )
-
-        self.toolName.setText(
-            "DW Render Setup"
-        )
-
-        self.le_background.setText("background_grp")
-
-        self.btn_help.setText(_translate("kong_render_setup_generatorWindow", "Documentation"))
-        self.btn_help.clicked.connect(lambda : functions.show_help())
-
-
-        self.btn_load_shader.clicked.connect(lambda: self.load_shader())
-        #self.btn_load_geo.clicked.connect(lambda: self.load_geo())
-
-        self.le_asset_category.textChanged.connect(lambda: self.le_filename_prefix.setText(
-            self.build_filename_prefix(self.le_asset_category.text())))
-
-
-        self.btn_build_layers.setText("Build Layers")
-        self.btn_build_layers.clicked.connect(lambda : self.build_layers_clicked())
-
-    def build_filename_prefix(self, category):
-        file_name_prefix = "shuffle/" + category  + "/<RenderLayer>"
-        return file_name_prefix
-
-    def load_geo(self):
-
-        text = functions.load_selected_geo()
-        self.geo = text[0]
-        if text:
-            self.le_geo.setText(text[-1])
-        else:
-            self.le_geo.setText("")
-
-    def load_shader(self):
-
-        valid, self.sg, self.asset_name, self.variations = functions.load_selected_shader(pmc.ls(sl=1))
-
-        file_name_prefix = self.build_filename_prefix(self.asset_name)
-
-        if valid:
-            self.le_shader.setText(str(self.sg))
-            self.le_asset_name.setText(self.asset_name)
-            self.le_asset_category.setText(self.asset_name)
-            self.le_filename_prefix.setText(file_name_prefix)
-        else:
-            self.le_shader.setText("")
-            self.le_asset_name.setText("")
-            self.le_asset_category.setText("")
-            self.le_filename_prefix.setText("")
-
-    def build_layers_clicked(self):
-
-        self.geo = [item.text() for item in self.content_widget.get_items(self.content_widget.lw_selection)]
-
-        self.shadow_catch_geo = [item.text() for item in self.shadow_catch_content.get_items(self.shadow_catch_content.lw_selection)]
-
-        if not self.geo:
-            pmc.warning("Please define Geo first.")
-            return
-        if not self.sg:
-            pmc.warning("Please define a Shading Engine first.")
-            return
-
-        # fetch asset name and file name prefix again since it might have changed
-        # by user input
-
-        self.asset_name = self.le_asset_name.text()
-        if not self.asset_name:
-            pmc.warning("No Valid asset name found, aborting.")
-            return
-
-        filename_prefix = self.le_filename_prefix.text()
-        if not filename_prefix:
-            pmc.warning("No Valid file name prefix found, aborting.")
-            return
-
-        bg_selector = self.le_background.text()
-        if not bg_selector:
-            pmc.warning("No Valid bg selector found, aborting.")
-            return
-
-        functions.build_render_setup(self.geo, self.shadow_catch_geo, self.asset_name, filename_prefix, self.sg, self.variations, bg_selector)
-
-
-
-def run():
-    """Launch the app."""
-
-    windowName = "kong_render_setup_generatorWindow"
-
-    functions.kill_existing_app(windowName)
-
-
-    app = QtWidgets.QApplication.instance()
-
-    for obj in QtWidgets.QApplication.topLevelWidgets():
-        if obj.objectName() == "MayaWindow":
-            kong_render_setup_generatorWindow = QtWidgets.QMainWindow(obj)
-            ui = Ui_kong_render_setup_generatorWindow()
-            ui.setupUi(kong_render_setup_generatorWindow)
-            kong_render_setup_generatorWindow.show()
-
+# Import built-in modules
+import os
+import sys
+import threading
+
+# maya.cmds is loaded with every maya session, pymel and the render setup modules
+# only get imported by the actions that need them
+import maya.cmds as cmds
+
+file_dir = os.path.dirname(__file__)
+sys.path.append(file_dir)
+
+# Import third-party modules
+from PySide2 import QtCore, QtGui, QtWidgets
+
+from dw_kong_render_setup import functions
+from dw_kong_render_setup import patterns
+from dw_kong_render_setup import discovery
+from dw_kong_render_setup import build_job
+from dw_kong_render_setup import preflight
+
+# reload the tool modules on every launch only in dev mode
+DEV_MODE = os.environ.get("KONG_RENDER_SETUP_DEV") == "1"
+
+if DEV_MODE:
+    import importlib as imp
+    from dw_kong_render_setup import tracing, backend, shader_cache, channels, patterns, reconcile, hierarchy, texture_index
+    for module in (tracing, backend, shader_cache, channels, patterns, reconcile, hierarchy, functions, texture_index, discovery, build_job, preflight):
+        imp.reload(module)
+
+
+tool_name = "Omegas Render Setup"
+version = "v001"
+
+# milliseconds without edits before the match previews are evaluated again
+PREVIEW_DELAY = 250
+
+class SelectionListModel(QtCore.QAbstractListModel):
+    """
+    List model of node names, a set index keeps the dedupe constant time per name
+    rows are only inserted and removed in batches, views get a single signal per batch
+    """
+
+    # more removed ranges than this reset the model instead of signaling every range
+    MAX_REMOVE_RANGES = 100
+
+    def __init__(self, parent=None):
+        super(SelectionListModel, self).__init__(parent)
+        self._items = []
+        self._index = set()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._items)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole):
+            return self._items[index.row()]
+        return None
+
+    def items(self):
+        return list(self._items)
+
+    def add_items(self, names):
+        """
+        appends all names not in the list yet
+        :param names: list of str
+        :return: int number of added names
+        """
+        new = []
+        for name in names:
+            name = str(name)
+            if name not in self._index:
+                self._index.add(name)
+                new.append(name)
+
+        if new:
+            first = len(self._items)
+            self.beginInsertRows(QtCore.QModelIndex(), first, first + len(new) - 1)
+            self._items.extend(new)
+            self.endInsertRows()
+
+        return len(new)
+
+    def remove_rows(self, rows):
+        """
+        removes the given rows, neighbouring rows are removed as one range
+        :param rows: list of int row numbers
+        :return:
+        """
+        rows = sorted(set(rows))
+        if not rows:
+            return
+
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+
+        if len(ranges) > self.MAX_REMOVE_RANGES:
+            removed = set(rows)
+            self.beginResetModel()
+            self._items = [x for i, x in enumerate(self._items) if i not in removed]
+            self._index = set(self._items)
+            self.endResetModel()
+            return
+
+        # back to front, the rows of the remaining ranges stay valid
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            for name in self._items[first:last + 1]:
+                self._index.discard(name)
+            del self._items[first:last + 1]
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._items = []
+        self._index = set()
+        self.endResetModel()
+
+
+class SelectionManagerWidget(QtWidgets.QWidget):
+    """
+    Custom Qt Widget with filterable selection list view, add, remove and clear btn
+    """
+    def __init__(self, name="Content"):
+
+        super(SelectionManagerWidget, self).__init__()
+
+        layout = QtWidgets.QVBoxLayout()
+        self.lbl_name = QtWidgets.QLabel()
+        self.lbl_name.setText(name)
+        font = QtGui.QFont()
+        font.setPointSize(7)
+        font.setBold(True)
+        font.setWeight(75)
+        self.lbl_name.setFont(font)
+        layout.addWidget(self.lbl_name)
+
+        self.le_filter = QtWidgets.QLineEdit()
+        self.le_filter.setPlaceholderText("Filter")
+        self.le_filter.setClearButtonEnabled(True)
+        layout.addWidget(self.le_filter)
+
+        self.model = SelectionListModel(self)
+        self.proxy_model = QtCore.QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setFilterCaseSensitivity(QtCore.Qt.CaseInsensitive)
+
+        self.lv_selection = QtWidgets.QListView()
+        self.lv_selection.setModel(self.proxy_model)
+        self.lv_selection.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
+        # all rows have the same height, the view doesn't have to measure every row
+        self.lv_selection.setUniformItemSizes(True)
+        layout.addWidget(self.lv_selection)
+
+        # matched objects of the content pattern, filled by the match preview
+        self.lbl_matches = QtWidgets.QLabel()
+        self.lbl_matches.setFont(font)
+        layout.addWidget(self.lbl_matches)
+
+        layout_controls = QtWidgets.QHBoxLayout()
+
+        self.btn_add_content = QtWidgets.QPushButton("+")
+        self.btn_add_content.setMinimumSize(QtCore.QSize(0, 15))
+        self.btn_add_content.setObjectName("btn_add_content")
+        layout_controls.addWidget(self.btn_add_content)
+
+        self.btn_remove_content = QtWidgets.QPushButton("-")
+        self.btn_remove_content.setMinimumSize(QtCore.QSize(0, 15))
+        self.btn_remove_content.setObjectName("btn_remove_content")
+        layout_controls.addWidget(self.btn_remove_content)
+
+        self.btn_clear_content = QtWidgets.QToolButton()
+        self.btn_clear_content.setMinimumSize((QtCore.QSize(0, 15)))
+        self.btn_clear_content.setIcon(self.btn_clear_content.style().standardIcon(QtWidgets.QStyle.SP_DialogCancelButton))
+        self.btn_clear_content.setObjectName("btn_clear_content")
+        layout_controls.addWidget(self.btn_clear_content)
+
+        layout.addLayout(layout_controls)
+
+        self.setLayout(layout)
+
+        self.btn_add_content.clicked.connect(lambda : self.populate())
+        self.btn_remove_content.clicked.connect(lambda : self.remove_sel())
+        self.btn_clear_content.clicked.connect(lambda : self.clear_list())
+        self.le_filter.textChanged.connect(lambda text: self.proxy_model.setFilterFixedString(text))
+
+    def get_items(self):
+        """
+        :return: list of str names in the list, unfiltered
+        """
+        return self.model.items()
+
+    def remove_sel(self):
+        rows = [self.proxy_model.mapToSource(x).row() for x in self.lv_selection.selectionModel().selectedRows()]
+
+        if not rows:
+            return
+        self.model.remove_rows(rows)
+
+    def clear_list(self):
+        self.model.clear()
+
+    def populate(self):
+
+        sel = cmds.ls(sl=1)
+
+        if self.model.add_items(sel):
+            self.lv_selection.scrollToBottom()
+
+    def clear_file_path(self):
+        print ("Clearing Widget {}".format(self.le_file_path))
+        self.le_file_path.setText("")
+        self.drp_cc_select.setCurrentText("Off")
+        return
+
+class Ui_kong_render_setup_generatorWindow(object):
+
+    def __init__(self):
+        self.geo = None
+        self.sg = ""
+        self.asset_name = "default"
+        self.variations = {}
+        self.window = None
+        self.build_job = None
+        self.build_finished = None
+        self.texture_index_thread = None
+        self.build_progress = None
+        self.build_timer = None
+        self.name_index = None
+
+    def setupUi(self, kong_render_setup_generatorWindow):
+
+        self.window = kong_render_setup_generatorWindow
+        kong_render_setup_generatorWindow.setObjectName("kong_render_setup_generatorWindow")
+        kong_render_setup_generatorWindow.resize(600, 300)
+
+        self.build_default_header(kong_render_setup_generatorWindow)
+
+        self.build_help()
+
+        # Tool Specific UI
+
+        self.gL_main_grp = QtWidgets.QGridLayout()
+        self.gL_main_grp.setObjectName("gL_source")
+
+
+        hL_main_controls = QtWidgets.QHBoxLayout()
+
+        vL_content = QtWidgets.QVBoxLayout()
+        self.content_widget = SelectionManagerWidget("Beauty Geo")
+        vL_content.addWidget(self.content_widget)
+
+        self.shadow_catch_content = SelectionManagerWidget("Shadow Catch Geo")
+        vL_content.addWidget(self.shadow_catch_content)
+
+        hL_main_controls.addLayout(vL_content)
+
+
+        """"
+
+        # Add Geo Widgets
+
+        self.lbl_geo = QtWidgets.QLabel("Geo")
+        font = QtGui.QFont()
+        font.setPointSize(7)
+        font.setBold(True)
+        font.setWeight(75)
+        self.lbl_geo.setFont(font)
+        self.lbl_geo.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.lbl_geo.setObjectName("lbl_geo")
+        self.gL_main_grp.addWidget(self.lbl_geo, 0, 0)
+
+        self.le_geo = QtWidgets.QLineEdit(self.centralwidget)
+        self.le_geo.setMinimumSize(QtCore.QSize(250, 30))
+        self.le_geo.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        # self.le_export_path.setDragEnabled(True)
+        self.le_geo.setObjectName("le_geo")
+        self.le_geo.setEnabled(False)
+        self.gL_main_grp.addWidget(self.le_geo, 1, 0)
+
+        self.btn_load_geo = QtWidgets.QToolButton()
+        self.btn_load_geo.setMinimumSize(QtCore.QSize(0, 30))
+        self.btn_load_geo.setIcon(self.btn_load_geo.style().standardIcon(QtWidgets.QStyle.SP_DialogOkButton))
+        self.btn_load_geo.setObjectName("btn_shader")
+        #self.set_export_path()
+
+        self.gL_main_grp.addWidget(self.btn_load_geo, 1, 1)
+        """
+
+        # Add Shader Widgets
+
+        self.lbl_shader = QtWidgets.QLabel("Shader")
+        font = QtGui.QFont()
+        font.setPointSize(7)
+        font.setBold(True)
+        font.setWeight(75)
+        self.lbl_shader.setFont(font)
+        self.lbl_shader.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.lbl_shader.setObjectName("lbl_shader")
+        self.gL_main_grp.addWidget(self.lbl_shader, 0, 0)
+
+        self.le_shader = QtWidgets.QLineEdit(self.centralwidget)
+        self.le_shader.setMinimumSize(QtCore.QSize(250, 30))
+        self.le_shader.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        # self.le_export_path.setDragEnabled(True)
+        self.le_shader.setObjectName("le_shader")
+        self.le_shader.setEnabled(False)
+        self.gL_main_grp.addWidget(self.le_shader, 1, 0)
+
+        self.btn_load_shader = QtWidgets.QToolButton()
+        self.btn_load_shader.setMinimumSize(QtCore.QSize(0, 30))
+        self.btn_load_shader.setIcon(self.btn_load_shader.style().standardIcon(QtWidgets.QStyle.SP_DialogOkButton))
+        self.btn_load_shader.setObjectName("btn_load_shader")
+
+        self.gL_main_grp.addWidget(self.btn_load_shader, 1, 1)
+
+        self.lbl_asset_name = QtWidgets.QLabel("Asset Name")
+        self.lbl_asset_name.setFont(font)
+        self.lbl_asset_name.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.gL_main_grp.addWidget(self.lbl_asset_name, 2, 0)
+
+        self.le_asset_name = QtWidgets.QLineEdit(self.centralwidget)
+        self.le_asset_name.setMinimumSize(QtCore.QSize(250, 25))
+        self.le_asset_name.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        #self.le_asset_name.setEnabled(False)
+        self.gL_main_grp.addWidget(self.le_asset_name, 3, 0)
+
+        self.lbl_asset_category = QtWidgets.QLabel("Asset Category")
+        self.lbl_asset_category.setFont(font)
+        self.lbl_asset_category.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.gL_main_grp.addWidget(self.lbl_asset_category, 4, 0)
+
+        self.le_asset_category = QtWidgets.QLineEdit(self.centralwidget)
+        self.le_asset_category.setMinimumSize(QtCore.QSize(250, 25))
+        self.le_asset_category.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        #self.le_asset_category.setEnabled(False)
+        self.gL_main_grp.addWidget(self.le_asset_category, 5, 0)
+
+        self.lbl_filename_prefix = QtWidgets.QLabel("File Name Prefix")
+        self.lbl_filename_prefix.setFont(font)
+        self.lbl_filename_prefix.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.gL_main_grp.addWidget(self.lbl_filename_prefix, 6, 0)
+
+        self.le_filename_prefix = QtWidgets.QLineEdit(self.centralwidget)
+        self.le_filename_prefix.setMinimumSize(QtCore.QSize(250, 25))
+        self.le_filename_prefix.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        # self.le_asset_category.setEnabled(False)
+        self.gL_main_grp.addWidget(self.le_filename_prefix, 7, 0)
+
+        self.lbl_background = QtWidgets.QLabel("Background Selector")
+        self.lbl_background.setFont(font)
+        self.lbl_background.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.gL_main_grp.addWidget(self.lbl_background, 8, 0)
+
+        self.le_background = QtWidgets.QLineEdit(self.centralwidget)
+        self.le_background.setMinimumSize(QtCore.QSize(250, 25))
+        self.le_background.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        # self.le_asset_category.setEnabled(False)
+
+        self.gL_main_grp.addWidget(self.le_background, 9, 0)
+
+        self.lbl_background_matches = QtWidgets.QLabel()
+        self.gL_main_grp.addWidget(self.lbl_background_matches, 10, 0)
+
+        self.lbl_build_mode = QtWidgets.QLabel("Build Mode")
+        self.lbl_build_mode.setFont(font)
+        self.lbl_build_mode.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter
+        )
+        self.gL_main_grp.addWidget(self.lbl_build_mode, 11, 0)
+
+        self.drp_build_mode = QtWidgets.QComboBox(self.centralwidget)
+        self.drp_build_mode.setMinimumSize(QtCore.QSize(250, 25))
+        self.drp_build_mode.addItems(functions.BUILD_MODES)
+        self.gL_main_grp.addWidget(self.drp_build_mode, 12, 0)
+
+        vL_shader_controls = QtWidgets.QVBoxLayout()
+        vL_shader_controls.addLayout(self.gL_main_grp)
+        hL_main_controls.addLayout(vL_shader_controls)
+        self.verticalLayout.addLayout(hL_main_controls)
+
+        spacerItem7 = QtWidgets.QSpacerItem(
+            10, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum
+        )
+        self.verticalLayout.addItem(spacerItem7)
+
+        self.btn_preview_matches = QtWidgets.QPushButton()
+        self.verticalLayout.addWidget(self.btn_preview_matches)
+
+        self.btn_build_layers = QtWidgets.QPushButton()
+        self.verticalLayout.addWidget(self.btn_build_layers)
+
+        self.btn_build_all_assets = QtWidgets.QPushButton()
+        self.verticalLayout.addWidget(self.btn_build_all_assets)
+
+        self.btn_export_manifest = QtWidgets.QPushButton()
+        self.verticalLayout.addWidget(self.btn_export_manifest)
+
+        spacerItem9 = QtWidgets.QSpacerItem(
+            10, 10, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Minimum
+        )
+        self.verticalLayout.addItem(spacerItem9)
+
+
+        kong_render_setup_generatorWindow.setCentralWidget(self.centralwidget)
+        self.retranslateUi(kong_render_setup_generatorWindow)
+
+    def build_help(self):
+        # Help Button
+        self.hL_help = QtWidgets.QHBoxLayout()
+        self.hL_help.setObjectName("hL_help")
+        self.btn_help = QtWidgets.QToolButton()
+        # self.btn_help.setIconSize(QtCore.QSize(10, 10))
+        font = QtGui.QFont()
+        font.setBold(True)
+        font.setUnderline(True)
+        font.setWeight(75)
+        font.setPointSize(7)
+        self.btn_help.setFont(font)
+        self.btn_help.setStyleSheet("color: rgb(77, 187, 237);")
+        self.btn_help.setObjectName("btn_help")
+        self.hL_help.addWidget(self.btn_help)
+        self.hL_help.setAlignment(
+            QtCore.Qt.AlignRight | QtCore.Qt.AlignTrailing | QtCore.Qt.AlignVCenter
+        )
+        self.verticalLayout.addLayout(self.hL_help)
+        spacerItem_help = QtWidgets.QSpacerItem(
+            20, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
+        )
+        self.verticalLayout.addItem(spacerItem_help)
+
+    def build_default_header(self, kong_render_setup_generatorWindow):
+        # Setting up the default PXO header
+        self.centralwidget = QtWidgets.QWidget(kong_render_setup_generatorWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.verticalLayout = QtWidgets.QVBoxLayout(self.centralwidget)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.gridLayout = QtWidgets.QGridLayout()
+        self.gridLayout.setObjectName("gridLayout")
+        # Shot Field Displaying current Workspace
+        self.shotField = QtWidgets.QLabel(self.centralwidget)
+        font = QtGui.QFont()
+        font.setPointSize(7)
+        self.shotField.setFont(font)
+        self.shotField.setAlignment(
+            QtCore.Qt.AlignRight | QtCore.Qt.AlignTrailing | QtCore.Qt.AlignVCenter
+        )
+        self.shotField.setObjectName("shotField")
+        # Getting Contents from environment variables
+
+        self.gridLayout.addWidget(self.shotField, 2, 2, 1, 1)
+        self.projectField = QtWidgets.QLabel(self.centralwidget)
+        font = QtGui.QFont()
+        font.setPointSize(7)
+        font.setBold(True)
+        font.setWeight(75)
+        self.projectField.setFont(font)
+        self.projectField.setAlignment(
+            QtCore.Qt.AlignRight | QtCore.Qt.AlignTrailing | QtCore.Qt.AlignVCenter
+        )
+        self.projectField.setObjectName("projectField")
+        self.gridLayout.addWidget(self.projectField, 1, 2, 1, 1)
+
+        # Adding the tool name header
+        self.toolName = QtWidgets.QLabel(self.centralwidget)
+        font = QtGui.QFont()
+        font.setPointSize(14)
+        font.setBold(True)
+        font.setWeight(75)
+        self.toolName.setFont(font)
+        self.toolName.setAlignment(
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter # QtCore.Qt.AlignTrailing
+        )
+        self.toolName.setObjectName("toolName")
+        self.gridLayout.addWidget(self.toolName, 0, 0, 4, 1)
+        # Adding Spacers and Lines
+        spacerItem = QtWidgets.QSpacerItem(
+            40, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
+        )
+        self.gridLayout.addItem(spacerItem, 4, 0, 1, 1)
+        self.verticalLine = QtWidgets.QFrame(self.centralwidget)
+        sizePolicy = QtWidgets.QSizePolicy(
+            QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Preferred
+        )
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.verticalLine.sizePolicy().hasHeightForWidth())
+        self.verticalLine.setSizePolicy(sizePolicy)
+        self.verticalLine.setFrameShadow(QtWidgets.QFrame.Plain)
+        self.verticalLine.setFrameShape(QtWidgets.QFrame.VLine)
+        self.verticalLine.setObjectName("verticalLine")
+        self.gridLayout.addWidget(self.verticalLine, 0, 1, 4, 1)
+        spacerItem1 = QtWidgets.QSpacerItem(
+            40, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
+        )
+        self.gridLayout.addItem(spacerItem1, 4, 2, 1, 1)
+        self.horizontalLineTop = QtWidgets.QFrame(self.centralwidget)
+        self.horizontalLineTop.setFrameShadow(QtWidgets.QFrame.Plain)
+        self.horizontalLineTop.setFrameShape(QtWidgets.QFrame.HLine)
+        self.horizontalLineTop.setObjectName("horizontalLineTop")
+        self.gridLayout.addWidget(self.horizontalLineTop, 5, 0, 1, 3)
+        spacerItem2 = QtWidgets.QSpacerItem(
+            40, 10, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
+        )
+        self.verticalLayout.addItem(spacerItem2)
+        self.verticalLayout.addLayout(self.gridLayout)
+
+    def retranslateUi(self, kong_render_setup_generatorWindow):
+        _translate = QtCore.QCoreApplication.translate
+        kong_render_setup_generatorWindow.setWindowTitle(
+            _translate(
+                "kong_render_setup_generatorWindow", "{} {}".format(tool_name, version)
+            )
+        )
+        self.projectField.setText(
+            "Written for Meta by Art"
+        )
+
+        self.shotField.setText(
+            "Project: AKC"
+        )
+
+        self.toolName.setText(
+            "DW Render Setup"
+        )
+
+        self.le_background.setText("background_grp")
+
+        self.btn_help.setText(_translate("kong_render_setup_generatorWindow", "Documentation"))
+        self.btn_help.clicked.connect(lambda : functions.show_help())
+
+
+        self.btn_load_shader.clicked.connect(lambda: self.load_shader())
+        #self.btn_load_geo.clicked.connect(lambda: self.load_geo())
+
+        self.le_asset_category.textChanged.connect(lambda: self.le_filename_prefix.setText(
+            self.build_filename_prefix(self.le_asset_category.text())))
+
+
+        self.btn_preview_matches.setText("Preview Matches")
+        self.btn_preview_matches.clicked.connect(lambda : self.preview_matches_clicked())
+
+        # previews follow the edits once the scene names are indexed, a burst of edits is evaluated once
+        self.preview_timer = QtCore.QTimer(kong_render_setup_generatorWindow)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DELAY)
+        self.preview_timer.timeout.connect(lambda: self.update_match_previews())
+        self.le_background.textChanged.connect(lambda : self.preview_timer.start())
+        for widget in (self.content_widget, self.shadow_catch_content):
+            widget.model.rowsInserted.connect(lambda *args: self.preview_timer.start())
+            widget.model.rowsRemoved.connect(lambda *args: self.preview_timer.start())
+            widget.model.modelReset.connect(lambda *args: self.preview_timer.start())
+
+        self.btn_build_layers.setText("Build Layers")
+        self.btn_build_layers.clicked.connect(lambda : self.build_layers_clicked())
+
+        self.btn_build_all_assets.setText("Build All Assets")
+        self.btn_build_all_assets.clicked.connect(lambda : self.build_all_assets_clicked())
+
+        self.btn_export_manifest.setText("Export Manifest")
+        self.btn_export_manifest.clicked.connect(lambda : self.export_manifest_clicked())
+
+    def build_filename_prefix(self, category):
+        return functions.build_filename_prefix(category)
+
+    def load_geo(self):
+
+        text = functions.load_selected_geo()
+        self.geo = text[0]
+        if text:
+            self.le_geo.setText(text[-1])
+        else:
+            self.le_geo.setText("")
+
+    def load_shader(self):
+
+        valid, self.sg, self.asset_name, self.variations = functions.load_selected_shader(cmds.ls(sl=1))
+
+        file_name_prefix = self.build_filename_prefix(self.asset_name)
+
+        if valid:
+            self.le_shader.setText(str(self.sg))
+            self.le_asset_name.setText(self.asset_name)
+            self.le_asset_category.setText(self.asset_name)
+            self.le_filename_prefix.setText(file_name_prefix)
+            self.report_texture_index()
+        else:
+            self.le_shader.setText("")
+            self.le_asset_name.setText("")
+            self.le_asset_category.setText("")
+            self.le_filename_prefix.setText("")
+
+    def report_texture_index(self):
+
+        # variations and versions on disk, the switch only knows the wired ones
+        # the root comes from the switch snapshot of the loaded shader, the disk is scanned in a thread
+
+        import maya.utils
+        from dw_kong_render_setup import backend
+        from dw_kong_render_setup import texture_index
+
+        root = functions.get_texture_root(self.sg)
+        if not root:
+            return
+
+        if self.texture_index_thread and self.texture_index_thread.is_alive():
+            functions.logger.info("Texture index still running, skipping %s", root)
+            return
+
+        cache_path = texture_index.get_cache_path(backend.get_backend().prefs_dir())
+        variations = dict(self.variations)
+
+        def scan():
+            try:
+                index = texture_index.get_index(root, cache_path)
+            except Exception:
+                functions.logger.exception("Indexing textures in {} failed".format(root))
+                return
+            # warnings and the ui only get touched from the main thread
+            maya.utils.executeDeferred(lambda: self.texture_index_ready(index, variations))
+
+        self.texture_index_thread = threading.Thread(target=scan, name="Kong Texture Index")
+        self.texture_index_thread.daemon = True
+        self.texture_index_thread.start()
+
+    def texture_index_ready(self, index, variations):
+
+        from dw_kong_render_setup import texture_index
+
+        unwired = texture_index.get_unwired_variations(index, variations)
+        if unwired:
+            cmds.warning("Variations on disk not connected to a switch : {}".format(", ".join(unwired)))
+
+        functions.logger.info("Latest texture versions : %s", texture_index.get_latest_versions(index))
+
+    def preview_matches_clicked(self):
+
+        # snapshot the scene names once, the expressions are evaluated against the snapshot without building
+
+        self.name_index = patterns.build_name_index(cmds.ls(dag=True, long=True) or [])
+        self.update_match_previews()
+
+    def update_match_previews(self):
+
+        if self.name_index is None:
+            return
+
+        previews = ((self.content_widget.lbl_matches, functions.build_search_string(self.content_widget.get_items())),
+                    (self.shadow_catch_content.lbl_matches,
+                     functions.build_search_string(self.shadow_catch_content.get_items())),
+                    (self.lbl_background_matches, self.le_background.text()))
+
+        for label, expression in previews:
+            preview = patterns.preview_expression(expression, self.name_index)
+            # a few names in the label, all samples in the tooltip
+            samples = [x.split("|")[-1] for x in preview["samples"][:3]]
+            more = " ..." if preview["count"] > len(samples) else ""
+            label.setText("{} matches : {}{}".format(preview["count"], ", ".join(samples), more))
+            label.setToolTip("\n".join(preview["samples"]))
+
+    def build_layers_clicked(self):
+
+        self.geo = self.content_widget.get_items()
+
+        self.shadow_catch_geo = self.shadow_catch_content.get_items()
+
+        if not self.geo:
+            cmds.warning("Please define Geo first.")
+            return
+        if not self.sg:
+            cmds.warning("Please define a Shading Engine first.")
+            return
+
+        # fetch asset name and file name prefix again since it might have changed
+        # by user input
+
+        self.asset_name = self.le_asset_name.text()
+        if not self.asset_name:
+            cmds.warning("No Valid asset name found, aborting.")
+            return
+
+        filename_prefix = self.le_filename_prefix.text()
+        if not filename_prefix:
+            cmds.warning("No Valid file name prefix found, aborting.")
+            return
+
+        bg_selector = self.le_background.text()
+        if not bg_selector:
+            cmds.warning("No Valid bg selector found, aborting.")
+            return
+
+        build_mode = self.drp_build_mode.currentText()
+
+        # check all textures before anything gets built, broken variations can be skipped
+
+        report = preflight.run_preflight(self.sg, self.variations)
+        broken = preflight.get_broken_variations(report)
+        skip = []
+
+        if broken:
+            answer = QtWidgets.QMessageBox.question(
+                self.window, "Texture Preflight",
+                "{} of {} variations have missing or broken textures :\n{}\n\nSkip them?".format(
+                    len(broken), len(self.variations), ", ".join(broken)),
+                QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No | QtWidgets.QMessageBox.Cancel)
+            if answer == QtWidgets.QMessageBox.Cancel:
+                return
+            if answer == QtWidgets.QMessageBox.Yes:
+                skip = broken
+
+        # the frames mode renders variation N on frame N, the mapping is written next to the scene
+        # once the build went through, a cancelled or failed build leaves no mapping behind
+
+        asset_name = self.asset_name
+        built = dict((x, self.variations[x]) for x in self.variations if self.variations[x] not in skip)
+
+        def write_frame_mapping():
+            scene_path = cmds.file(q=True, sn=True)
+            if scene_path:
+                functions.write_frame_mapping(built, functions.get_frame_mapping_path(scene_path, asset_name))
+            else:
+                cmds.warning("Scene isn't saved, frame mapping was not written : {}".format(functions.get_frame_mapping(built)))
+
+        # build step wise from a timer, the ui stays responsive and the build can be cancelled
+
+        journal = functions.new_build_journal()
+        steps = functions.iter_build_render_setup(self.geo, self.shadow_catch_geo, self.asset_name, filename_prefix, self.sg, self.variations, bg_selector, build_mode, journal=journal, skip=skip)
+        self.start_build_job(build_job.BuildJob(steps, lambda: functions.rollback_build(journal),
+                                                lambda: functions.bulk_edit("Kong Build Layers")),
+                             write_frame_mapping if build_mode == functions.BUILD_MODE_FRAMES else None)
+
+    def start_build_job(self, job, on_finished=None):
+
+        if self.build_job and not self.build_job.finished:
+            cmds.warning("A build is already running.")
+            return
+
+        self.build_job = job
+        self.build_finished = on_finished
+
+        self.build_progress = QtWidgets.QProgressDialog("Building Layers ...", "Cancel", 0, 0, self.window)
+        self.build_progress.setWindowTitle("Build Layers")
+        self.build_progress.setWindowModality(QtCore.Qt.WindowModal)
+        self.build_progress.setMinimumDuration(0)
+        self.build_progress.setAutoClose(False)
+        self.build_progress.setAutoReset(False)
+        self.build_progress.canceled.connect(lambda: self.cancel_build_job())
+
+        # single shot chain, the next tick is only queued after the current one is done
+        self.build_timer = QtCore.QTimer(self.build_progress)
+        self.build_timer.setSingleShot(True)
+        self.build_timer.timeout.connect(lambda: self.build_job_tick())
+        self.build_timer.start(0)
+
+    def build_job_tick(self):
+
+        job = self.build_job
+        if job.finished:
+            return
+
+        try:
+            running = job.step()
+        except Exception as e:
+            self.build_progress.close()
+            cmds.warning("Build failed and was rolled back : {}".format(e))
+            return
+
+        self.build_progress.setMaximum(job.total)
+        self.build_progress.setValue(job.done)
+
+        eta = job.eta()
+        eta_text = "{:.0f}s left".format(eta) if eta is not None else "estimating"
+        self.build_progress.setLabelText("{} ({}/{}) - {}".format(job.label, job.done, job.total, eta_text))
+
+        if running:
+            self.build_timer.start(0)
+        else:
+            # closing emits canceled, the finished job ignores it
+            self.build_progress.close()
+            functions.logger.info("Build finished in %.1fs", job.elapsed)
+            if self.build_finished:
+                self.build_finished()
+
+    def cancel_build_job(self):
+
+        if self.build_job and not self.build_job.finished:
+            self.build_timer.stop()
+            self.build_job.cancel()
+            cmds.warning("Build cancelled, all changes were rolled back.")
+
+    def build_all_assets_clicked(self):
+
+        # every elements_<asset>_sg of the scene with its assigned geo, no selection needed
+
+        assets = discovery.discover_assets()
+        if not assets:
+            cmds.warning("No asset shading engines found, aborting.")
+            return
+
+        self.shadow_catch_geo = self.shadow_catch_content.get_items()
+
+        bg_selector = self.le_background.text()
+        if not bg_selector:
+            cmds.warning("No Valid bg selector found, aborting.")
+            return
+
+        build_mode = self.drp_build_mode.currentText()
+
+        discovery.build_assets(assets, self.shadow_catch_geo, bg_selector, build_mode)
+
+    def export_manifest_clicked(self):
+
+        from dw_kong_render_setup import manifest
+
+        asset_name = self.le_asset_name.text()
+        if not asset_name:
+            cmds.warning("No Valid asset name found, aborting.")
+            return
+
+        scene_dir = os.path.dirname(cmds.file(q=True, sn=True) or "")
+        path = QtWidgets.QFileDialog.getSaveFileName(
+            self.window, "Export Manifest", os.path.join(scene_dir, asset_name + "_manifest.json"),
+            "Manifest (*.json *.csv)")[0]
+        if not path:
+            return
+
+        layer_manifest = manifest.build_manifest(asset_name)
+        if not layer_manifest["layers"]:
+            cmds.warning("No layers found for {}.".format(asset_name))
+            return
+
+        manifest.write_manifest(layer_manifest, path)
+
+
+def run():
+    """Launch the app."""
+
+    windowName = "kong_render_setup_generatorWindow"
+
+    functions.kill_existing_app(windowName)
+
+
+    app = QtWidgets.QApplication.instance()
+
+    for obj in QtWidgets.QApplication.topLevelWidgets():
+        if obj.objectName() == "MayaWindow":
+            kong_render_setup_generatorWindow = QtWidgets.QMainWindow(obj)
+            ui = Ui_kong_render_setup_generatorWindow()
+            ui.setupUi(kong_render_setup_generatorWindow)
+            kong_render_setup_generatorWindow.show()
+
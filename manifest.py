@@ -0,0 +1,207 @@
+"""
+Layer manifest export and farm job planning.
+
+The manifest lists every generated variation layer with its output prefix, switch value and content counts:
+
+    manifest = build_manifest("asset")
+    write_manifest(manifest, "/path/to/asset_manifest.json")
+
+Layers of a manifest get bin packed into farm jobs close to a target duration:
+
+    python manifest.py asset_manifest.json --target 3600 --frames 1 1 --costs costs.json --output jobs.json
+
+costs.json optionally holds measured seconds per frame per layer, {"asset_red": 120.0}, layers without
+a measured cost get estimated from their content counts.
+"""
+
+# Import built-in modules
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+# columns of a manifest entry, in csv order
+FIELDS = ["layer", "asset", "variation", "index", "prefix", "content_count", "shadow_count", "selector"]
+
+# estimated seconds per frame of a layer without measured costs, scene translation plus a share per object
+COST_BASE_SECONDS = 60.0
+COST_PER_OBJECT_SECONDS = 0.05
+
+DEFAULT_TARGET_SECONDS = 3600.0
+
+
+def build_manifest(asset_name, backend=None):
+    """
+    reads every variation layer of an asset from the render setup
+    :param asset_name: name of the asset
+    :param backend: scene backend, defaults to the current backend
+    :return: dict with asset, time and list of layer entries
+    """
+    from dw_kong_render_setup import backend as scene_backend
+    from dw_kong_render_setup import patterns
+    from dw_kong_render_setup import reconcile
+
+    backend = backend or scene_backend.get_backend()
+    rs = backend.render_setup()
+
+    names = None
+    counts = {}
+
+    def count_objects(coll):
+        # layers of a build share their selectors, every selector is resolved once
+        value = reconcile.get_selector_value(coll)
+        if value.static:
+            return len(value.static), "static"
+        if value.pattern not in counts:
+            terms = [x.strip() for x in value.pattern.split(",") if x.strip()]
+            counts[value.pattern] = len(patterns.match_terms(terms, [x.split("|")[-1] for x in names]))
+        return counts[value.pattern], "pattern"
+
+    entries = []
+    for layer in rs.getRenderLayers():
+        if not layer.name().startswith(asset_name + "_"):
+            continue
+        state = reconcile.read_layer(layer, asset_name)
+        if not state:
+            continue
+        if names is None:
+            names = backend.list_node_names()
+
+        content_count, selector = count_objects(state["content"])
+        shadow_count = count_objects(state["shadow"])[0]
+        entries.append({"layer": layer.name(), "asset": asset_name,
+                        "variation": layer.name()[len(asset_name) + 1:],
+                        "index": state["index"].getAttrValue(), "prefix": state["prefix"].getAttrValue(),
+                        "content_count": content_count, "shadow_count": shadow_count, "selector": selector})
+
+    return {"asset": asset_name, "time": time.strftime("%Y-%m-%d %H:%M:%S"), "layers": entries}
+
+
+def write_manifest(manifest, path):
+    """
+    writes a manifest as json, or as csv with one row per layer if the path ends with .csv
+    :param manifest: dict from build_manifest
+    :param path: output file path
+    :return:
+    """
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for entry in manifest["layers"]:
+                writer.writerow(dict((x, entry.get(x)) for x in FIELDS))
+    else:
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=4)
+
+    logger.info("Wrote manifest of %s layers to %s", len(manifest["layers"]), path)
+
+
+def read_manifest(path):
+    """
+    :param path: json or csv manifest
+    :return: dict manifest
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="") as f:
+            entries = list(csv.DictReader(f))
+        for entry in entries:
+            for field in ("index", "content_count", "shadow_count"):
+                entry[field] = int(float(entry[field] or 0))
+        return {"asset": entries[0]["asset"] if entries else None, "layers": entries}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def estimate_layer_cost(entry, costs=None):
+    """
+    :param entry: manifest layer entry
+    :param costs: optional dict with layer name and measured seconds per frame
+    :return: float estimated seconds per frame
+    """
+    if costs and entry["layer"] in costs:
+        return float(costs[entry["layer"]])
+    return COST_BASE_SECONDS + COST_PER_OBJECT_SECONDS * (entry["content_count"] + entry["shadow_count"])
+
+
+def plan_jobs(manifest, target_seconds=DEFAULT_TARGET_SECONDS, frame_range=(1, 1), costs=None):
+    """
+    bin packs the layers of a manifest into farm jobs close to a target duration
+    layers longer than the target are split into frame chunks, the tasks are packed first fit decreasing
+    :param manifest: dict from build_manifest
+    :param target_seconds: max estimated duration of a job, a single frame longer than it gets its own job
+    :param frame_range: tuple of first and last frame rendered per layer
+    :param costs: optional dict with layer name and measured seconds per frame
+    :return: list of jobs, each a dict with estimated seconds and tasks of layer, start, end and seconds
+    """
+    start, end = frame_range
+    frame_count = end - start + 1
+
+    tasks = []
+    for entry in manifest["layers"]:
+        per_frame = estimate_layer_cost(entry, costs)
+        chunk = max(1, int(target_seconds // per_frame)) if per_frame * frame_count > target_seconds else frame_count
+        for first in range(start, end + 1, chunk):
+            last = min(first + chunk - 1, end)
+            tasks.append({"layer": entry["layer"], "start": first, "end": last,
+                          "seconds": per_frame * (last - first + 1)})
+
+    jobs = []
+    for task in sorted(tasks, key=lambda x: -x["seconds"]):
+        for job in jobs:
+            if job["seconds"] + task["seconds"] <= target_seconds:
+                break
+        else:
+            job = {"seconds": 0.0, "tasks": []}
+            jobs.append(job)
+        job["tasks"].append(task)
+        job["seconds"] += task["seconds"]
+
+    logger.info("Planned %s tasks of %s layers into %s jobs of max %ss",
+                len(tasks), len(manifest["layers"]), len(jobs), target_seconds)
+
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan farm jobs from a layer manifest.")
+    parser.add_argument("manifest", help="json or csv manifest written by write_manifest")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET_SECONDS, help="target seconds per job")
+    parser.add_argument("--frames", type=int, nargs=2, default=[1, 1], metavar=("START", "END"),
+                        help="frame range rendered per layer")
+    parser.add_argument("--costs", help="json file with measured seconds per frame per layer")
+    parser.add_argument("--output", help="json file the jobs get written to, printed if not given")
+    args = parser.parse_args(argv)
+
+    costs = None
+    if args.costs:
+        with open(args.costs) as f:
+            costs = json.load(f)
+
+    jobs = plan_jobs(read_manifest(args.manifest), args.target, tuple(args.frames), costs)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(jobs, f, indent=4)
+    else:
+        print(json.dumps(jobs, indent=4))
+
+    return 0
+
+
+if __name__ == "__main__":
+    # make the package importable when run as a script
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    sys.exit(main())
@@ -0,0 +1,374 @@
+# Import built-in modules
+import re
+import time
+from collections import namedtuple
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+# compiled collection selector, either a pattern expression or a static list of node names
+Selector = namedtuple("Selector", ["pattern", "static"])
+
+# snapshot of the scene node names, paths per node name and node names per base name and per namespace
+NameIndex = namedtuple("NameIndex", ["paths", "bases", "namespaces"])
+
+# shortest literal a wildcard term may keep, shorter ones match too much to be worth validating
+MIN_LITERAL = 2
+
+# cost model of a selector, a pattern compares every term against every scene name on each evaluation,
+# a static selection resolves every member by name, which costs this many plain name lookups
+STATIC_LOOKUP_COST = 50
+
+NAMESPACE_MARKER = "*:"
+NAME_MARKER = "*"
+
+# matched paths listed by preview_expression
+PREVIEW_SAMPLES = 10
+
+
+def build_term(node):
+    """
+    builds the collection expression term for a node, namespaces are matched by wildcard
+    :param node: node name or node
+    :return: str term
+    """
+    # dag paths are matched by their node name
+    node = str(node).split("|")[-1]
+    if ":" in node:
+        return NAMESPACE_MARKER + node.split(":")[-1]
+    return NAME_MARKER + node
+
+
+def build_terms(content):
+    """
+    builds the unique expression terms for a list of nodes, in content order
+    :param content: list of nodes
+    :return: list of str terms
+    """
+    terms = []
+    seen = set()
+    for node in content:
+        term = build_term(node)
+        if term not in seen:
+            seen.add(term)
+            terms.append(term)
+    return terms
+
+
+def term_regex(term):
+    """
+    :param term: expression term with * wildcards
+    :return: compiled regex matching a whole node name
+    """
+    return re.compile("^" + ".*".join(re.escape(x) for x in term.split("*")) + "$")
+
+
+def match_terms(terms, names):
+    """
+    evaluates expression terms against node names
+    :param terms: list of str terms
+    :param names: list of node names
+    :return: set of matched names
+    """
+    # terms with a single leading wildcard are plain suffix matches, looked up in a set
+    suffixes = set()
+    patterns = []
+    for term in terms:
+        if term.startswith("*") and "*" not in term[1:]:
+            suffixes.add(term[1:])
+        else:
+            patterns.append("(?:{})".format(term_regex(term).pattern))
+
+    regex = re.compile("|".join(patterns)) if patterns else None
+    matched = set()
+
+    for name in names:
+        # the empty suffix of a bare wildcard matches every name
+        if suffixes and any(name[x:] in suffixes for x in range(len(name) + 1)):
+            matched.add(name)
+        elif regex and regex.match(name):
+            matched.add(name)
+
+    return matched
+
+
+def _common_prefix(first, last):
+    length = 0
+    for a, b in zip(first, last):
+        if a != b:
+            break
+        length += 1
+    return first[:length]
+
+
+def _collapse(marker, cores, names, matched, suffix, out):
+    """
+    collapses sorted term cores sharing a literal into wildcard terms, as long as no new names match
+    :param marker: term marker, *: or *
+    :param cores: sorted list of term literals without marker, reversed for suffix collapsing
+    :param names: node names that can still match terms of these cores
+    :param matched: set of names matched by the original terms
+    :param suffix: collapse common suffixes instead of prefixes
+    :param out: list the resulting terms get appended to
+    :return:
+    """
+    if len(cores) == 1:
+        out.append(marker + (cores[0][::-1] if suffix else cores[0]))
+        return
+
+    shared = _common_prefix(cores[0], cores[-1])
+
+    if len(shared) >= MIN_LITERAL:
+        literal = shared[::-1] if suffix else shared
+        if suffix:
+            # a leading * already matches any start
+            term = marker + literal if marker == NAME_MARKER else marker + "*" + literal
+        else:
+            term = marker + literal + "*"
+        regex = term_regex(term)
+        hits = [x for x in names if literal in x and regex.match(x)]
+        if all(x in matched for x in hits):
+            out.append(term)
+            return
+        # everything the longer literals below can match is part of these hits
+        names = hits
+
+    # split by the next character, cores equal to the shared literal stay exact terms
+    groups = {}
+    for core in cores:
+        if len(core) == len(shared):
+            out.append(marker + (core[::-1] if suffix else core))
+        else:
+            groups.setdefault(core[len(shared)], []).append(core)
+
+    for key in sorted(groups):
+        _collapse(marker, groups[key], names, matched, suffix, out)
+
+
+def compress_terms(terms, names):
+    """
+    collapses terms with shared prefixes or suffixes into wildcard terms that match exactly the same names
+    :param terms: list of unique str terms
+    :param names: all node names of the scene the terms get evaluated against
+    :return: list of str terms
+    """
+    names = list(names)
+    matched = match_terms(terms, names)
+    compressed = []
+
+    for marker in (NAMESPACE_MARKER, NAME_MARKER):
+        if marker == NAMESPACE_MARKER:
+            cores = sorted(x[len(marker):] for x in terms if x.startswith(NAMESPACE_MARKER))
+        else:
+            cores = sorted(x[len(marker):] for x in terms if not x.startswith(NAMESPACE_MARKER))
+        if not cores:
+            continue
+
+        # prefixes first, whatever stays exact gets a try on shared suffixes
+        prefixed = []
+        _collapse(marker, cores, names, matched, False, prefixed)
+        exact = sorted(x[len(marker):][::-1] for x in prefixed if "*" not in x[len(marker):])
+        compressed.extend(x for x in prefixed if "*" in x[len(marker):])
+        if exact:
+            _collapse(marker, exact, names, matched, True, compressed)
+
+    if match_terms(compressed, names) != matched:
+        # never happens by construction, keep the original terms if it does
+        logger.warning("Compressed pattern changed the matched objects, using the uncompressed one.")
+        return list(terms)
+
+    return compressed
+
+
+_calibration = {}
+
+
+def calibrate(sample_size=20000):
+    """
+    measures the cost of a single wildcard compare and a single name lookup on this machine
+    the result is cached for the session
+    :param sample_size: number of synthetic names timed
+    :return: dict with seconds per compare and per lookup
+    """
+    if not _calibration:
+        names = ["ns{}:geo_{:05d}".format(x % 10, x) for x in range(sample_size)]
+        lookup = set(names[::2])
+
+        regex = term_regex("*:geo_1*")
+        start = time.perf_counter()
+        for name in names:
+            regex.match(name)
+        _calibration["compare"] = (time.perf_counter() - start) / sample_size
+
+        start = time.perf_counter()
+        for name in names:
+            name in lookup
+        _calibration["lookup"] = (time.perf_counter() - start) / sample_size
+
+    return dict(_calibration)
+
+
+def estimate_costs(term_count, name_count, static_count):
+    """
+    estimates the evaluation cost of a pattern and of a static selection with the measured calibration
+    :param term_count: number of pattern terms
+    :param name_count: number of names in the scene
+    :param static_count: number of members a static selection would hold
+    :return: tuple of pattern and static seconds
+    """
+    costs = calibrate()
+    pattern_cost = term_count * name_count * costs["compare"]
+    static_cost = static_count * costs["lookup"] * STATIC_LOOKUP_COST
+    return pattern_cost, static_cost
+
+
+def compile_selector(content, names=None, exact=False):
+    """
+    compiles a content list into the cheapest collection selector
+    with scene names, terms are compressed into wildcards matching the same objects and a static
+    selection is used when evaluating the pattern would still be too expensive
+    :param content: list of nodes
+    :param names: optional list of all dag node names or paths in the scene, without it terms are only deduped
+    :param exact: content holds the exact paths to select, a pattern matching other objects is replaced by a
+                  static selection as long as every content path exists
+    :return: Selector
+    """
+    terms = build_terms(content)
+
+    if names is None or not terms or (len(terms) < 2 and not exact):
+        return Selector(", ".join(terms), None)
+
+    # patterns match the node name, static selections need the unique dag path
+    paths = list(names)
+    names = [x.split("|")[-1] for x in paths]
+    compressed = compress_terms(terms, names)
+    matched = match_terms(compressed, names)
+    pattern_cost, static_cost = estimate_costs(len(compressed), len(names), len(matched))
+
+    logger.info("Compiled %s terms into %s, estimated evaluation %.4fs, static selection %.4fs",
+                len(terms), len(compressed), pattern_cost, static_cost)
+
+    if exact:
+        # name terms match equally named objects of other hierarchies, select the paths if they do
+        members = list(dict.fromkeys(map(str, content)))
+        path_set = set(paths)
+        if all(x in path_set for x in members) and sum(1 for x in names if x in matched) > len(members):
+            logger.info("Pattern matches objects outside the content, using a static selection of %s objects",
+                        len(members))
+            return Selector(None, members)
+
+    # a static selection of nothing would drop terms objects loaded later still match
+    if matched and static_cost < pattern_cost:
+        static = [path for path, name in zip(paths, names) if name in matched]
+        logger.info("Pattern too expensive, using a static selection of %s objects", len(static))
+        return Selector(None, static)
+
+    return Selector(", ".join(compressed), None)
+
+
+def build_name_index(paths):
+    """
+    snapshots node names into an index keyed by namespace and base name
+    :param paths: list of all dag node names or paths in the scene
+    :return: NameIndex
+    """
+    index = NameIndex({}, {}, {})
+    for path in paths:
+        index.paths.setdefault(path.split("|")[-1], []).append(path)
+
+    for name in index.paths:
+        namespace, _, base = name.rpartition(":")
+        index.bases.setdefault(base, []).append(name)
+        index.namespaces.setdefault(namespace, []).append(name)
+
+    logger.info("Indexed %s node names in %s namespaces", len(index.paths), len(index.namespaces))
+
+    return index
+
+
+def split_expression(expression):
+    """
+    :param expression: collection expression, terms separated by commas or spaces
+    :return: list of unique str terms
+    """
+    terms = []
+    seen = set()
+    for term in re.split(r"[,\s]+", expression or ""):
+        if term and term not in seen:
+            seen.add(term)
+            terms.append(term)
+    return terms
+
+
+def match_expression(expression, index):
+    """
+    evaluates a collection expression against a name index
+    matches the same names as match_terms, terms with a literal base name or namespace only compare the names
+    indexed under it, plain suffix terms are looked up together in a single pass over the unique base names,
+    the remaining terms are evaluated together in a single pass over the unique node names
+    :param expression: collection expression
+    :param index: NameIndex
+    :return: set of matched node names
+    """
+    matched = set()
+    scanned = []
+    # suffixes of plain suffix terms, with a wildcard namespace and without one
+    suffixes = {True: set(), False: set()}
+
+    for term in split_expression(expression):
+        if "*" not in term:
+            if term in index.paths:
+                matched.add(term)
+            continue
+
+        namespace, colon, base = term.rpartition(":")
+        if namespace == "*" and "*" not in base:
+            # any namespace, the names under the base name only need one
+            matched.update(x for x in index.bases.get(base, []) if ":" in x)
+            continue
+        elif colon and "*" not in base:
+            candidates = index.bases.get(base, [])
+        elif colon and "*" not in namespace:
+            # a wildcard base name reaches into nested namespaces too
+            candidates = [x for ns in index.namespaces if ns == namespace or ns.startswith(namespace + ":")
+                          for x in index.namespaces[ns]]
+        elif namespace in ("*", "") and base.startswith("*") and "*" not in base[1:]:
+            # a literal suffix can't reach into the namespace, only the unique base names get compared
+            suffixes[bool(colon)].add(base[1:])
+            continue
+        else:
+            scanned.append(term)
+            continue
+
+        regex = term_regex(term)
+        matched.update(x for x in candidates if regex.match(x))
+
+    if suffixes[True] or suffixes[False]:
+        for base in index.bases:
+            # the empty suffix of a bare wildcard matches every base name
+            tails = [base[x:] for x in range(len(base) + 1)]
+            if any(x in suffixes[False] for x in tails):
+                matched.update(index.bases[base])
+            elif any(x in suffixes[True] for x in tails):
+                matched.update(x for x in index.bases[base] if ":" in x)
+
+    if scanned:
+        matched.update(match_terms(scanned, index.paths))
+
+    return matched
+
+
+def preview_expression(expression, index, samples=PREVIEW_SAMPLES):
+    """
+    :param expression: collection expression
+    :param index: NameIndex
+    :param samples: max number of matched paths listed
+    :return: dict with number of matched paths, sorted sample paths and evaluation seconds
+    """
+    start = time.perf_counter()
+    names = match_expression(expression, index)
+    count = sum(len(index.paths[x]) for x in names)
+    sample_paths = sorted(path for name in sorted(names)[:samples] for path in index.paths[name])[:samples]
+    return {"count": count, "samples": sample_paths, "seconds": time.perf_counter() - start}
@@ -0,0 +1,289 @@
+# Import built-in modules
+import os
+import re
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Logger
+import logging
+
+from dw_kong_render_setup import backend as scene_backend
+from dw_kong_render_setup import functions
+from dw_kong_render_setup import tracing
+
+logger = logging.getLogger('Kong Render Setup')
+
+# stat calls are io bound, over network storage most of the time is spent waiting on the server
+DEFAULT_WORKERS = 32
+
+# tile and frame tokens of texture paths, a path with tokens is valid if at least one file matches
+PATH_TOKENS = re.compile(r"<udim>|<uvtile>|<tile>|<frame>|<f>|_MAPID_|#+|u<u>_v<v>", re.IGNORECASE)
+
+# converter generating the mipmapped tx files, {input} and {output} get replaced by the file paths
+# the command can be replaced through the KONG_RENDER_SETUP_TX_CONVERTER environment variable
+TX_CONVERTER_VARIABLE = "KONG_RENDER_SETUP_TX_CONVERTER"
+DEFAULT_TX_CONVERTER = "maketx -v --oiio {input} -o {output}"
+TX_EXTENSION = ".tx"
+
+# conversions are cpu bound, one converter process per core at most
+DEFAULT_TX_WORKERS = os.cpu_count() or 4
+DEFAULT_TX_TIMEOUT = 600
+
+TX_OK = "ok"
+TX_MISSING = "missing"
+TX_STALE = "stale"
+
+
+def collect_texture_paths(switch_textures):
+    """
+    collects the texture path of every channel per switch index
+    :param switch_textures: dict with switch name and input snapshot, as returned by scan_shading_network
+    :return: dict with switch index and dict of channel and texture path
+    """
+    paths = {}
+    for switch in switch_textures:
+        channel = functions.get_switch_channel(switch)
+        if not channel:
+            continue
+        for index, (source, path) in switch_textures[switch].items():
+            paths.setdefault(index, {})[channel] = path
+    return paths
+
+
+def check_path(path, read=False):
+    """
+    checks a single texture file
+    :param path: texture path, may contain tile or frame tokens
+    :param read: open the file and read its first bytes instead of only stating it
+    :return: str error or None if the file is fine
+    """
+    if not path:
+        return "no texture path"
+
+    if PATH_TOKENS.search(path):
+        # a token path is fine as long as a single tile or frame exists
+        files = glob.glob(PATH_TOKENS.sub("*", glob.escape(path)))
+        if not files:
+            return "no file matches"
+        path = files[0]
+
+    try:
+        if read:
+            with open(path, "rb") as f:
+                if not f.read(16):
+                    return "empty file"
+        elif os.stat(path).st_size == 0:
+            return "empty file"
+    except OSError as e:
+        return e.strerror or str(e)
+
+    return None
+
+
+def check_paths(paths, workers=DEFAULT_WORKERS, read=False):
+    """
+    checks texture files concurrently, every path is only checked once
+    :param paths: iterable of texture paths
+    :param workers: max number of concurrent checks
+    :param read: open the files instead of only stating them
+    :return: dict with path and error or None
+    """
+    unique = sorted(set(paths), key=str)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = list(pool.map(lambda x: check_path(x, read), unique))
+    tracing.count("textures_checked", len(unique))
+    return dict(zip(unique, errors))
+
+
+def run_preflight(shader, variations, backend=None, workers=DEFAULT_WORKERS, read=False):
+    """
+    checks every texture behind the switches of a shading engine and reports the result per variation layer
+    the textures are taken from the switch snapshot of load_selected_shader
+    :param shader: shading engine
+    :param variations: dict with switch index and variation name, as returned by load_selected_shader
+    :param backend: scene backend, defaults to the current backend
+    :param workers: max number of concurrent checks
+    :param read: open the files instead of only stating them
+    :return: dict report with layers, each with index, ok and dict of broken channels with path and error
+    """
+    backend = backend or scene_backend.get_backend()
+    start = time.time()
+
+    with tracing.span("preflight", shader=shader):
+        paths = collect_texture_paths(functions.get_switch_textures(shader, backend))
+        errors = check_paths([path for index in paths for path in paths[index].values()], workers, read)
+
+    layers = {}
+    for index in variations:
+        broken = {}
+        for channel, path in sorted(paths.get(index, {}).items()):
+            if errors[path]:
+                broken[channel] = {"path": path, "error": errors[path]}
+        layers[variations[index]] = {"index": index, "ok": not broken, "broken": broken}
+
+    report = {"shader": str(shader), "checked": len(errors), "seconds": round(time.time() - start, 3),
+              "layers": layers}
+
+    for variation in sorted(layers):
+        for channel, entry in sorted(layers[variation]["broken"].items()):
+            logger.warning("Preflight {} {} : {} {}".format(variation, channel, entry["error"], entry["path"]))
+
+    logger.info("Preflight checked %s textures in %ss, %s of %s variations are broken", report["checked"],
+                report["seconds"], len(get_broken_variations(report)), len(layers))
+
+    return report
+
+
+def get_broken_variations(report):
+    """
+    :param report: dict from run_preflight
+    :return: sorted list of variation names with broken textures
+    """
+    return sorted(x for x in report["layers"] if not report["layers"][x]["ok"])
+
+
+def get_tx_path(path):
+    """
+    :param path: texture file path
+    :return: str path of the tx file next to it
+    """
+    return os.path.splitext(path)[0] + TX_EXTENSION
+
+
+def check_tx(path):
+    """
+    checks the tx files next to a texture, every tile or frame of a token path is checked on its own
+    :param path: texture path, may contain tile or frame tokens
+    :return: list of dicts with source, tx and status, empty if there is no source file or it is a tx file
+    """
+    if not path or path.lower().endswith(TX_EXTENSION):
+        return []
+
+    sources = glob.glob(PATH_TOKENS.sub("*", glob.escape(path))) if PATH_TOKENS.search(path) else [path]
+
+    entries = []
+    for source in sorted(sources):
+        if source.lower().endswith(TX_EXTENSION):
+            continue
+        tx = get_tx_path(source)
+        try:
+            source_mtime = os.stat(source).st_mtime
+        except OSError:
+            # missing sources are reported by run_preflight
+            continue
+        try:
+            status = TX_STALE if os.stat(tx).st_mtime < source_mtime else TX_OK
+        except OSError:
+            status = TX_MISSING
+        entries.append({"source": source, "tx": tx, "status": status})
+
+    return entries
+
+
+def convert_texture(source, tx, command=None, timeout=DEFAULT_TX_TIMEOUT):
+    """
+    generates the tx file of a texture with the converter command
+    a tx file left by a failed conversion is deleted, it would look up to date on the next check
+    :param source: texture file path
+    :param tx: tx file path
+    :param command: converter command with {input} and {output}, defaults to the configured converter
+    :param timeout: max seconds of the conversion
+    :return: dict with source, tx, seconds and error or None
+    """
+    # subprocess is only needed for conversions, it doesn't get imported with the ui
+    import shlex
+    import subprocess
+
+    command = command or os.environ.get(TX_CONVERTER_VARIABLE) or DEFAULT_TX_CONVERTER
+    args = [x.format(input=source, output=tx) for x in shlex.split(command)]
+
+    start = time.time()
+    error = None
+    try:
+        process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout)
+        if process.returncode != 0:
+            output = process.stdout.decode("utf-8", "replace").strip().splitlines()
+            error = "exit code {} : {}".format(process.returncode, output[-1] if output else "")
+    except subprocess.TimeoutExpired:
+        error = "timeout after {}s".format(timeout)
+    except OSError as e:
+        error = e.strerror or str(e)
+
+    if error and os.path.isfile(tx):
+        try:
+            os.remove(tx)
+        except OSError:
+            pass
+
+    return {"source": source, "tx": tx, "seconds": round(time.time() - start, 3), "error": error}
+
+
+def convert_textures(entries, command=None, workers=DEFAULT_TX_WORKERS, timeout=DEFAULT_TX_TIMEOUT):
+    """
+    generates tx files concurrently, at most workers converter processes run at the same time
+    :param entries: list of dicts with source and tx, as returned by check_tx
+    :param command: converter command with {input} and {output}, defaults to the configured converter
+    :param workers: max number of concurrent converter processes
+    :param timeout: max seconds per conversion
+    :return: list of conversion results, in entry order
+    """
+    if not entries:
+        return []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda x: convert_texture(x["source"], x["tx"], command, timeout), entries))
+    tracing.count("textures_converted", len(results))
+    return results
+
+
+def run_tx_preflight(shader, backend=None, convert=True, command=None, workers=DEFAULT_TX_WORKERS,
+                     timeout=DEFAULT_TX_TIMEOUT):
+    """
+    checks every texture behind the switches of a shading engine for an up to date tx file next to it
+    and generates the missing and stale ones, the textures are taken from the switch snapshot of load_selected_shader
+    :param shader: shading engine
+    :param backend: scene backend, defaults to the current backend
+    :param convert: generate missing and stale tx files, only report them if False
+    :param command: converter command with {input} and {output}, defaults to the configured converter
+    :param workers: max number of concurrent converter processes
+    :param timeout: max seconds per conversion
+    :return: dict report with checked, up_to_date, lists of missing and stale tx files and conversion results
+    """
+    backend = backend or scene_backend.get_backend()
+    start = time.time()
+
+    with tracing.span("tx_preflight", shader=shader):
+        paths = collect_texture_paths(functions.get_switch_textures(shader, backend))
+        unique = sorted(set(path for index in paths for path in paths[index].values() if path))
+        with ThreadPoolExecutor(max_workers=DEFAULT_WORKERS) as pool:
+            entries = [x for result in pool.map(check_tx, unique) for x in result]
+
+        outdated = [x for x in entries if x["status"] != TX_OK]
+        conversions = convert_textures(outdated, command, workers, timeout) if convert else []
+
+    report = {"shader": str(shader), "checked": len(entries),
+              "up_to_date": len(entries) - len(outdated),
+              "missing": [x["tx"] for x in outdated if x["status"] == TX_MISSING],
+              "stale": [x["tx"] for x in outdated if x["status"] == TX_STALE],
+              "conversions": conversions, "seconds": round(time.time() - start, 3)}
+
+    for result in conversions:
+        if result["error"]:
+            logger.warning("Couldn't convert {} : {}".format(result["source"], result["error"]))
+        else:
+            logger.info("Converted %s in %ss", result["tx"], result["seconds"])
+
+    logger.info("Tx preflight checked %s textures in %ss, %s missing, %s stale, %s converted, %s failed",
+                report["checked"], report["seconds"], len(report["missing"]), len(report["stale"]),
+                len([x for x in conversions if not x["error"]]), len(get_failed_conversions(report)))
+
+    return report
+
+
+def get_failed_conversions(report):
+    """
+    :param report: dict from run_tx_preflight
+    :return: sorted list of texture paths the tx conversion failed for
+    """
+    return sorted(x["source"] for x in report["conversions"] if x["error"])
@@ -0,0 +1,211 @@
+# Logger
+import logging
+
+from dw_kong_render_setup import patterns
+from dw_kong_render_setup import tracing
+
+logger = logging.getLogger('Kong Render Setup')
+
+# collections every variation layer is built with, besides the asset collection
+SHADOW_CATCHER = "shadow_catcher"
+BACKGROUND = "background"
+FLOAT_SWITCH_SELECT = "float_switch_select"
+
+# name suffix of layers moved aside to free their name for a rebuilt layer
+REPLACED_SUFFIX = "_kongReplaced"
+
+
+def build_layer_specs(asset_name, variations, filename_prefix, shading_engine, shadow_matte_sg, content_selector,
+                      shadow_selector, bg_selector, switch_selector=None):
+    """
+    builds the desired state of every variation layer of an asset
+    :param asset_name: name of the asset, used to build render layer naming
+    :param variations: dict with variations & indices
+    :param filename_prefix: file name prefix set in render layer
+    :param shading_engine: sg of the asset material override
+    :param shadow_matte_sg: sg of the shadow catcher material override
+    :param content_selector: compiled patterns.Selector of the asset content
+    :param shadow_selector: compiled patterns.Selector of the shadow catcher content
+    :param bg_selector: background selector pattern
+    :param switch_selector: compiled patterns.Selector of the floatConstants driving the switch index
+    :return: dict with layer name and dict of the desired values
+    """
+    specs = {}
+    for index in variations:
+        layer_name = asset_name + "_" + variations[index]
+        specs[layer_name] = {"index": index, "variation": variations[index], "prefix": filename_prefix,
+                             "shader": str(shading_engine) + ".message",
+                             "shadow_matte": str(shadow_matte_sg) + ".message",
+                             "content": content_selector, "shadow": shadow_selector,
+                             "background": patterns.Selector(bg_selector, None)}
+        if switch_selector is not None:
+            specs[layer_name]["switch"] = switch_selector
+    return specs
+
+
+def is_named(node, name):
+    """
+    checks a render setup node name against the name it was created with
+    clashing names get their trailing number replaced, so names are compared without it
+    :param node: render setup node
+    :param name: requested name
+    :return: bool
+    """
+    return node.name().rstrip("0123456789") == name.rstrip("0123456789")
+
+
+def find_override(coll, attr_name=None):
+    """
+    returns the first override of a collection, optionally the one of an attribute
+    :param coll: collection
+    :param attr_name: optional overridden attribute name, None for material overrides
+    :return: override or None
+    """
+    for ov in coll.getChildren():
+        if hasattr(ov, "getSelector"):
+            # child collection
+            continue
+        # material overrides are connection overrides, they have a source instead of a value
+        is_material = hasattr(ov, "getSource")
+        if attr_name is None and is_material:
+            return ov
+        if attr_name is not None and not is_material and ov.attributeName() == attr_name:
+            return ov
+    return None
+
+
+def read_layer(layer, asset_name):
+    """
+    reads the nodes holding the values of a variation layer built by build_variation_layer
+    :param layer: render layer
+    :param asset_name: name of the asset
+    :return: dict with the value holding nodes or None if the layer doesn't have the build structure
+    """
+    state = {"layer": layer}
+
+    for coll in layer.getCollections():
+        if is_named(coll, SHADOW_CATCHER):
+            state["shadow"] = coll
+            state["shadow_matte"] = find_override(coll)
+        elif is_named(coll, BACKGROUND):
+            state["background"] = coll
+        elif is_named(coll, asset_name):
+            state["content"] = coll
+            state["shader"] = find_override(coll)
+            for child in coll.getCollections():
+                if is_named(child, FLOAT_SWITCH_SELECT):
+                    state["switch"] = child
+                    state["index"] = find_override(child, "inFloat")
+
+    required = ["shadow", "shadow_matte", "background", "content", "shader", "index"]
+    if any(state.get(x) is None for x in required):
+        return None
+
+    # getting the render settings collection creates it, layers without the build structure stay untouched
+    state["prefix"] = find_override(layer.renderSettingsCollectionInstance(), "imageFilePrefix")
+    if state["prefix"] is None:
+        return None
+
+    return state
+
+
+def get_selector_value(coll):
+    """
+    :param coll: collection
+    :return: patterns.Selector with the current pattern or static selection of the collection
+    """
+    selector = coll.getSelector()
+    static = selector.staticSelection.asList()
+    if static:
+        return patterns.Selector(None, list(static))
+    return patterns.Selector(selector.getPattern() or "", None)
+
+
+def set_selector_value(coll, value):
+    """
+    replaces the pattern and static selection of a collection
+    :param coll: collection
+    :param value: patterns.Selector
+    :return:
+    """
+    selector = coll.getSelector()
+    selector.setPattern(value.pattern or "")
+    selector.staticSelection.set(value.static or [])
+
+
+def plan_layers(rs, asset_name, specs, keep=None):
+    """
+    compares the existing render layers of an asset with the desired ones
+    layers named after the asset but without the build structure are left alone unless a desired layer needs the name
+    :param rs: render setup instance
+    :param asset_name: name of the asset
+    :param specs: dict with layer name and desired values, from build_layer_specs
+    :param keep: optional list of layer names that are neither updated nor deleted
+    :return: dict with lists of layer names to create, tuples of state and spec to update, layers holding
+             a name to create that have to be replaced and layers to delete
+    """
+    plan = {"create": [], "update": [], "replace": [], "delete": []}
+    existing = {}
+    keep = set(keep or [])
+
+    for layer in rs.getRenderLayers():
+        name = layer.name()
+        if not name.startswith(asset_name + "_") or name in keep:
+            continue
+        state = read_layer(layer, asset_name)
+        if state:
+            existing[name] = state
+        elif name in specs:
+            # not built by us or broken, rebuild it instead of creating a duplicate
+            plan["replace"].append(layer)
+
+    for name in specs:
+        if name in existing:
+            plan["update"].append((existing[name], specs[name]))
+        else:
+            plan["create"].append(name)
+
+    plan["delete"].extend(existing[x]["layer"] for x in existing if x not in specs)
+
+    return plan
+
+
+def update_layer(state, spec, undo=None):
+    """
+    sets the values of an existing variation layer that differ from the desired ones
+    :param state: dict from read_layer
+    :param spec: dict with the desired values
+    :param undo: optional list, a tuple of function and args restoring the old value is appended per change
+    :return: int number of changed values
+    """
+    if undo is None:
+        undo = []
+
+    changes = 0
+
+    for key, value in (("prefix", spec["prefix"]), ("index", spec["index"])):
+        old = state[key].getAttrValue()
+        if old != value:
+            undo.append((state[key].setAttrValue, (old,)))
+            state[key].setAttrValue(value)
+            changes += 1
+
+    for key in ("shader", "shadow_matte"):
+        old = state[key].getSource()
+        if old != spec[key]:
+            undo.append((state[key].setSource, (old,)))
+            state[key].setSource(spec[key])
+            changes += 1
+
+    for key in ("content", "shadow", "background", "switch"):
+        if key not in spec:
+            continue
+        old = get_selector_value(state[key])
+        if old != spec[key]:
+            undo.append((set_selector_value, (state[key], old)))
+            set_selector_value(state[key], spec[key])
+            changes += 1
+
+    tracing.count("values_updated", changes)
+
+    return changes
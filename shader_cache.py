@@ -0,0 +1,126 @@
+# Import built-in modules
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+CACHE_FOLDER = "kong_render_setup"
+CACHE_FILE = "shader_cache.sqlite"
+
+# least recently used entries beyond this count get evicted on every write
+MAX_ENTRIES = 500
+
+
+def get_cache_path(prefs_dir):
+    """
+    returns the path of the shader cache in the user prefs dir
+    :param prefs_dir: user prefs dir, as returned by the scene backend
+    :return: str path or None if there is no prefs dir
+    """
+    if not prefs_dir:
+        return None
+
+    return os.path.join(prefs_dir, CACHE_FOLDER, CACHE_FILE)
+
+
+def fingerprint(shader, switch_textures, config=None):
+    """
+    builds a fingerprint of a shading network from its scan result
+    covers switch names, connected input indices, source nodes and texture paths
+    :param shader: name of the shading engine
+    :param switch_textures: dict with switch name and input snapshot, as returned by scan_shading_network
+    :param config: optional str key of the config the network gets analysed with
+    :return: str hex digest
+    """
+    network = [str(shader), config]
+
+    for switch in sorted(switch_textures):
+        inputs = switch_textures[switch]
+        network.append([switch, [[x, inputs[x][0], inputs[x][1]] for x in sorted(inputs)]])
+
+    return hashlib.sha1(json.dumps(network).encode("utf-8")).hexdigest()
+
+
+def _connect(path):
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE IF NOT EXISTS analysis ("
+                       "shader TEXT PRIMARY KEY, "
+                       "fingerprint TEXT NOT NULL, "
+                       "result TEXT NOT NULL, "
+                       "last_used REAL NOT NULL)")
+    return connection
+
+
+def get(shader, network_fingerprint, path):
+    """
+    returns the cached analysis of a shading engine if its fingerprint still matches
+    a stale entry is dropped
+    :param shader: name of the shading engine
+    :param network_fingerprint: current fingerprint of the shading network
+    :param path: cache file path
+    :return: dict with switch_nodes, max_input and variations or None
+    """
+    try:
+        connection = _connect(path)
+        try:
+            with connection:
+                row = connection.execute("SELECT fingerprint, result FROM analysis WHERE shader = ?",
+                                         (str(shader),)).fetchone()
+                if not row:
+                    return None
+
+                if row[0] != network_fingerprint:
+                    logger.info("Shader network of {} changed, dropping cached analysis".format(shader))
+                    connection.execute("DELETE FROM analysis WHERE shader = ?", (str(shader),))
+                    return None
+
+                connection.execute("UPDATE analysis SET last_used = ? WHERE shader = ?", (time.time(), str(shader)))
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        logger.warning("Couldn't read shader cache {} : {}".format(path, e))
+        return None
+
+    result = json.loads(row[1])
+    # json only knows str keys, switch indices are ints
+    result["variations"] = dict((int(x), result["variations"][x]) for x in result["variations"])
+
+    return result
+
+
+def put(shader, network_fingerprint, switch_nodes, max_input, variations, path, max_entries=MAX_ENTRIES):
+    """
+    stores the analysis of a shading engine and evicts the least recently used entries
+    :param shader: name of the shading engine
+    :param network_fingerprint: fingerprint of the shading network
+    :param switch_nodes: dict with channel and switch name
+    :param max_input: max number of switch inputs
+    :param variations: dict with switch index and variation name
+    :param path: cache file path
+    :param max_entries: max number of cached shading engines
+    :return:
+    """
+    result = json.dumps({"switch_nodes": switch_nodes, "max_input": max_input, "variations": variations})
+
+    try:
+        connection = _connect(path)
+        try:
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?)",
+                                   (str(shader), network_fingerprint, result, time.time()))
+                connection.execute("DELETE FROM analysis WHERE shader NOT IN "
+                                   "(SELECT shader FROM analysis ORDER BY last_used DESC LIMIT ?)", (max_entries,))
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        logger.warning("Couldn't write shader cache {} : {}".format(path, e))
@@ -0,0 +1,168 @@
+# Import built-in modules
+import re
+from collections import deque
+
+# Import third-party modules
+import maya.api.OpenMaya as om
+
+from dw_kong_render_setup import tracing
+from dw_kong_render_setup.backend import SHADING_ENGINE_PLUGS
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+
+def get_mobject(node_name):
+    """
+    returns the MObject for a node name
+    :param node_name: name of the node, str or PyNode
+    :return: MObject
+    """
+    sel = om.MSelectionList()
+    sel.add(str(node_name))
+    return sel.getDependNode(0)
+
+
+def get_source_nodes(mobject, plug_names=None):
+    """
+    returns all nodes connected as source into the given node
+    :param mobject: node to get the inputs of
+    :param plug_names: optional list of plug names, only these plugs are followed
+    :return: list of MObjects
+    """
+    fn = om.MFnDependencyNode(mobject)
+
+    if plug_names:
+        plugs = [fn.findPlug(x, False) for x in plug_names if fn.hasAttribute(x)]
+    else:
+        plugs = fn.getConnections()
+
+    sources = []
+
+    for plug in plugs:
+        for source in plug.connectedTo(True, False):
+            sources.append(source.node())
+
+    return sources
+
+
+def find_upstream(root, node_types, stop_at_match=True, root_plugs=None):
+    """
+    walks the dependency graph upstream from root and collects all nodes of the given types
+    nodes are only wrapped as MObjects, the walk never leaves the api
+    :param root: name of the node to start from
+    :param node_types: list of node type names to collect
+    :param stop_at_match: don't walk further upstream of a matched node
+    :param root_plugs: optional list of plug names on root to start the walk from
+    :return: list of matched MObjects, in walk order
+    """
+    node_types = set(node_types)
+    root_obj = get_mobject(root)
+
+    visited = set([om.MObjectHandle(root_obj).hashCode()])
+    queue = deque(get_source_nodes(root_obj, root_plugs))
+    found = []
+
+    while queue:
+        obj = queue.popleft()
+        handle = om.MObjectHandle(obj).hashCode()
+        if handle in visited:
+            continue
+        visited.add(handle)
+
+        if om.MFnDependencyNode(obj).typeName in node_types:
+            found.append(obj)
+            if stop_at_match:
+                continue
+
+        queue.extend(get_source_nodes(obj))
+
+    tracing.count("graph_nodes_walked", len(visited))
+    logger.debug("Walked %s nodes upstream of %s", len(visited), root)
+
+    return found
+
+
+def snapshot_switch_inputs(switch, input_name="input", path_attr="fileTextureName"):
+    """
+    reads every connected input of a switch node with its source node and texture path in one query
+    works for numbered inputs (input0, input1, ...) as well as multi inputs (input[0], input[1], ...),
+    indices may be sparse and are not capped, the cost only depends on the existing connections
+    :param switch: name or MObject of the switch node
+    :param input_name: name of the switch inputs, without index
+    :param path_attr: attribute on the source node holding the texture path
+    :return: dict with input index and tuple of source node name and texture path,
+             path is None if the source has no path attribute
+    """
+    if not isinstance(switch, om.MObject):
+        switch = get_mobject(switch)
+
+    numbered_input = re.compile(r"^{}(\d+)$".format(re.escape(input_name)))
+    inputs = {}
+
+    for plug in om.MFnDependencyNode(switch).getConnections():
+        sources = plug.connectedTo(True, False)
+        if not sources:
+            continue
+
+        # connections into a single channel (input0R) count for the whole input
+        if plug.isChild:
+            plug = plug.parent()
+
+        if plug.isElement:
+            if plug.array().partialName(useLongNames=True) != input_name:
+                continue
+            index = plug.logicalIndex()
+        else:
+            match = numbered_input.match(plug.partialName(useLongNames=True))
+            if not match:
+                continue
+            index = int(match.group(1))
+
+        if index in inputs:
+            continue
+
+        source_fn = om.MFnDependencyNode(sources[0].node())
+        path = None
+        if source_fn.hasAttribute(path_attr):
+            path = source_fn.findPlug(path_attr, False).asString()
+
+        inputs[index] = (source_fn.name(), path)
+
+    return inputs
+
+
+def scan_shading_network(shading_engine, switch_type="aiSwitch"):
+    """
+    scans the shading network of a shading engine for switch nodes and their texture inputs in one pass
+    the walk stops at every switch, its inputs are read with snapshot_switch_inputs
+    :param shading_engine: name of the shading engine
+    :param switch_type: node type of the switch nodes
+    :return: dict with switch name and its input snapshot
+    """
+    switches = {}
+
+    for switch in find_upstream(shading_engine, [switch_type], root_plugs=SHADING_ENGINE_PLUGS):
+        switches[om.MFnDependencyNode(switch).name()] = snapshot_switch_inputs(switch)
+
+    return switches
+
+
+def find_switch_drivers(switches, driver_type="floatConstant", index_attr="index"):
+    """
+    finds the nodes driving the index input of switch nodes, the walk only follows the index plug
+    so texture inputs and the rest of the shading network are never visited
+    :param switches: list of switch node names
+    :param driver_type: node type of the driver nodes
+    :param index_attr: name of the switch index attribute
+    :return: sorted list of driver node names
+    """
+    drivers = set()
+
+    for switch in switches:
+        for driver in find_upstream(switch, [driver_type], root_plugs=[index_attr]):
+            drivers.add(om.MFnDependencyNode(driver).name())
+
+    return sorted(drivers)
@@ -0,0 +1,56 @@
+# Import built-in modules
+import os
+import sys
+import importlib.util
+
+import pytest
+
+# the repository is the dw_kong_render_setup package, register it under its package name
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "dw_kong_render_setup" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("dw_kong_render_setup", os.path.join(PACKAGE_ROOT, "__init__.py"),
+                                                  submodule_search_locations=[PACKAGE_ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["dw_kong_render_setup"] = package
+    spec.loader.exec_module(package)
+
+from dw_kong_render_setup import functions
+from dw_kong_render_setup import benchmark
+from dw_kong_render_setup.backend import MemoryBackend
+
+ASSET = "tree"
+VARIATIONS = 5
+CONTENT = ["tree:geo_{}".format(x) for x in range(3)]
+SHADOW = ["ground"]
+
+
+class Scene(object):
+    """
+    synthetic asset scene in a MemoryBackend with the build arguments of build_render_setup
+    """
+
+    def __init__(self, variations=VARIATIONS):
+        self.backend = MemoryBackend()
+        self.sg = benchmark.build_synthetic_scene(self.backend, ASSET, variations, 2, 1)
+        for name in CONTENT + SHADOW:
+            self.backend.create_node("mesh", name + "Shape", parent=self.backend.create_node("transform", name))
+        self.variations = functions.load_selected_shader([self.sg], backend=self.backend)[3]
+
+    def build_args(self, mode=functions.BUILD_MODE_LAYERS, variations=None, prefix="shuffle/tree/<RenderLayer>"):
+        return (CONTENT, SHADOW, ASSET, prefix, self.sg, self.variations if variations is None else variations,
+                "background_grp", mode)
+
+    def build(self, mode=functions.BUILD_MODE_LAYERS, variations=None, **kwargs):
+        functions.build_render_setup(*self.build_args(mode, variations, **kwargs), backend=self.backend)
+
+    def layer_names(self):
+        return sorted(x.name() for x in self.backend.render_setup().getRenderLayers())
+
+
+@pytest.fixture
+def scene():
+    # the switch drivers and snapshots are cached per shading engine name for the session
+    functions._switch_drivers.clear()
+    functions._switch_textures.clear()
+    return Scene()
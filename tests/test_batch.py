@@ -0,0 +1,25 @@
+from dw_kong_render_setup import batch
+
+
+def test_invalid_jobs_fail_without_aborting_the_batch():
+    jobs = [{"scene": "/scenes/a.ma"}, ["/scenes/b.ma"], {"shader": "elements_b_sg", "geo": ["b_grp"]}]
+
+    # a worker would fail every job, invalid ones must not get that far
+    summary = batch.run_jobs(jobs, executable="false")
+
+    assert summary["jobs"] == 3
+    assert summary["failed"] == 3
+    assert [x["error"] for x in summary["results"]] == ["Job is missing shader, geo",
+                                                        "Job is not a dict : ['/scenes/b.ma']",
+                                                        "Job is missing scene"]
+    assert summary["results"][0]["scene"] == "/scenes/a.ma"
+
+
+def test_unknown_modes_fail_the_job():
+    job = {"scene": "/scenes/a.ma", "shader": "elements_a_sg", "geo": ["a_grp"]}
+
+    assert batch.validate_job(job) is None
+    assert batch.validate_job(dict(job, mode="frames", preflight="skip", tx="convert")) is None
+    assert batch.validate_job(dict(job, mode="layer")).startswith("Unknown mode layer")
+    assert batch.validate_job(dict(job, preflight="skipp")).startswith("Unknown preflight skipp")
+    assert batch.validate_job(dict(job, tx="on")).startswith("Unknown tx on")
@@ -0,0 +1,150 @@
+import json
+from contextlib import contextmanager
+
+from dw_kong_render_setup import build_job
+from dw_kong_render_setup import functions
+from dw_kong_render_setup import reconcile
+
+from conftest import ASSET, Scene
+
+
+def read_layers(scene):
+    rs = scene.backend.render_setup()
+    return dict((x.name(), reconcile.read_layer(x, ASSET)) for x in rs.getRenderLayers())
+
+
+def test_layers_mode_builds_a_layer_per_variation(scene):
+    scene.build()
+
+    layers = read_layers(scene)
+    assert sorted(layers) == sorted(ASSET + "_" + x for x in scene.variations.values())
+    for index, variation in scene.variations.items():
+        state = layers[ASSET + "_" + variation]
+        assert state is not None
+        assert state["index"].getAttrValue() == index
+        assert state["prefix"].getAttrValue() == "shuffle/tree/<RenderLayer>"
+
+
+def test_clone_mode_patches_the_index_of_every_clone(scene):
+    scene.build(functions.BUILD_MODE_CLONE)
+
+    layers = read_layers(scene)
+    assert sorted(layers) == sorted(ASSET + "_" + x for x in scene.variations.values())
+    for index, variation in scene.variations.items():
+        assert layers[ASSET + "_" + variation]["index"].getAttrValue() == index
+
+
+def test_frames_mode_keys_the_index_of_a_single_layer(scene):
+    journal = functions.build_render_setup(*scene.build_args(functions.BUILD_MODE_FRAMES), backend=scene.backend)
+    assert journal["layers"] == [ASSET + "_" + functions.FRAMES_LAYER]
+
+    layers = read_layers(scene)
+    assert list(layers) == [ASSET + "_" + functions.FRAMES_LAYER]
+    index_override = layers[ASSET + "_" + functions.FRAMES_LAYER]["index"].name()
+    assert scene.backend.get_keys(index_override, "attrValue") == dict((x, x) for x in scene.variations)
+
+
+def test_rebuild_changes_nothing(scene):
+    for mode in functions.BUILD_MODES:
+        scene.build(mode)
+        names = scene.layer_names()
+        nodes = set(scene.backend.nodes)
+
+        journal = functions.new_build_journal()
+        for step in functions.iter_build_render_setup(*scene.build_args(mode), backend=scene.backend,
+                                                      journal=journal):
+            pass
+
+        assert scene.layer_names() == names
+        assert set(scene.backend.nodes) == nodes
+        assert journal == functions.new_build_journal()
+
+
+def test_rebuild_updates_changed_values_in_place(scene):
+    scene.build()
+    layers = dict((x.name(), x) for x in scene.backend.render_setup().getRenderLayers())
+
+    scene.build(prefix="shuffle/tree_v2/<RenderLayer>")
+
+    rebuilt = read_layers(scene)
+    assert sorted(rebuilt) == sorted(layers)
+    for name, state in rebuilt.items():
+        assert state["layer"] is layers[name]
+        assert state["prefix"].getAttrValue() == "shuffle/tree_v2/<RenderLayer>"
+
+
+def test_rebuild_deletes_layers_of_removed_variations(scene):
+    scene.build()
+
+    kept = dict((x, scene.variations[x]) for x in sorted(scene.variations)[:2])
+    scene.build(variations=kept)
+
+    assert scene.layer_names() == sorted(ASSET + "_" + x for x in kept.values())
+
+
+def test_rebuild_replaces_layers_holding_a_variation_name(scene):
+    name = ASSET + "_" + scene.variations[min(scene.variations)]
+    scene.backend.render_setup().createRenderLayer(name)
+
+    scene.build()
+
+    layers = read_layers(scene)
+    assert sorted(layers) == sorted(ASSET + "_" + x for x in scene.variations.values())
+    assert all(layers.values())
+
+
+def test_cancelled_build_leaves_no_nodes():
+    scene = Scene()
+    name = ASSET + "_" + scene.variations[min(scene.variations)]
+    scene.backend.render_setup().createRenderLayer(name)
+    nodes = set(scene.backend.nodes)
+
+    for mode in functions.BUILD_MODES:
+        journal = functions.new_build_journal()
+        job = build_job.BuildJob(functions.iter_build_render_setup(*scene.build_args(mode), backend=scene.backend,
+                                                                   journal=journal),
+                                 lambda: functions.rollback_build(journal, scene.backend))
+        job.step(budget=0)
+        job.step(budget=0)
+        job.cancel()
+
+        assert job.cancelled
+        assert scene.layer_names() == [name]
+        assert set(scene.backend.nodes) == nodes
+
+
+def test_build_job_leaves_no_session_open_between_steps():
+    sessions = []
+
+    @contextmanager
+    def session():
+        sessions.append("open")
+        yield
+        sessions.append("closed")
+
+    for cancel in (False, True):
+        del sessions[:]
+        scene = Scene()
+        journal = functions.new_build_journal()
+        job = build_job.BuildJob(functions.iter_build_render_setup(*scene.build_args(), backend=scene.backend,
+                                                                   journal=journal),
+                                 lambda: functions.rollback_build(journal, scene.backend), session)
+        job.step(budget=0)
+        job.step(budget=0)
+        assert sessions == ["open", "closed"] * 2
+
+        if cancel:
+            job.cancel()
+            assert scene.layer_names() == []
+        else:
+            job.run()
+        assert sessions[-1] == "closed"
+
+
+def test_frame_mapping_path_is_named_after_scene_and_asset(tmp_path):
+    path = functions.get_frame_mapping_path(str(tmp_path / "shot_010.ma"), ASSET)
+    assert path == str(tmp_path / "shot_010_tree_frames.json")
+
+    functions.write_frame_mapping({0: "var000", 2: "var002"}, path)
+    with open(path) as f:
+        assert json.load(f) == {"0": "var000", "2": "var002"}
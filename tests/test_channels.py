@@ -0,0 +1,66 @@
+import json
+
+from dw_kong_render_setup import channels
+
+CONFIG = {
+    "channels": [
+        {"name": "clr", "label": "BaseColor", "aliases": ["diffuse"]},
+        {"name": "sss", "label": "Subsurface"},
+        {"name": "coat", "label": "Coat"},
+        {"name": "coatRgh", "label": "CoatRoughness"},
+    ],
+    "version_pattern": r"ver\d{2}",
+}
+
+
+def test_default_registry_classifies_the_standard_switches():
+    registry = channels.compile_registry({})
+
+    assert registry.channels == [x["name"] for x in channels.DEFAULT_CONFIG["channels"]]
+    assert channels.classify_switches(["tree_clr_switch", "tree_RGH_switch1", "tree_clr_ramp", "tree_switch"],
+                                      registry) == {"tree_clr_switch": "clr", "tree_RGH_switch1": "rgh",
+                                                    "tree_clr_ramp": None, "tree_switch": None}
+
+
+def test_config_channels_labels_and_aliases_are_matched():
+    registry = channels.compile_registry(CONFIG)
+
+    assert registry.channels == ["clr", "sss", "coat", "coatRgh"]
+    # the switch pattern is taken from the default
+    assert channels.get_switch_channel("tree_diffuse_switch", registry) == "clr"
+    assert channels.get_switch_channel("tree_Subsurface_switch", registry) == "sss"
+    # the longer channel name isn't shadowed by the one it starts with
+    assert channels.get_switch_channel("tree_coatRgh_switch", registry) == "coatRgh"
+    assert channels.get_switch_channel("tree_coat_switch", registry) == "coat"
+    assert channels.get_switch_channel("tree_rgh_switch", registry) is None
+
+
+def test_file_channel_takes_the_token_with_the_highest_priority():
+    registry = channels.compile_registry(CONFIG)
+
+    assert channels.get_file_channel("tree_coat_diffuse.1001.exr", registry) == "clr"
+    assert channels.get_file_channel("tree-Subsurface.exr", registry) == "sss"
+    assert channels.get_file_channel("tree_mask.exr", registry) is None
+
+
+def test_variation_names_follow_the_version_pattern():
+    registry = channels.compile_registry(CONFIG)
+
+    assert channels.get_variation_name("/tex/tree/red/ver01/tree_clr.exr", registry) == "red"
+    assert channels.get_variation_name("/tex/tree/red/v001/tree_clr.exr", registry) is None
+    assert registry.version.match("ver12") and not registry.version.match("ver123")
+
+
+def test_registry_key_changes_with_the_config():
+    assert channels.compile_registry({}).key == channels.compile_registry({}).key
+    assert channels.compile_registry({}).key != channels.compile_registry(CONFIG).key
+
+
+def test_invalid_config_falls_back_to_the_default(tmp_path, monkeypatch):
+    path = tmp_path / "channels.json"
+    path.write_text(json.dumps({"channels": [{"label": "no name"}]}))
+    monkeypatch.setattr(channels, "_registry", None)
+
+    registry = channels.load_registry(str(path))
+
+    assert registry.key == channels.compile_registry({}).key
@@ -0,0 +1,30 @@
+from dw_kong_render_setup import benchmark
+from dw_kong_render_setup import discovery
+from dw_kong_render_setup.backend import MemoryBackend
+
+
+def test_asset_names_drop_the_namespace():
+    names = discovery.get_asset_names(["set:elements_tree_sg", "elements_rock_sg", "a:b:elements_bush_sg"])
+
+    assert names == {"set:elements_tree_sg": "tree", "elements_rock_sg": "rock", "a:b:elements_bush_sg": "bush"}
+
+
+def test_asset_names_keep_references_of_the_same_asset_apart():
+    names = discovery.get_asset_names(["set1:elements_tree_sg", "set2:elements_tree_sg", "elements_tree_sg"])
+
+    assert names == {"set1:elements_tree_sg": "set1_tree", "set2:elements_tree_sg": "set2_tree",
+                     "elements_tree_sg": "tree"}
+
+
+def test_discovered_assets_build_in_one_pass():
+    backend = MemoryBackend()
+    for asset in ("tree", "rock"):
+        benchmark.build_synthetic_scene(backend, asset, 3, 1, 1)
+
+    assets = discovery.discover_assets(backend)
+    assert [(x["asset_name"], x["geo"]) for x in assets] == [("rock", ["transform2"]), ("tree", ["transform1"])]
+
+    discovery.build_assets(assets, bg_selector="background_grp", backend=backend)
+
+    layers = sorted(x.name() for x in backend.render_setup().getRenderLayers())
+    assert layers == sorted("{}_var{:03d}".format(asset, x) for asset in ("tree", "rock") for x in range(3))
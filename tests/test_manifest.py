@@ -0,0 +1,74 @@
+import pytest
+
+from dw_kong_render_setup import manifest
+
+from conftest import ASSET, CONTENT, SHADOW
+
+
+def layer_entry(name, content_count=0):
+    return {"layer": name, "asset": "tree", "variation": name[5:], "index": 0, "prefix": "",
+            "content_count": content_count, "shadow_count": 0, "selector": "pattern"}
+
+
+def planned_frames(jobs):
+    return sorted((task["layer"], frame) for job in jobs for task in job["tasks"]
+                  for frame in range(task["start"], task["end"] + 1))
+
+
+@pytest.mark.parametrize("extension", [".json", ".csv"])
+def test_manifest_lists_every_built_layer(scene, tmp_path, extension):
+    scene.build()
+
+    built = manifest.build_manifest(ASSET, scene.backend)
+    path = str(tmp_path / ("manifest" + extension))
+    manifest.write_manifest(built, path)
+    read = manifest.read_manifest(path)
+
+    assert [x["layer"] for x in read["layers"]] == [ASSET + "_" + scene.variations[x] for x in sorted(scene.variations)]
+    for entry in read["layers"]:
+        assert entry["variation"] == scene.variations[entry["index"]]
+        assert entry["content_count"] == len(CONTENT)
+        assert entry["shadow_count"] == len(SHADOW)
+
+
+def test_layers_are_packed_up_to_the_target():
+    layers = {"tree_a": 2000.0, "tree_b": 1000.0, "tree_c": 1000.0, "tree_d": 1000.0, "tree_e": 500.0}
+    plan = {"layers": [layer_entry(x) for x in sorted(layers)]}
+
+    jobs = manifest.plan_jobs(plan, target_seconds=3600, costs=layers)
+
+    assert all(job["seconds"] <= 3600 for job in jobs)
+    assert len(jobs) == 2
+    assert planned_frames(jobs) == [(x, 1) for x in sorted(layers)]
+    # first fit decreasing, the small layer fills the first job
+    assert [job["seconds"] for job in jobs] == [3500.0, 2000.0]
+
+
+def test_heavy_layers_are_split_into_frame_chunks():
+    plan = {"layers": [layer_entry("tree_a"), layer_entry("tree_b")]}
+
+    jobs = manifest.plan_jobs(plan, target_seconds=3600, frame_range=(1, 10), costs={"tree_a": 1000.0,
+                                                                                     "tree_b": 100.0})
+
+    chunks = sorted((task["start"], task["end"]) for job in jobs for task in job["tasks"] if task["layer"] == "tree_a")
+    assert chunks == [(1, 3), (4, 6), (7, 9), (10, 10)]
+    assert all(job["seconds"] <= 3600 for job in jobs)
+    # every frame of every layer is rendered exactly once
+    assert planned_frames(jobs) == sorted((x, f) for x in ("tree_a", "tree_b") for f in range(1, 11))
+
+
+def test_frames_longer_than_the_target_get_their_own_job():
+    plan = {"layers": [layer_entry("tree_a"), layer_entry("tree_b")]}
+
+    jobs = manifest.plan_jobs(plan, target_seconds=3600, frame_range=(1, 2), costs={"tree_a": 5000.0,
+                                                                                    "tree_b": 100.0})
+
+    heavy = [job for job in jobs if any(x["layer"] == "tree_a" for x in job["tasks"])]
+    assert [[(x["start"], x["end"]) for x in job["tasks"]] for job in heavy] == [[(1, 1)], [(2, 2)]]
+
+
+def test_layers_without_costs_are_estimated_from_their_content():
+    entry = layer_entry("tree_a", content_count=200)
+
+    assert manifest.estimate_layer_cost(entry) == manifest.COST_BASE_SECONDS + 200 * manifest.COST_PER_OBJECT_SECONDS
+    assert manifest.estimate_layer_cost(entry, {"tree_a": 42}) == 42.0
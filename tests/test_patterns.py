@@ -0,0 +1,115 @@
+import random
+import time
+
+import pytest
+
+from dw_kong_render_setup import patterns
+
+SEEDS = range(20)
+
+
+def random_names(rng, count=400):
+    """
+    :return: list of unique node names spread over namespaces, with shared prefixes and suffixes
+    """
+    names = set()
+    while len(names) < count:
+        name = "{}_{}{}".format(rng.choice(["geo", "leaf", "trunk", "rock"]), rng.choice(["", "big_", "small_"]),
+                                rng.randint(0, 60))
+        name += rng.choice(["", "Shape", "_grp"])
+        if rng.random() < 0.6:
+            name = rng.choice(["tree", "tree:branch", "bush"]) + ":" + name
+        names.add(name)
+    return sorted(names)
+
+
+def reference_match(terms, names):
+    return set(x for x in names if any(patterns.term_regex(term).match(x) for term in terms))
+
+
+def random_terms(rng, names):
+    """
+    :return: list of terms with literal, wildcard and nested namespaces, wildcards in every position
+    """
+    terms = patterns.build_terms(rng.sample(names, 20)) + rng.sample(names, 5)
+    terms += ["*", "*:*", "tree:*", "tree:branch:*", "tree:*Shape", "*:*_grp", "*_grp", "*:geo*", "*:b*",
+              "bush:geo_*", "*:leaf_*Shape", "tree*:*", "geo_*Shape", "missing:*", "*missing"]
+    return terms
+
+
+def selected(selector, names):
+    if selector.static is not None:
+        return set(selector.static)
+    return patterns.match_terms(patterns.split_expression(selector.pattern), names)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_match_terms_matches_like_the_term_regex(seed):
+    rng = random.Random(seed)
+    names = random_names(rng)
+
+    for term in random_terms(rng, names):
+        assert patterns.match_terms([term], names) == reference_match([term], names), term
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_match_expression_agrees_with_match_terms(seed):
+    rng = random.Random(seed)
+    names = random_names(rng)
+    index = patterns.build_name_index(names)
+    terms = random_terms(rng, names)
+
+    for term in terms:
+        assert patterns.match_expression(term, index) == patterns.match_terms([term], names), term
+    assert patterns.match_expression(", ".join(terms), index) == patterns.match_terms(terms, names)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_compress_terms_keeps_the_match_set(seed):
+    rng = random.Random(seed)
+    names = random_names(rng)
+    terms = patterns.build_terms(rng.sample(names, rng.randint(2, 120)))
+
+    compressed = patterns.compress_terms(terms, names)
+
+    assert len(compressed) <= len(terms)
+    assert patterns.match_terms(compressed, names) == patterns.match_terms(terms, names)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_compile_selector_keeps_the_match_set(seed):
+    rng = random.Random(seed)
+    names = random_names(rng)
+    content = rng.sample(names, rng.randint(2, 120))
+
+    selector = patterns.compile_selector(content, names)
+
+    assert selected(selector, names) == patterns.match_terms(patterns.build_terms(content), names)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_exact_selector_selects_only_the_content(seed):
+    rng = random.Random(seed)
+    names = random_names(rng)
+    content = rng.sample(names, rng.randint(1, 120))
+
+    selector = patterns.compile_selector(content, names, exact=True)
+
+    assert selected(selector, names) == set(content)
+
+
+def test_match_expression_scales_to_large_content():
+    names = ["ns{}:geo_{:06d}".format(x % 10, x) for x in range(100000)]
+    names += ["geo_{:06d}".format(x) for x in range(20000)]
+    index = patterns.build_name_index(names)
+
+    # the terms of 50k namespaced and 10k plain content objects, like build_search_string builds them
+    expression = ", ".join(patterns.build_terms(names[:50000] + names[100000:110000]))
+
+    start = time.perf_counter()
+    matched = patterns.match_expression(expression, index)
+    seconds = time.perf_counter() - start
+
+    assert len(matched) == 60000
+    # quadratic term handling took minutes at this size
+    assert seconds < 5.0
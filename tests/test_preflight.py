@@ -0,0 +1,16 @@
+from dw_kong_render_setup import preflight
+
+
+def test_preflight_checks_the_loaded_switch_snapshot(scene):
+    scans = []
+    scan_shading_network = scene.backend.scan_shading_network
+    scene.backend.scan_shading_network = lambda *args: scans.append(args) or scan_shading_network(*args)
+
+    report = preflight.run_preflight(scene.sg, scene.variations, scene.backend)
+    tx_report = preflight.run_tx_preflight(scene.sg, scene.backend, convert=False)
+
+    assert scans == []
+    # the synthetic textures don't exist on disk
+    assert preflight.get_broken_variations(report) == sorted(scene.variations.values())
+    assert report["checked"] == len(scene.variations) * 2
+    assert tx_report["checked"] == 0
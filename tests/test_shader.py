@@ -0,0 +1,14 @@
+from dw_kong_render_setup import functions
+
+
+def test_texture_root_comes_from_the_loaded_switch_snapshot(scene):
+    scans = []
+    scan_shading_network = scene.backend.scan_shading_network
+    scene.backend.scan_shading_network = lambda *args: scans.append(args) or scan_shading_network(*args)
+
+    assert functions.get_texture_root(scene.sg, scene.backend) == "/textures/tree"
+    assert scans == []
+
+    functions.load_selected_shader([scene.sg], backend=scene.backend)
+    assert functions.get_texture_root(scene.sg, scene.backend) == "/textures/tree"
+    assert len(scans) == 1
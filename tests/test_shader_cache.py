@@ -0,0 +1,77 @@
+import itertools
+
+import pytest
+
+from dw_kong_render_setup import benchmark
+from dw_kong_render_setup import functions
+from dw_kong_render_setup import shader_cache
+from dw_kong_render_setup.backend import MemoryBackend
+
+SWITCH_TEXTURES = {"tree_clr_switch": {0: ("file1", "/tex/tree/red/v001/tree_clr.exr"),
+                                       1: ("file2", "/tex/tree/blue/v001/tree_clr.exr")}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # a strictly increasing clock, entries written in a row never share their last use
+    ticks = itertools.count(1)
+    monkeypatch.setattr(shader_cache.time, "time", lambda: float(next(ticks)))
+
+
+def put(name, path, max_entries=shader_cache.MAX_ENTRIES):
+    shader_cache.put(name, "print_" + name, {"clr": name + "_clr_switch"}, 2, {0: "red", 1: "blue"}, path,
+                     max_entries)
+
+
+def test_fingerprint_covers_paths_sources_and_config():
+    def changed(index, value):
+        inputs = dict(SWITCH_TEXTURES["tree_clr_switch"])
+        inputs[index] = value
+        return {"tree_clr_switch": inputs}
+
+    base = shader_cache.fingerprint("elements_tree_sg", SWITCH_TEXTURES)
+    assert base == shader_cache.fingerprint("elements_tree_sg", changed(1, SWITCH_TEXTURES["tree_clr_switch"][1]))
+    new_version = ("file2", "/tex/tree/blue/v002/tree_clr.exr")
+    assert base != shader_cache.fingerprint("elements_tree_sg", changed(1, new_version))
+    assert base != shader_cache.fingerprint("elements_tree_sg", changed(1, ("file3", None)))
+    assert base != shader_cache.fingerprint("elements_tree_sg", changed(2, ("file3", None)))
+    assert base != shader_cache.fingerprint("elements_tree_sg", SWITCH_TEXTURES, "config")
+
+
+def test_changed_fingerprint_drops_the_entry(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    put("tree", path)
+
+    assert shader_cache.get("tree", "print_tree", path)["variations"] == {0: "red", 1: "blue"}
+    assert shader_cache.get("tree", "other", path) is None
+    # dropped, the old fingerprint doesn't bring it back
+    assert shader_cache.get("tree", "print_tree", path) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    for name in ("a", "b", "c"):
+        put(name, path, max_entries=3)
+
+    # reading a keeps it, b is the least recently used one now
+    assert shader_cache.get("a", "print_a", path)
+    put("d", path, max_entries=3)
+
+    assert [name for name in "abcd" if shader_cache.get(name, "print_" + name, path)] == ["a", "c", "d"]
+
+
+def test_loading_a_changed_network_misses_the_cache(tmp_path):
+    backend = MemoryBackend(prefs_dir=str(tmp_path))
+    sg = benchmark.build_synthetic_scene(backend, "tree", 3, 1, 1)
+    cache_path = shader_cache.get_cache_path(str(tmp_path))
+
+    variations = functions.load_selected_shader([sg], backend=backend)[3]
+    key = shader_cache.fingerprint(sg, backend.scan_shading_network(sg), functions.channels.get_registry().key)
+    assert shader_cache.get(sg, key, cache_path)["variations"] == variations
+
+    # another variation folder on the first switch input changes the fingerprint, the analysis runs again
+    file_node = backend.scan_shading_network(sg)["tree_clr_switch"][0][0]
+    backend.set_attr(file_node, "fileTextureName", "/textures/tree/green/v001/tree_clr.exr")
+
+    variations[0] = "green"
+    assert functions.load_selected_shader([sg], backend=backend)[3] == variations
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from dw_kong_render_setup import texture_index
+
+FILES = ["red/v001/tree_clr.exr", "red/v002/tree_clr.exr", "red/v002/tree_rgh.exr", "blue/v001/tree_clr.exr",
+         "blue/notes/readme.txt"]
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    for name in FILES:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"texture")
+    monkeypatch.setattr(texture_index, "_indices", {})
+    return str(tmp_path)
+
+
+@pytest.fixture
+def listed(monkeypatch):
+    # every directory the index lists
+    paths = []
+    list_dir = texture_index._list_dir
+    monkeypatch.setattr(texture_index, "_list_dir", lambda path: paths.append(path) or list_dir(path))
+    return paths
+
+
+def touch(path):
+    # folder mtimes can be coarser than the test, move them forward explicitly
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+
+def relative(root, paths):
+    return sorted(os.path.relpath(x, root) for x in paths)
+
+
+def test_index_lists_variations_versions_and_channel_files(root):
+    index = texture_index.scan_texture_root(root)
+
+    assert texture_index.list_variations(index) == ["blue", "red"]
+    assert texture_index.get_latest_versions(index) == {"blue": "v001", "red": "v002"}
+    assert index["variations"]["red"]["versions"]["v002"]["files"] == {
+        "clr": [os.path.join(root, "red", "v002", "tree_clr.exr")],
+        "rgh": [os.path.join(root, "red", "v002", "tree_rgh.exr")]}
+    assert texture_index.get_unwired_variations(index, {0: "red"}) == ["blue"]
+
+
+def test_unchanged_folders_are_not_listed_again(root, listed):
+    index = texture_index.scan_texture_root(root)
+    assert len(listed) == 6
+
+    del listed[:]
+    assert texture_index.scan_texture_root(root, index)["variations"] == index["variations"]
+    assert relative(root, listed) == ["."]
+
+
+def test_changed_folders_are_listed_again(root, listed):
+    index = texture_index.scan_texture_root(root)
+
+    # a new file only changes its version folder, a new version its variation folder
+    open(os.path.join(root, "blue", "v001", "tree_nrm.exr"), "w").close()
+    touch(os.path.join(root, "blue", "v001"))
+    os.makedirs(os.path.join(root, "red", "v003"))
+    open(os.path.join(root, "red", "v003", "tree_clr.exr"), "w").close()
+    touch(os.path.join(root, "red"))
+
+    del listed[:]
+    index = texture_index.scan_texture_root(root, index)
+
+    assert relative(root, listed) == [".", os.path.join("blue", "v001"), "red", os.path.join("red", "v003")]
+    assert sorted(index["variations"]["blue"]["versions"]["v001"]["files"]) == ["clr", "nrm"]
+    assert texture_index.get_latest_versions(index)["red"] == "v003"
+
+
+def test_index_is_refreshed_from_the_file_cache(root, listed, tmp_path_factory, monkeypatch):
+    cache_path = str(tmp_path_factory.mktemp("prefs") / texture_index.CACHE_FILE)
+    index = texture_index.get_index(root, cache_path)
+
+    # a new session only has the file cache
+    monkeypatch.setattr(texture_index, "_indices", {})
+    del listed[:]
+
+    assert texture_index.get_index(root, cache_path)["variations"] == index["variations"]
+    assert relative(root, listed) == ["."]
@@ -0,0 +1,238 @@
+# Import built-in modules
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Logger
+import logging
+
+from dw_kong_render_setup import channels
+from dw_kong_render_setup import tracing
+
+logger = logging.getLogger('Kong Render Setup')
+
+CACHE_FOLDER = "kong_render_setup"
+CACHE_FILE = "texture_index.json"
+
+# directory listings are io bound, over network shares most of the time is spent waiting on the server
+DEFAULT_WORKERS = 16
+
+# indices of scanned roots, kept for the session
+_indices = {}
+
+
+def get_cache_path(prefs_dir):
+    """
+    returns the path of the texture index cache in the user prefs dir
+    :param prefs_dir: user prefs dir, as returned by the scene backend
+    :return: str path or None if there is no prefs dir
+    """
+    if not prefs_dir:
+        return None
+
+    return os.path.join(prefs_dir, CACHE_FOLDER, CACHE_FILE)
+
+
+def get_texture_root(file_path):
+    """
+    returns the texture root of an asset from one of its texture paths, the folder holding the variation folders
+    :param file_path: texture path like <root>/<variation>/v001/<file>
+    :return: str root or None if the path doesn't follow the layout
+    """
+    version_dir = os.path.dirname(os.path.normpath(str(file_path)))
+    if not channels.get_registry().version.match(os.path.basename(version_dir)):
+        return None
+    return os.path.dirname(os.path.dirname(version_dir))
+
+
+def get_channel(file_name):
+    """
+    :param file_name: texture file name
+    :return: str short channel name or None if no channel token is found
+    """
+    return channels.get_file_channel(file_name)
+
+
+def _list_dir(path):
+    """
+    :param path: directory
+    :return: tuple of directory mtime and list of tuples of entry name and is dir, None if it can't be read
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+        with os.scandir(path) as entries:
+            return mtime, [(x.name, x.is_dir()) for x in entries]
+    except OSError:
+        return None
+
+
+def _scan_version(path, cached):
+    """
+    lists the channel files of a version folder, reuses the cached listing while the folder mtime is unchanged
+    :param path: version folder
+    :param cached: cached entry of the folder or None
+    :return: dict with mtime and files per channel or None if the folder can't be read
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if cached and cached["mtime"] == mtime:
+        return cached
+
+    listing = _list_dir(path)
+    if listing is None:
+        return None
+    tracing.count("texture_dirs_listed")
+
+    files = {}
+    for name, is_dir in listing[1]:
+        channel = None if is_dir else get_channel(name)
+        if channel:
+            files.setdefault(channel, []).append(os.path.join(path, name))
+    for channel in files:
+        files[channel].sort()
+
+    return {"mtime": listing[0], "files": files}
+
+
+def _scan_variation(path, cached):
+    """
+    lists the version folders of a variation, reuses the cached listing while the folder mtime is unchanged
+    :param path: variation folder
+    :param cached: cached entry of the variation or None
+    :return: tuple of mtime and list of version names or None if the folder can't be read
+    """
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    if cached and cached["mtime"] == mtime:
+        return mtime, sorted(cached["versions"])
+
+    listing = _list_dir(path)
+    if listing is None:
+        return None
+    tracing.count("texture_dirs_listed")
+
+    version = channels.get_registry().version
+    return listing[0], sorted(name for name, is_dir in listing[1] if is_dir and version.match(name))
+
+
+def scan_texture_root(root, cached=None, workers=DEFAULT_WORKERS):
+    """
+    indexes the variations, versions and channel files below a texture root
+    all variation and version folders are stated and listed concurrently, folders with an unchanged mtime
+    are taken from the cached index without listing them again
+    :param root: texture root of an asset
+    :param cached: optional previous index of the root
+    :param workers: number of threads listing folders
+    :return: dict index with root, scan time and variations, each with mtime and versions with files per channel
+    """
+    cached_variations = (cached or {}).get("variations", {})
+    index = {"root": root, "time": time.time(), "variations": {}}
+
+    listing = _list_dir(root)
+    if listing is None:
+        logger.warning("Couldn't read texture root {}".format(root))
+        return index
+    variation_names = sorted(name for name, is_dir in listing[1] if is_dir)
+
+    with tracing.span("scan_texture_root", root=root):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            variation_results = list(pool.map(
+                lambda name: _scan_variation(os.path.join(root, name), cached_variations.get(name)),
+                variation_names))
+
+            jobs = []
+            for name, result in zip(variation_names, variation_results):
+                if result is None:
+                    continue
+                versions = result[1]
+                if not versions:
+                    continue
+                index["variations"][name] = {"mtime": result[0], "versions": {}}
+                cached_versions = cached_variations.get(name, {}).get("versions", {})
+                for version in versions:
+                    jobs.append((name, version, os.path.join(root, name, version), cached_versions.get(version)))
+
+            version_results = list(pool.map(lambda job: _scan_version(job[2], job[3]), jobs))
+
+    for job, result in zip(jobs, version_results):
+        if result is not None:
+            index["variations"][job[0]]["versions"][job[1]] = result
+
+    logger.info("Indexed %s variations with %s versions in %s",
+                len(index["variations"]), len(jobs), root)
+
+    return index
+
+
+def get_index(root, cache_path=None, workers=DEFAULT_WORKERS):
+    """
+    returns the up to date index of a texture root, refreshed incrementally from the session or file cache
+    :param root: texture root of an asset
+    :param cache_path: optional json file the indices are persisted in
+    :param workers: number of threads listing folders
+    :return: dict index
+    """
+    cached = _indices.get(root)
+    if cached is None and cache_path:
+        cached = _load_cache(cache_path).get(root)
+
+    index = scan_texture_root(root, cached, workers)
+    _indices[root] = index
+
+    if cache_path:
+        _save_cache(cache_path, root, index)
+
+    return index
+
+
+def list_variations(index):
+    """
+    :param index: dict index
+    :return: sorted list of variation names with at least one version
+    """
+    return sorted(index["variations"])
+
+
+def get_latest_versions(index):
+    """
+    :param index: dict index
+    :return: dict with variation name and its highest version name
+    """
+    return dict((x, max(index["variations"][x]["versions"])) for x in index["variations"]
+                if index["variations"][x]["versions"])
+
+
+def get_unwired_variations(index, variations):
+    """
+    :param index: dict index
+    :param variations: dict with switch index and variation name, as returned by load_selected_shader
+    :return: sorted list of variation names on disk that aren't connected to the switch
+    """
+    wired = set(variations.values())
+    return [x for x in list_variations(index) if x not in wired]
+
+
+def _load_cache(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path, root, index):
+    cache = _load_cache(path)
+    cache[root] = index
+    try:
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(path, "w") as f:
+            json.dump(cache, f)
+    except OSError as e:
+        logger.warning("Couldn't write texture index cache {} : {}".format(path, e))
@@ -0,0 +1,156 @@
+# Import built-in modules
+import os
+import json
+import time
+import threading
+
+# Logger
+import logging
+
+logger = logging.getLogger('Kong Render Setup')
+
+# tracing is off by default, spans and counters are no-ops until enable() is called
+_enabled = False
+_origin = time.perf_counter()
+_events = []
+_counters = {}
+
+
+class _Span(object):
+    """
+    timing span, recorded as chrome trace complete event when left
+    """
+
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        event = {"name": self.name, "ph": "X", "ts": (self.start - _origin) * 1e6, "dur": (end - self.start) * 1e6,
+                 "pid": os.getpid(), "tid": threading.current_thread().ident}
+        if self.args:
+            event["args"] = dict((x, str(self.args[x])) for x in self.args)
+        if exc_type:
+            event.setdefault("args", {})["error"] = exc_type.__name__
+        _events.append(event)
+        return False
+
+
+class _NullSpan(object):
+    """
+    span used while tracing is disabled, does nothing
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable():
+    """
+    enables tracing and clears everything recorded so far
+    :return:
+    """
+    global _enabled
+    reset()
+    _enabled = True
+
+
+def disable():
+    """
+    disables tracing, recorded events are kept until the next enable or reset
+    :return:
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """
+    clears all recorded events and counters
+    :return:
+    """
+    global _origin
+    _origin = time.perf_counter()
+    del _events[:]
+    _counters.clear()
+
+
+def span(name, **args):
+    """
+    returns a context manager timing the enclosed block as nested span
+    :param name: name of the span
+    :param args: optional values shown with the span in the trace viewer
+    :return: context manager
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def count(name, value=1):
+    """
+    adds value to a counter, every change is recorded as counter event
+    :param name: name of the counter
+    :param value: value to add
+    :return:
+    """
+    if not _enabled:
+        return
+    total = _counters.get(name, 0) + value
+    _counters[name] = total
+    _events.append({"name": name, "ph": "C", "ts": (time.perf_counter() - _origin) * 1e6,
+                    "pid": os.getpid(), "tid": threading.current_thread().ident, "args": {name: total}})
+
+
+def get_counters():
+    """
+    :return: dict with counter name and current value
+    """
+    return dict(_counters)
+
+
+def get_summary():
+    """
+    sums up the recorded spans
+    :return: dict with span name and dict of call count and total seconds
+    """
+    summary = {}
+    for event in _events:
+        if event["ph"] != "X":
+            continue
+        entry = summary.setdefault(event["name"], {"calls": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["seconds"] += event["dur"] / 1e6
+    return summary
+
+
+def export_chrome_trace(path):
+    """
+    writes all recorded events as chrome trace json, opens in chrome://tracing and perfetto
+    :param path: json file path
+    :return:
+    """
+    with open(path, "w") as f:
+        json.dump({"traceEvents": _events, "displayTimeUnit": "ms", "otherData": {"counters": _counters}}, f)
+
+    logger.info("Exported %s trace events to %s", len(_events), path)